@@ -1,13 +1,8 @@
 import sys
 import argparse
 
-import requests
-from requests.packages.urllib3.exceptions import InsecureRequestWarning
+from alto.daemon import forward_command
 
-from alto.commands import cromwell, parse_monitoring_log, terra, upload
-
-
-requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
 
 try:
     from importlib.metadata import version
@@ -16,23 +11,45 @@ except ImportError:  # < Python 3.8: Use backport module
 
 
 def main():
-    str2module = {
-        "terra": terra,
-        "upload": upload,
-        "parse_monitoring_log": parse_monitoring_log,
-        "cromwell": cromwell,
-    }
-
     parser = argparse.ArgumentParser(description="Run an altocumulus command.")
     parser.add_argument(
         "command",
         help="The command",
-        choices=["terra", "upload", "parse_monitoring_log", "cromwell", "query"],
+        choices=["terra", "upload", "parse_monitoring_log", "cromwell", "serve", "query"],
     )
     parser.add_argument("command_args", help="The command arguments", nargs=argparse.REMAINDER)
+    parser.add_argument(
+        "--output",
+        dest="output",
+        choices=["text", "json", "tsv"],
+        default="text",
+        help="Output format of the command. With json or tsv, the run, check_status, abort, list_jobs and get_task_status commands of cromwell, terra run and upload write one record per line (NDJSON, or TSV with a header line) instead of messages and tables. The default is text.",
+    )
     parser.add_argument("-v", "--version", action="version", version=version("altocumulus"))
     my_args = parser.parse_args()
 
+    # Forward the command to a running 'alto serve' daemon before importing any command module.
+    exit_code = forward_command([my_args.command] + my_args.command_args, my_args.output)
+    if exit_code is not None:
+        sys.exit(exit_code)
+
+    import requests
+    from requests.packages.urllib3.exceptions import InsecureRequestWarning
+
+    from alto.commands import cromwell, parse_monitoring_log, serve, terra, upload
+    from alto.utils.output_utils import set_output_format
+
+    requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
+
+    str2module = {
+        "terra": terra,
+        "upload": upload,
+        "parse_monitoring_log": parse_monitoring_log,
+        "cromwell": cromwell,
+        "serve": serve,
+    }
+
+    set_output_format(my_args.output)
     cmd = str2module[my_args.command]
     sys.argv[0] = f"alto {my_args.command}"
     cmd.main(my_args.command_args)
@@ -1,7 +1,17 @@
 import sys
 import argparse
 
-from . import abort, check_status, get_logs, get_metadata, get_task_status, list_jobs, run, timing
+from . import (
+    abort,
+    cache_report,
+    check_status,
+    get_logs,
+    get_metadata,
+    get_task_status,
+    list_jobs,
+    run,
+    timing,
+)
 
 
 def main(args):
@@ -14,6 +24,7 @@ def main(args):
         "get_logs": get_logs,
         "list_jobs": list_jobs,
         "timing": timing,
+        "cache_report": cache_report,
     }
 
     parser = argparse.ArgumentParser(description="Run a terra sub-command.")
@@ -29,6 +40,7 @@ def main(args):
             "get_logs",
             "list_jobs",
             "timing",
+            "cache_report",
         ],
     )
     parser.add_argument(
@@ -1,21 +1,30 @@
 import argparse
 
-import requests
+from alto.utils.cromwell_client import run_with_client
+from alto.utils.cromwell_utils import read_job_ids
+
+from .check_status import show_job_results
+from .list_jobs import query_job_ids
 
 
 def abort_job(server, port, job_id):
-    resp = requests.post(f"http://{server}:{port}/api/workflows/v1/{job_id}/abort")
-    resp_dict = resp.json()
+    abort_jobs(server, port, [job_id])
+
 
-    if resp.status_code == 200:
-        print(f"Job {resp_dict['id']} is in status {resp_dict['status']}.")
-    else:
-        print(resp_dict["message"])
+def abort_jobs(server, port, job_ids, max_workers=16):
+    show_job_results(
+        run_with_client(
+            server,
+            port,
+            lambda client: client.map_jobs("abort", job_ids),
+            max_connections=max_workers,
+        )
+    )
 
 
 def main(argv):
     parser = argparse.ArgumentParser(
-        description="Abort a running workflow job on a Cromwell server."
+        description="Abort one or more running workflow jobs on a Cromwell server."
     )
     parser.add_argument(
         "-s",
@@ -35,11 +44,67 @@ def main(argv):
     )
     parser.add_argument(
         "--id",
-        dest="job_id",
+        dest="job_ids",
         action="store",
-        required=True,
-        help="Workflow ID returned in 'alto cromwell run' command.",
+        nargs="+",
+        help="Workflow ID(s) returned in 'alto cromwell run' command.",
+    )
+    parser.add_argument(
+        "--id-file",
+        dest="id_file",
+        action="store",
+        help="File containing one workflow ID per line.",
+    )
+    parser.add_argument(
+        "--name",
+        dest="names",
+        action="append",
+        default=[],
+        help="Abort unfinished jobs of this workflow name. Can be specified multiple times.",
+    )
+    parser.add_argument(
+        "--label",
+        dest="labels",
+        action="append",
+        default=[],
+        metavar="KEY:VALUE",
+        help="Abort unfinished jobs with this label. Can be specified multiple times.",
+    )
+    parser.add_argument(
+        "--status",
+        dest="statuses",
+        action="append",
+        default=[],
+        help="Abort jobs in this status. Can be specified multiple times. By default, jobs in Submitted, Running and On Hold status are selected by filters.",
+    )
+    parser.add_argument(
+        "-u",
+        "--user",
+        dest="user",
+        action="store",
+        help="Abort unfinished jobs submitted by this user.",
+    )
+    parser.add_argument(
+        "--max-workers",
+        dest="max_workers",
+        type=int,
+        default=16,
+        help="Maximum number of requests sent concurrently. The default is 16.",
     )
 
     args = parser.parse_args(argv)
-    abort_job(args.server, args.port, args.job_id)
+
+    job_ids = read_job_ids(args.job_ids, args.id_file)
+    if args.names or args.labels or args.statuses or args.user:
+        job_ids += query_job_ids(
+            args.server,
+            args.port,
+            args.user,
+            args.statuses or ["Submitted", "Running", "On Hold"],
+            args.names,
+            args.labels,
+        )
+    if len(job_ids) == 0:
+        parser.error("No job is selected. Use --id, --id-file or a filter to select jobs.")
+
+    abort_jobs(args.server, args.port, list(dict.fromkeys(job_ids)), args.max_workers)
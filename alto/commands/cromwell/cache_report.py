@@ -0,0 +1,173 @@
+import argparse
+
+import pandas as pd
+
+from alto.utils.cromwell_utils import MetadataFetcher, map_jobs, read_job_ids
+
+
+def get_miss_reason(call_caching: dict) -> str:
+    """Explain why a call was not a cache hit, as far as Cromwell's metadata tells."""
+    mode = call_caching.get("effectiveCallCachingMode")
+    if mode in ["WriteCache", "CallCachingOff"]:
+        return f"reading from cache disabled ({mode})"
+    if not call_caching.get("allowResultReuse", True):
+        return "result reuse not allowed"
+    hit_failures = call_caching.get("hitFailures", [])
+    if len(hit_failures) > 0:
+        for failures in hit_failures[0].values():
+            if len(failures) > 0:
+                return f"cache hit failed: {failures[0].get('message', '')}"
+        return "cache hit failed"
+    result = call_caching.get("result", "")
+    if result == "Cache Miss":
+        return "no matching cache entry"
+    return result if result != "" else "unknown"
+
+
+def get_cache_records(server, port, job_ids, max_workers=8) -> pd.DataFrame:
+    """Return one row per task call of the jobs, with its cache status and, for cache hits, the
+    duration of the original call that was reused."""
+    fetcher = MetadataFetcher(
+        server,
+        port,
+        include_keys=["callCaching", "executionStatus", "shardIndex", "attempt"],
+        max_workers=max_workers,
+    )
+    records = []
+    for job_id in job_ids:
+        for wf_id, task_name, call in fetcher.iter_calls(job_id):
+            if call.get("executionStatus") != "Done":
+                continue
+            call_caching = call.get("callCaching", {})
+            hit = call_caching.get("hit", False)
+            records.append(
+                dict(
+                    job_id=job_id,
+                    workflow_id=wf_id,
+                    task=task_name,
+                    shard=call.get("shardIndex", -1),
+                    hit=hit,
+                    miss_reason="" if hit else get_miss_reason(call_caching),
+                    # result is in the format of 'Cache Hit: <workflow id>:<call name>:<shard index>'
+                    original_call=(
+                        call_caching.get("result", "")[len("Cache Hit:") :].strip() if hit else ""
+                    ),
+                )
+            )
+    df = pd.DataFrame.from_records(
+        records,
+        columns=["job_id", "workflow_id", "task", "shard", "hit", "miss_reason", "original_call"],
+    )
+
+    # Fetch start/end of the original calls, one request per original workflow.
+    original_ids = list(dict.fromkeys(call.split(":")[0] for call in df["original_call"] if call))
+    timing_fetcher = MetadataFetcher(
+        server, port, include_keys=["start", "end", "shardIndex"], max_workers=max_workers
+    )
+
+    def get_original_durations(wf_id):
+        durations = {}
+        try:
+            calls = timing_fetcher.get_metadata(wf_id).get("calls", {})
+        except Exception:
+            return durations  # original workflow may have been pruned from the server
+        for task_name, call_list in calls.items():
+            for call in call_list:
+                if "start" in call and "end" in call:
+                    durations[f"{wf_id}:{task_name}:{call.get('shardIndex', -1)}"] = (
+                        pd.Timestamp(call["end"]) - pd.Timestamp(call["start"])
+                    ).total_seconds()
+        return durations
+
+    durations = {}
+    for result in map_jobs(get_original_durations, original_ids, max_workers=max_workers):
+        durations.update(result)
+    df["saved_seconds"] = df["original_call"].map(durations).fillna(0.0)
+    return df
+
+
+def summarize_cache(df: pd.DataFrame) -> pd.DataFrame:
+    grouped = df.groupby("task", sort=True)
+    summary = pd.DataFrame(
+        {
+            "n_calls": grouped.size(),
+            "hits": grouped["hit"].sum(),
+            "saved_hours": grouped["saved_seconds"].sum() / 3600.0,
+        }
+    )
+    summary["misses"] = summary["n_calls"] - summary["hits"]
+    summary["hit_rate"] = summary["hits"] / summary["n_calls"]
+    misses = df.loc[~df["hit"].astype(bool)]
+    summary["top_miss_reason"] = misses.groupby("task")["miss_reason"].agg(
+        lambda reasons: reasons.value_counts().index[0]
+    )
+    summary["top_miss_reason"] = summary["top_miss_reason"].fillna("")
+    summary = summary[
+        ["n_calls", "hits", "misses", "hit_rate", "saved_hours", "top_miss_reason"]
+    ].round(3)
+    return summary.reset_index()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description="Report call-cache hits and misses per task, and compute time saved by call caching, for one or more jobs."
+    )
+    parser.add_argument(
+        "-s",
+        "--server",
+        dest="server",
+        action="store",
+        required=True,
+        help="Server hostname or IP address.",
+    )
+    parser.add_argument(
+        "-p",
+        "--port",
+        dest="port",
+        action="store",
+        default="8000",
+        help="Port number for Cromwell service. The default port is 8000.",
+    )
+    parser.add_argument(
+        "--id",
+        dest="job_ids",
+        action="store",
+        nargs="+",
+        help="Workflow ID(s) returned in 'alto cromwell run' command.",
+    )
+    parser.add_argument(
+        "--id-file",
+        dest="id_file",
+        action="store",
+        help="File containing one workflow ID per line.",
+    )
+    parser.add_argument("--output", dest="output", required=True, help="Output per-task TSV path")
+    parser.add_argument(
+        "--calls",
+        dest="calls",
+        action="store",
+        help="Optional TSV path to write cache status of every call",
+    )
+    parser.add_argument(
+        "--max-workers",
+        dest="max_workers",
+        type=int,
+        default=8,
+        help="Maximum number of metadata requests sent concurrently. The default is 8.",
+    )
+    args = parser.parse_args(argv)
+
+    job_ids = read_job_ids(args.job_ids, args.id_file)
+    if len(job_ids) == 0:
+        parser.error("No job is selected. Use --id or --id-file to select jobs.")
+
+    df = get_cache_records(args.server, args.port, job_ids, max_workers=args.max_workers)
+    if args.calls is not None:
+        df.to_csv(args.calls, sep="\t", index=False)
+    summarize_cache(df).to_csv(args.output, sep="\t", index=False)
+
+    n_hits = int(df["hit"].sum())
+    print(
+        f"{n_hits} of {df.shape[0]} finished calls in {len(job_ids)} job(s) were cache hits, "
+        f"saving {df['saved_seconds'].sum() / 3600.0:.2f} hours of compute time."
+    )
@@ -1,21 +1,49 @@
 import argparse
+from typing import List
 
-import requests
+from alto.utils.cromwell_client import run_with_client
+from alto.utils.cromwell_utils import read_job_ids
+from alto.utils.output_utils import RecordWriter, is_structured_output
+
+from .list_jobs import query_job_ids
+
+
+def show_job_results(results: List[dict]) -> None:
+    if is_structured_output():
+        RecordWriter(["id", "status", "message"]).write_all(results)
+        return
+
+    if len(results) == 1:
+        result = results[0]
+        if result["message"] == "":
+            print(f"Job {result['id']} is in status {result['status']}.")
+        else:
+            print(result["message"])
+        return
+
+    print("{:<38} {:<13} {}".format("Job ID", "Status", "Message"))
+    for result in results:
+        print("{:<38} {:<13} {}".format(result["id"], result["status"], result["message"]))
 
 
 def get_status(server, port, job_id):
-    resp = requests.get(f"http://{server}:{port}/api/workflows/v1/{job_id}/status")
-    resp_dict = resp.json()
+    get_statuses(server, port, [job_id])
+
 
-    if resp.status_code == 200:
-        print(f"Job {resp_dict['id']} is in status {resp_dict['status']}.")
-    else:
-        print(resp_dict["message"])
+def get_statuses(server, port, job_ids, max_workers=16):
+    show_job_results(
+        run_with_client(
+            server,
+            port,
+            lambda client: client.map_jobs("status", job_ids),
+            max_connections=max_workers,
+        )
+    )
 
 
 def main(argv):
     parser = argparse.ArgumentParser(
-        description="Check the current status for a workflow on a Cromwell server."
+        description="Check the current status for one or more workflows on a Cromwell server."
     )
     parser.add_argument(
         "-s",
@@ -35,12 +63,62 @@ def main(argv):
     )
     parser.add_argument(
         "--id",
-        dest="job_id",
+        dest="job_ids",
         action="store",
-        required=True,
-        help="Workflow ID returned in 'alto cromwell run' command.",
+        nargs="+",
+        help="Workflow ID(s) returned in 'alto cromwell run' command.",
+    )
+    parser.add_argument(
+        "--id-file",
+        dest="id_file",
+        action="store",
+        help="File containing one workflow ID per line.",
+    )
+    parser.add_argument(
+        "--name",
+        dest="names",
+        action="append",
+        default=[],
+        help="Select jobs of this workflow name. Can be specified multiple times.",
+    )
+    parser.add_argument(
+        "--label",
+        dest="labels",
+        action="append",
+        default=[],
+        metavar="KEY:VALUE",
+        help="Select jobs with this label. Can be specified multiple times.",
+    )
+    parser.add_argument(
+        "--status",
+        dest="statuses",
+        action="append",
+        default=[],
+        help="Select jobs in this status. Can be specified multiple times.",
+    )
+    parser.add_argument(
+        "-u",
+        "--user",
+        dest="user",
+        action="store",
+        help="Select jobs submitted by this user.",
+    )
+    parser.add_argument(
+        "--max-workers",
+        dest="max_workers",
+        type=int,
+        default=16,
+        help="Maximum number of requests sent concurrently. The default is 16.",
     )
 
     args = parser.parse_args(argv)
 
-    get_status(args.server, args.port, args.job_id)
+    job_ids = read_job_ids(args.job_ids, args.id_file)
+    if args.names or args.labels or args.statuses or args.user:
+        job_ids += query_job_ids(
+            args.server, args.port, args.user, args.statuses, args.names, args.labels
+        )
+    if len(job_ids) == 0:
+        parser.error("No job is selected. Use --id, --id-file or a filter to select jobs.")
+
+    get_statuses(args.server, args.port, list(dict.fromkeys(job_ids)), args.max_workers)
@@ -1,9 +1,10 @@
+import asyncio
 import argparse
 from subprocess import CalledProcessError
-
-import requests
+from typing import List
 
 from alto.utils import run_command
+from alto.utils.cromwell_client import CromwellClient, run_with_client
 
 
 def get_localize_path(cloud_uri, job_id):
@@ -28,34 +29,39 @@ def get_remote_log_file(cloud_uri, job_id, profile):
         print(f"{cloud_uri} does not exist.")
 
 
-def get_logs(server, port, top_job_id, cur_job_id, profile):
-    # For tasks directly called by current job
-    resp_logs = requests.get(f"http://{server}:{port}/api/workflows/v1/{cur_job_id}/logs")
-    logs_dict = resp_logs.json()
-    if resp_logs.status_code != 200:
-        raise Exception(logs_dict["message"])
+async def collect_log_uris(client: CromwellClient, job_id: str) -> List[str]:
+    """Return stdout and stderr URIs of all calls of job_id, including calls in subworkflows,
+    which are looked up concurrently."""
+    logs_dict, meta_dict = await asyncio.gather(
+        client.logs(job_id), client.metadata(job_id, include_keys=["subWorkflowId"])
+    )
 
+    # For tasks directly called by current job
+    uris = []
     processed_tasks = set()
-    if "calls" in logs_dict.keys():
-        for task_name, log_list in logs_dict["calls"].items():
-            for log in log_list:
-                get_remote_log_file(log["stderr"], top_job_id, profile)
-                get_remote_log_file(log["stdout"], top_job_id, profile)
-            processed_tasks.add(task_name)
-
-    resp_meta = requests.get(f"http://{server}:{port}/api/workflows/v1/{cur_job_id}/metadata")
-    meta_dict = resp_meta.json()
-    if resp_meta.status_code != 200:
-        raise Exception(meta_dict["message"])
+    for task_name, log_list in logs_dict.get("calls", {}).items():
+        for log in log_list:
+            uris.extend([log["stderr"], log["stdout"]])
+        processed_tasks.add(task_name)
 
     # For tasks with subworkflow ID
-    if "calls" in meta_dict.keys():
-        for task_name, task_list in meta_dict["calls"].items():
-            if task_name not in processed_tasks:
-                for task in task_list:
-                    if "subWorkflowId" in task.keys():
-                        subworkflow_id = task["subWorkflowId"]
-                        get_logs(server, port, top_job_id, subworkflow_id, profile)
+    subworkflow_ids = [
+        task["subWorkflowId"]
+        for task_name, task_list in meta_dict.get("calls", {}).items()
+        if task_name not in processed_tasks
+        for task in task_list
+        if "subWorkflowId" in task
+    ]
+    for sub_uris in await asyncio.gather(
+        *[collect_log_uris(client, subworkflow_id) for subworkflow_id in subworkflow_ids]
+    ):
+        uris.extend(sub_uris)
+    return uris
+
+
+def get_logs(server, port, job_id, profile):
+    for uri in run_with_client(server, port, lambda client: collect_log_uris(client, job_id)):
+        get_remote_log_file(uri, job_id, profile)
 
 
 def main(argv):
@@ -95,4 +101,4 @@ def main(argv):
     # Create log folder even if there is no log file.
     run_command(["mkdir", "-p", args.job_id], dry_run=False)
 
-    get_logs(args.server, args.port, args.job_id, args.job_id, args.profile)
+    get_logs(args.server, args.port, args.job_id, args.profile)
@@ -1,18 +1,17 @@
 import json
 import argparse
 
-import requests
+from alto.utils.cromwell_client import CromwellError, run_with_client
 
 
 def get_metadata(server, port, job_id):
-    resp = requests.get(f"http://{server}:{port}/api/workflows/v1/{job_id}/metadata")
-    resp_dict = resp.json()
-
-    if resp.status_code == 200:
-        with open(f"{job_id}.metadata.json", "w") as fp:
-            json.dump(resp_dict, fp, indent=4)
-    else:
-        print(resp_dict["message"])
+    try:
+        metadata = run_with_client(server, port, lambda client: client.metadata(job_id))
+    except CromwellError as e:
+        print(e)
+        return
+    with open(f"{job_id}.metadata.json", "w") as fp:
+        json.dump(metadata, fp, indent=4)
 
 
 def main(argv):
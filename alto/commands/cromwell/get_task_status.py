@@ -1,64 +1,133 @@
 import json
+import time
 import argparse
 
-import requests
+from alto.utils.cromwell_utils import MetadataFetcher
+from alto.utils.output_utils import RecordWriter, is_structured_output
+
+
+status_categories = {
+    "NotStarted": "Queued",
+    "QueuedInCromwell": "Queued",
+    "WaitingForQueueSpace": "Queued",
+    "Starting": "Queued",
+    "Running": "Running",
+    "Aborting": "Running",
+    "Done": "Done",
+    "Failed": "Failed",
+    "Aborted": "Failed",
+    "Unstartable": "Failed",
+}
+summary_columns = ["Queued", "Running", "Done", "cached", "Failed", "Other"]
 
 
 class JobIDFetcher:
-    def __init__(self, server, port):
-        self.base_url = f"http://{server}:{port}/api/workflows/v1/"
-        self.workflow_jobs = {}
+    def __init__(self, server, port, max_workers=8):
+        self.fetcher = MetadataFetcher(
+            server,
+            port,
+            include_keys=["executionStatus", "jobId", "callCaching", "shardIndex", "attempt"],
+            max_workers=max_workers,
+        )
 
-    def get_metadata(self, job_id):
-        resp = requests.get(f"{self.base_url}{job_id}/metadata")
-        d = resp.json()
-        return d["calls"]
+    def is_cached(self, call):
+        if "callCaching" in call:
+            return call["callCaching"].get("hit", False)
+        return "jobId" not in call
 
     def get_workflow_status(self, job_id):
-        metadata = self.get_metadata(job_id)
-        for task_name in metadata.keys():
-            if "jobId" in metadata[task_name][0]:
-                jobID_status = self.get_jobID(task_name, metadata[task_name])
-            elif "subWorkflowId" in metadata[task_name][0]:
-                jobID_status = self.subworkflow_IDs(metadata[task_name])
+        """Return a dictionary mapping each task to {jobId: status}, merging calls of the same task
+        across subworkflows and shards. Statuses of calls without a backend job ID (e.g. cache
+        hits) are listed under 'cached'."""
+        workflow_jobs = {}
+        for _, task_name, call in self.fetcher.iter_calls(job_id):
+            task_status = workflow_jobs.setdefault(task_name, {})
+            if "jobId" in call:
+                task_status[call["jobId"]] = call["executionStatus"]
             else:
-                jobID_status = self.get_cached_status(task_name, metadata[task_name])
-            self.workflow_jobs.update(jobID_status)
-        return self.workflow_jobs
-
-    def get_jobID(self, task_name, task_metadata):
-        jobID_status = {}
-        task_status = {}
-        for job in task_metadata:
-            jobID_status[job["jobId"]] = job["executionStatus"]
-        task_status[task_name] = jobID_status
-        return task_status
-
-    def subworkflow_IDs(self, task_metadata):
-        subworkflow_status = {}
-        for sub_workflow in task_metadata:
-            task_status_temp = self.get_workflow_status(sub_workflow["subWorkflowId"])
-            for key, value in task_status_temp.items():
-                if key not in subworkflow_status.keys():
-                    subworkflow_status[key] = value
-                else:
-                    for key_temp, value_temp in value.items():
-                        subworkflow_status[key][key_temp] = value_temp
-        return subworkflow_status
-
-    def get_cached_status(self, task_name, task_metadata):
-        cached_status = []
-        task_status = {}
-        for job in task_metadata:
-            cached_status.append(job["executionStatus"])
-        task_status[task_name] = {"cached": cached_status}
-        return task_status
+                task_status.setdefault("cached", []).append(call["executionStatus"])
+        return workflow_jobs
+
+    def get_task_summary(self, job_id):
+        """Return status counts of each task, counting only the latest attempt of each shard."""
+        metadata_tree = self.fetcher.get_metadata_tree(job_id)
+        latest_calls = {}
+        for wf_id, task_name, call in self.fetcher.iter_calls(job_id, metadata_tree):
+            key = (wf_id, task_name, call.get("shardIndex", -1))
+            if key not in latest_calls or latest_calls[key].get("attempt", 1) < call.get(
+                "attempt", 1
+            ):
+                latest_calls[key] = call
+
+        summary = {}
+        for (_, task_name, _), call in latest_calls.items():
+            counts = summary.setdefault(task_name, dict.fromkeys(summary_columns, 0))
+            category = status_categories.get(call.get("executionStatus"), "Other")
+            if category == "Done" and self.is_cached(call):
+                category = "cached"
+            counts[category] += 1
+        return metadata_tree[job_id].get("status"), summary
 
     def get_task_status(self, job_id):  # returns a json file with the results
-        self.get_workflow_status(job_id)
-        print(json.dumps(self.workflow_jobs, indent=4))
-        #with open(f"{job_id}.task_status.json", "w") as fp:
-        #    json.dump(self.workflow_jobs, fp, indent=4)
+        workflow_jobs = self.get_workflow_status(job_id)
+        if is_structured_output():
+            writer = RecordWriter(["task", "backend_job_id", "status", "cached"])
+            writer.write_header()
+            for task_name, task_status in workflow_jobs.items():
+                for call_job_id, status in task_status.items():
+                    if call_job_id != "cached":
+                        writer.write(
+                            dict(
+                                task=task_name,
+                                backend_job_id=call_job_id,
+                                status=status,
+                                cached=False,
+                            )
+                        )
+                for status in task_status.get("cached", []):
+                    writer.write(dict(task=task_name, status=status, cached=True))
+            return
+        print(json.dumps(workflow_jobs, indent=4))
+
+    def show_task_summary(self, job_id, watch=None):
+        writer = None
+        if is_structured_output():
+            writer = RecordWriter(["id", "status", "task", "total"] + summary_columns)
+            writer.write_header()
+        while True:
+            status, summary = self.get_task_summary(job_id)
+            if writer is not None:
+                for task_name in sorted(summary.keys()):
+                    counts = summary[task_name]
+                    writer.write(
+                        dict(
+                            counts,
+                            id=job_id,
+                            status=status,
+                            task=task_name,
+                            total=sum(counts.values()),
+                        )
+                    )
+            else:
+                self.print_task_summary(job_id, status, summary)
+            if watch is None or job_id in self.fetcher.terminal_metadata:
+                break
+            time.sleep(watch)
+            if writer is None:
+                print()
+
+    def print_task_summary(self, job_id, status, summary):
+        print(f"Job {job_id} is in status {status}.")
+        print(
+            "{:<48} {:>8}".format("Task", "Total")
+            + "".join(f" {col:>8}" for col in summary_columns)
+        )
+        for task_name in sorted(summary.keys()):
+            counts = summary[task_name]
+            print(
+                "{:<48} {:>8}".format(task_name, sum(counts.values()))
+                + "".join(f" {counts[col]:>8}" for col in summary_columns)
+            )
 
 
 def main(argv):
@@ -86,8 +155,32 @@ def main(argv):
         required=True,
         help="Workflow ID returned in 'alto cromwell run' command.",
     )
+    parser.add_argument(
+        "--summary",
+        dest="summary",
+        action="store_true",
+        default=False,
+        help="Show a table of per-task counts of shards in each status instead of the full JSON.",
+    )
+    parser.add_argument(
+        "--watch",
+        dest="watch",
+        type=float,
+        action="store",
+        help="Show the summary table every <watch> seconds until the job finishes. Subworkflows already finished are not polled again.",
+    )
+    parser.add_argument(
+        "--max-workers",
+        dest="max_workers",
+        type=int,
+        default=8,
+        help="Maximum number of subworkflow metadata requests sent concurrently. The default is 8.",
+    )
 
     args = parser.parse_args(argv)
 
-    fetcher = JobIDFetcher(args.server, args.port)
-    fetcher.get_task_status(args.job_id)
+    fetcher = JobIDFetcher(args.server, args.port, max_workers=args.max_workers)
+    if args.summary or args.watch is not None:
+        fetcher.show_task_summary(args.job_id, watch=args.watch)
+    else:
+        fetcher.get_task_status(args.job_id)
@@ -1,13 +1,15 @@
 import time
 import getpass
 import argparse
-from datetime import datetime
-from typing import List, Optional
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
 
-import pandas as pd
-import requests
 from dateutil import parser
 
+from alto.utils.cromwell_client import iterate_with_client, run_with_client
+from alto.utils.job_index import JobIndex
+from alto.utils.output_utils import RecordWriter, is_structured_output
+
 
 def datetime_from_utc_to_local(utc_datetime: str) -> str:
     if not utc_datetime:
@@ -33,74 +35,152 @@ def show_one_job(s: str, status: str):
 
 
 def show_jobs(
-    df: pd.DataFrame,
+    jobs: Iterable[dict],
     num_shown: Optional[int],
 ) -> None:
-    if "creator" not in df.columns:
-        df["creator"] = ""
+    """Print jobs as they arrive. Timestamps are converted to local time only for printed rows."""
+    if is_structured_output():
+        write_job_records(jobs, num_shown)
+        return
+
     print(
         "{:<38} {:<16} {:<24} {:<13} {:<28} {:<28} {:<28}".format(
             "Job ID", "Creator", "Workflow", "Status", "Submitted", "Start", "End"
         )
     )
 
-    if num_shown is not None:
-        df = df[0:num_shown]
-
-    for _, row in df.iterrows():
+    for n, job in enumerate(jobs):
+        if num_shown is not None and n >= num_shown:
+            break
+        name = job.get("name")
+        if name is None:
+            name = (
+                "<parsing workflow>"
+                if job["status"] in ["Submitted", "Running"]
+                else "<failed before exec>"
+            )
         show_str = "{:<38} {:<16} {:<24} {:<13} {:<28} {:<28} {:<28}".format(
-            row["id"],
-            row["creator"],
-            row["name"] if row.get("name") is not None else "",
-            row["status"],
-            row["submission"],
-            row["start"],
-            row["end"],
+            job["id"],
+            job.get("labels", {}).get("creator", ""),
+            name,
+            job["status"],
+            datetime_from_utc_to_local(job.get("submission", "")),
+            datetime_from_utc_to_local(job.get("start", "")),
+            datetime_from_utc_to_local(job.get("end", "")),
         )
-        show_one_job(show_str, row["status"])
+        show_one_job(show_str, job["status"])
 
 
-def list_jobs(
-    server: str,
-    port: int,
+def write_job_records(jobs: Iterable[dict], num_shown: Optional[int]) -> None:
+    """Write one record per job as it arrives, with timestamps in UTC as given by Cromwell."""
+    writer = RecordWriter(["id", "creator", "name", "status", "submission", "start", "end"])
+    writer.write_header()
+    for n, job in enumerate(jobs):
+        if num_shown is not None and n >= num_shown:
+            break
+        writer.write(dict(job, creator=job.get("labels", {}).get("creator")))
+
+
+def datetime_from_local_to_utc(local_datetime: str) -> str:
+    """Convert a date/time string (local time if no time zone is given) to Cromwell's UTC format."""
+    dt = parser.parse(local_datetime)
+    if dt.tzinfo is None:
+        dt = dt.astimezone()
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def build_query(
     is_all: bool,
     username: str,
     job_statuses: List[str],
-    num_shown: Optional[int],
-) -> None:
+    names: Optional[List[str]] = None,
+    labels: Optional[List[str]] = None,
+    submitted_after: Optional[str] = None,
+    started_after: Optional[str] = None,
+    ended_before: Optional[str] = None,
+) -> List[dict]:
+    """Build the body of a Cromwell /query request, so that filtering is done by the server."""
     query_data = []
     query_data.append({"additionalQueryResultFields": "labels"})
     if not is_all:
-        query_data.append({"additionalQueryResultFields": "labels"})
         query_data.append({"label": f"creator:{username}"})
 
     for job_status in job_statuses:
         query_data.append({"status": job_status})
-    resp = requests.post(
-        f"http://{server}:{port}/api/workflows/v1/query",
-        json=query_data,
-    )
-    resp_dict = resp.json()
-    for res in resp_dict["results"]:
-        if "labels" in res:
-            res["creator"] = res["labels"].get("creator", "")
-            del res["labels"]
-        else:
-            res["creator"] = ""
-        res["submission"] = datetime_from_utc_to_local(res.get("submission", ""))
-        res["start"] = datetime_from_utc_to_local(res.get("start", ""))
-        res["end"] = datetime_from_utc_to_local(res.get("end", ""))
-    if resp.status_code == 200:
-        df_jobs = pd.DataFrame.from_records(resp_dict["results"])
-        if "name" in df_jobs:
-            df_jobs.loc[
-                (df_jobs["name"].isna()) & (df_jobs["status"].isin(["Submitted", "Running"])),
-                "name",
-            ] = "<parsing workflow>"
-            df_jobs["name"] = df_jobs["name"].fillna("<failed before exec>")
-        show_jobs(df_jobs, num_shown=num_shown)
+    for name in names or []:
+        query_data.append({"name": name})
+    for label in labels or []:
+        query_data.append({"label": label})
+    if submitted_after is not None:
+        query_data.append({"submission": datetime_from_local_to_utc(submitted_after)})
+    if started_after is not None:
+        query_data.append({"start": datetime_from_local_to_utc(started_after)})
+    if ended_before is not None:
+        query_data.append({"end": datetime_from_local_to_utc(ended_before)})
+    return query_data
+
+
+def query_job_ids(
+    server: str,
+    port: int,
+    username: Optional[str],
+    job_statuses: List[str],
+    names: Optional[List[str]] = None,
+    labels: Optional[List[str]] = None,
+) -> List[str]:
+    """Return IDs of all jobs matching the filters (from all users if username is None)."""
+    query_data = build_query(username is None, username, job_statuses, names=names, labels=labels)
+    jobs = run_with_client(server, port, lambda client: client.query(query_data))
+    return [job["id"] for job in jobs]
+
+
+def list_jobs(
+    server: str,
+    port: int,
+    is_all: bool,
+    username: str,
+    job_statuses: List[str],
+    num_shown: Optional[int],
+    names: Optional[List[str]] = None,
+    labels: Optional[List[str]] = None,
+    submitted_after: Optional[str] = None,
+    started_after: Optional[str] = None,
+    ended_before: Optional[str] = None,
+    use_index: bool = False,
+    refresh: bool = False,
+    index_path: Optional[str] = None,
+) -> None:
+    if use_index or refresh:
+        job_index = JobIndex(server, port, path=index_path)
+        if refresh or job_index.last_sync() is None:
+            job_index.sync()
+        jobs = job_index.query(
+            job_statuses,
+            creator=None if is_all else username,
+            names=names,
+            labels=labels,
+            submitted_after=(
+                datetime_from_local_to_utc(submitted_after) if submitted_after else None
+            ),
+            started_after=datetime_from_local_to_utc(started_after) if started_after else None,
+            ended_before=datetime_from_local_to_utc(ended_before) if ended_before else None,
+            num_shown=num_shown,
+        )
     else:
-        print(resp_dict["message"])
+        query_data = build_query(
+            is_all,
+            username,
+            job_statuses,
+            names=names,
+            labels=labels,
+            submitted_after=submitted_after,
+            started_after=started_after,
+            ended_before=ended_before,
+        )
+        jobs = iterate_with_client(
+            server, port, lambda client: client.iter_query(query_data, num_shown=num_shown)
+        )
+    show_jobs(jobs, num_shown=num_shown)
 
 
 def main(argv):
@@ -165,7 +245,60 @@ def main(argv):
         dest="num_shown",
         action="store",
         default=None,
-        help="Only show the <num_shown> most recent jobs.",
+        help="Only show the <num_shown> most recent jobs. It is also used as the page size of the server query.",
+    )
+    parser.add_argument(
+        "--name",
+        dest="names",
+        action="append",
+        default=[],
+        help="Only show jobs of this workflow name. Can be specified multiple times.",
+    )
+    parser.add_argument(
+        "--label",
+        dest="labels",
+        action="append",
+        default=[],
+        metavar="KEY:VALUE",
+        help="Only show jobs with this label. Can be specified multiple times.",
+    )
+    parser.add_argument(
+        "--submitted-after",
+        dest="submitted_after",
+        action="store",
+        help="Only show jobs submitted at or after this date/time (e.g. '2023-06-21' or '2023-06-21 13:00'). Local time zone is used if not specified.",
+    )
+    parser.add_argument(
+        "--started-after",
+        dest="started_after",
+        action="store",
+        help="Only show jobs started at or after this date/time.",
+    )
+    parser.add_argument(
+        "--ended-before",
+        dest="ended_before",
+        action="store",
+        help="Only show jobs ended at or before this date/time.",
+    )
+    parser.add_argument(
+        "--cache",
+        dest="use_index",
+        action="store_true",
+        default=False,
+        help="Answer the query from a local job index instead of the server. The index is synchronized with the server on first use.",
+    )
+    parser.add_argument(
+        "--refresh",
+        dest="refresh",
+        action="store_true",
+        default=False,
+        help="Synchronize the local job index with the server (only new and unfinished jobs are fetched) before answering the query. Implies --cache.",
+    )
+    parser.add_argument(
+        "--index",
+        dest="index_path",
+        action="store",
+        help="Path to the local job index. Defaults to cromwell_jobs.sqlite under $ALTO_CACHE_DIR (or ~/.cache/altocumulus).",
     )
 
     args = parser.parse_args(argv)
@@ -179,4 +312,19 @@ def main(argv):
     elif args.only_running:
         job_statuses.append("Running")
 
-    list_jobs(args.server, args.port, args.is_all, args.user, job_statuses, args.num_shown)
+    list_jobs(
+        args.server,
+        args.port,
+        args.is_all,
+        args.user,
+        job_statuses,
+        args.num_shown,
+        names=args.names,
+        labels=args.labels,
+        submitted_after=args.submitted_after,
+        started_after=args.started_after,
+        ended_before=args.ended_before,
+        use_index=args.use_index,
+        refresh=args.refresh,
+        index_path=args.index_path,
+    )
@@ -1,15 +1,16 @@
 import os
 import json
-import time
 import getpass
 import zipfile
 import argparse
-import tempfile
-
-import requests
+from urllib.parse import urlparse
 
 from alto.utils import get_dockstore_workflow, parse_dockstore_workflow
-from alto.utils.io_utils import get_workflow_imports, read_wdl_inputs, upload_to_cloud_bucket
+from alto.utils.cromwell_client import CromwellError, run_with_client
+from alto.utils.cromwell_utils import build_labels, build_workflow_options, terminal_statuses
+from alto.utils.io_utils import dump_wdl_inputs, read_wdl_inputs, upload_to_cloud_bucket
+from alto.utils.output_utils import RecordWriter, is_structured_output
+from alto.utils.wdl_utils import build_dependency_zip, build_prefetched_workflow
 
 
 def parse_bucket_folder_url(bucket):
@@ -28,27 +29,18 @@ def parse_bucket_folder_url(bucket):
 
 
 def wait_and_check(server, port, job_id, time_out, freq=60):
-    url = f"http://{server}:{port}/api/workflows/v1/{job_id}/status"
-
-    time_out_seconds = time_out * 3600
-    seconds_passed = 0
-    status = ""
-
-    while seconds_passed < time_out_seconds:
-        time.sleep(freq)
-        seconds_passed += freq
-        resp = requests.get(url)
-        resp_dict = resp.json()
-        if resp.status_code == 200:
-            if resp_dict["status"] in ["Succeeded", "Failed", "Aborted"]:
-                status = resp_dict["status"]
-                break
-        else:
-            print(resp_dict["message"])
-            break
+    try:
+        status = run_with_client(
+            server, port, lambda client: client.wait(job_id, interval=freq, time_out=time_out)
+        )
+    except CromwellError as e:
+        print(e)
+        return ""
 
-    if seconds_passed >= time_out_seconds:
-        print(f"{time_out}-hour time-out is reached!")
+    if status not in terminal_statuses:
+        if not is_structured_output():
+            print(f"{time_out}-hour time-out is reached!")
+        return ""
 
     return status
 
@@ -93,45 +85,41 @@ def submit_to_cromwell(
     time_out,
     profile,
     dependency_str,
+    prefetch_imports=False,
+    import_ttl=24.0,
+    workflow_options=None,
+    labels=None,
+    localize_remote=False,
 ):
-    files = dict()
-    data = dict()
-    label_dict = dict()
+    workflow_source = workflow_url = dependencies = None
+    workflow_name = "workflow.wdl"
+    label_dict = dict(labels or {})
 
     # Process job's workflow WDL
     workflow_str, is_url = parse_workflow_str(method_str, no_ssl_verify)
-    if is_url:
-        data["workflowUrl"] = workflow_str
+    if prefetch_imports:
+        # Download remote imports here, so that Cromwell does not fetch any URL.
+        workflow_source, dependencies = build_prefetched_workflow(
+            workflow_str, ttl=import_ttl, ssl_verify=not no_ssl_verify
+        )
+        workflow_name = os.path.basename(urlparse(workflow_str).path if is_url else workflow_str)
     else:
-        files["workflowSource"] = open(workflow_str, "rb")
-
-    tmp_zip_file = None
-    # Process workflow WDL's dependency
-    if dependency_str is not None:
-        if check_zip(dependency_str):
-            files["workflowDependencies"] = open(dependency_str, "rb")
+        if is_url:
+            workflow_url = workflow_str
         else:
-            raise Exception("Dependency zip file does not exist or is not given in zip format.")
-    elif not is_url:
-        deps = set()
-
-        def add_deps(path):
-            workflow_dir = os.path.dirname(path)
-            for d in get_workflow_imports(path):
-                imported_path = os.path.abspath(os.path.join(workflow_dir, d))
-                if os.path.exists(imported_path):
-                    deps.add(imported_path)
-                    add_deps(imported_path)
-
-        # add imports recursively
-        if os.path.exists(workflow_str):
-            add_deps(workflow_str)
-            if len(deps) > 0:
-                tmp_zip_file = tempfile.mkstemp(prefix="alto", suffix=".zip")[1]
-                with zipfile.ZipFile(tmp_zip_file, "w", zipfile.ZIP_DEFLATED) as out:
-                    for dep in deps:
-                        out.write(dep, arcname=os.path.basename(dep))
-                files["workflowDependencies"] = open(tmp_zip_file, "rb")
+            workflow_source = workflow_str  # streamed from the file by the client
+            workflow_name = os.path.basename(workflow_str)
+
+        # Process workflow WDL's dependency
+        if dependency_str is not None:
+            if check_zip(dependency_str):
+                dependencies = dependency_str
+            else:
+                raise Exception("Dependency zip file does not exist or is not given in zip format.")
+        elif not is_url:
+            # add imports recursively
+            if os.path.exists(workflow_str):
+                dependencies = build_dependency_zip(workflow_str)
 
     # Process job's workflow inputs
     inputs = read_wdl_inputs(wf_input_path)
@@ -146,66 +134,55 @@ def submit_to_cromwell(
             bucket_folder=bucket_folder,
             out_json=out_json,
             dry_run=False,
-            verbose=True if time_out is None else False,
+            verbose=time_out is None and not is_structured_output(),
             profile=profile,
+            localize_remote=localize_remote,
         )
 
-    files["workflowInputs"] = open(wf_input_path if out_json is None else out_json, "rb")
-
     # Add username to the job labels
     label_dict["creator"] = getpass.getuser()
 
-    wf_label_filename = tempfile.mkstemp(prefix="alto_wf_label_", suffix=".json")[1]
-    with open(wf_label_filename, "w") as fp:
-        json.dump(label_dict, fp)
-    files["labels"] = open(wf_label_filename, "rb")
-
-    wf_option_filename = None
     # Process job's workflow options.
+    wf_option_dict = dict(workflow_options or {})
     if no_cache:
-        wf_option_dict = {
-            "read_from_cache": False,
-        }
-        wf_option_filename = tempfile.mkstemp(prefix="alto_wf_option_", suffix=".json")[1]
-        with open(wf_option_filename, "w") as fp:
-            json.dump(wf_option_dict, fp)
-        files["workflowOptions"] = open(wf_option_filename, "rb")
+        wf_option_dict["read_from_cache"] = False
 
     # Send HTTP request to Cromwell server
     try:
-        resp = requests.post(
-            f"http://{server}:{port}/api/workflows/v1",
-            files=files,
-            data=data,
+        resp_dict = run_with_client(
+            server,
+            port,
+            lambda client: client.submit(
+                workflow_source=workflow_source,
+                workflow_url=workflow_url,
+                inputs=dump_wdl_inputs(inputs),
+                dependencies=dependencies,
+                options=wf_option_dict,
+                labels=label_dict,
+                workflow_name=workflow_name,
+            ),
         )
-    finally:
-        # Remove intermediate input files
-        if tmp_zip_file is not None and os.path.exists(tmp_zip_file):
-            os.remove(tmp_zip_file)
-        if os.path.exists(wf_label_filename):
-            os.remove(wf_label_filename)
-        if wf_option_filename is not None and os.path.exists(wf_option_filename):
-            os.remove(wf_option_filename)
-
-    # Process response
-    resp_dict = resp.json()
-    successful_submission = resp.status_code == 201
-    if successful_submission:
-        if time_out is None:  # Only print this message when --time-out is not set.
-            print(f"Job {resp_dict['id']} is submitted.")
-    else:
+    except CromwellError as e:
         import sys
 
-        print(resp_dict["message"])
+        print(e)
         sys.exit(-1)
 
+    status = resp_dict.get("status", "Submitted")
+    if time_out is None and not is_structured_output():
+        # Only print this message when --time-out is not set.
+        print(f"Job {resp_dict['id']} is submitted.")
+
     # Wait for job to complete
     if time_out is not None:
         status = wait_and_check(server, port, resp_dict["id"], time_out)
-        print(f"{{\"job_id\": \"{resp_dict['id']}\", \"status\": \"{status}\"}}")
+        if not is_structured_output():
+            print(json.dumps({"job_id": resp_dict["id"], "status": status}))
 
-    if successful_submission:
-        return resp_dict["id"]
+    if is_structured_output():
+        RecordWriter(["id", "status"]).write({"id": resp_dict["id"], "status": status})
+
+    return resp_dict["id"]
 
 
 def main(argv):
@@ -251,6 +228,20 @@ def main(argv):
               to resolve local imports. This zip bundle will be unpacked \
               in a sandbox accessible to the workflow.",
     )
+    parser.add_argument(
+        "--prefetch-imports",
+        dest="prefetch_imports",
+        action="store_true",
+        default=False,
+        help="Download the workflow and its HTTP/HTTPS imports (recursively) into a local cache, and submit them in the dependency zip with imports rewritten to relative paths, so that Cromwell does not fetch any URL. Cannot be used with -d.",
+    )
+    parser.add_argument(
+        "--import-ttl",
+        dest="import_ttl",
+        type=float,
+        default=24.0,
+        help="Hours after which a cached remote WDL file is downloaded again with --prefetch-imports. Use 'inf' for URLs pinned to a release or commit. If a download fails, the cached copy is used. The default is 24.",
+    )
     parser.add_argument(
         "-i",
         "--input",
@@ -276,12 +267,39 @@ def main(argv):
         help="Cloud bucket folder for uploading local input data. Start with 's3://' if an AWS S3 bucket is used, 'gs://' for a Google bucket. \
         Must be specified when '-o' option is used.",
     )
+    parser.add_argument(
+        "--localize-remote",
+        dest="localize_remote",
+        action="store_true",
+        default=False,
+        help="With -o, also copy inputs (and sample sheet entries) stored in other buckets of the same cloud provider into the bucket folder, by concurrent bucket-to-bucket copies without downloading them. This avoids cross-region egress and requester-pays reads by every task. Remote folders must end with '/'.",
+    )
     parser.add_argument(
         "--no-cache",
         dest="no_cache",
         action="store_true",
         help="Disable call-caching, i.e. do not read from cache.",
     )
+    parser.add_argument(
+        "--options",
+        dest="options_file",
+        action="store",
+        help="JSON file of Cromwell workflow options, e.g. final_workflow_outputs_dir, default_runtime_attributes or workflow_failure_mode.",
+    )
+    parser.add_argument(
+        "--option",
+        dest="options",
+        action="append",
+        metavar="KEY=VALUE",
+        help="Set a workflow option, overriding the one in --options. Use a dotted key to set a nested option, e.g. 'default_runtime_attributes.preemptible=2'. The value is parsed as JSON if possible, otherwise taken as a string. This option can be used multiple times.",
+    )
+    parser.add_argument(
+        "--label",
+        dest="labels",
+        action="append",
+        metavar="KEY=VALUE",
+        help="Add a label to the job. This option can be used multiple times. The 'creator' label is always set to the current user.",
+    )
     parser.add_argument(
         "--no-ssl-verify",
         dest="no_ssl_verify",
@@ -309,6 +327,19 @@ def main(argv):
     )
 
     args = parser.parse_args(argv)
+    if args.prefetch_imports and args.dependency_str is not None:
+        parser.error("--prefetch-imports cannot be used with -d.")
+    if args.localize_remote and args.out_json is None:
+        parser.error("--localize-remote requires -o.")
+    try:
+        workflow_options = build_workflow_options(
+            args.options_file,
+            args.options,
+            overrides={"read_from_cache": False} if args.no_cache else None,
+        )
+        labels = build_labels(args.labels)
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
 
     job_id = submit_to_cromwell(
         args.server,
@@ -322,6 +353,11 @@ def main(argv):
         args.time_out,
         args.profile,
         args.dependency_str,
+        prefetch_imports=args.prefetch_imports,
+        import_ttl=args.import_ttl,
+        workflow_options=workflow_options,
+        labels=labels,
+        localize_remote=args.localize_remote,
     )
     if args.job_id is not None:
         with open(args.job_id, "wt") as f:
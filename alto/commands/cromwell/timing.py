@@ -1,18 +1,226 @@
 import argparse
 
-import requests
+import numpy as np
+import pandas as pd
+
+from alto.utils.cromwell_client import CromwellError, run_with_client
+from alto.utils.cromwell_utils import MetadataFetcher
 
 
 def get_timing(server, port, job_id, output_file):
-    resp = requests.get(f"http://{server}:{port}/api/workflows/v1/{job_id}/timing")
+    try:
+        html = run_with_client(server, port, lambda client: client.timing(job_id))
+    except CromwellError:
+        print("Invalid response from server")
+        return
+    if output_file is None:
+        output_file = job_id + ".html"
+    with open(output_file, "wt") as out:
+        out.write(html)
+
+
+def _event_seconds(events, keyword, exclude=None):
+    seconds = 0.0
+    for event in events:
+        description = event.get("description", "")
+        if keyword in description and (exclude is None or exclude not in description):
+            seconds += (event["endTime"] - event["startTime"]).total_seconds()
+    return seconds
+
+
+def get_call_timings(server, port, job_id, max_workers=8) -> pd.DataFrame:
+    """Return one row per task call (including calls inside subworkflows) with its start/end time
+    and the time spent in queueing, localization, running and delocalization.
+
+    Queueing is the time from the call start to the start of its 'RunningJob' event. Localization
+    and delocalization come from backend events containing these words, and running is the rest
+    of the 'RunningJob' event (or of the call, if the backend reports no such event).
+    """
+    fetcher = MetadataFetcher(
+        server,
+        port,
+        include_keys=[
+            "start",
+            "end",
+            "executionEvents",
+            "executionStatus",
+            "shardIndex",
+            "attempt",
+        ],
+        max_workers=max_workers,
+    )
+    records = []
+    for wf_id, task_name, call in fetcher.iter_calls(job_id):
+        if "start" not in call:
+            continue
+        events = [
+            dict(
+                description=event.get("description", ""),
+                startTime=pd.Timestamp(event["startTime"]),
+                endTime=pd.Timestamp(event["endTime"]),
+            )
+            for event in call.get("executionEvents", [])
+            if "startTime" in event and "endTime" in event
+        ]
+        start = pd.Timestamp(call["start"])
+        end = pd.Timestamp(call["end"]) if "end" in call else pd.Timestamp.now(tz=start.tz)
+        running_events = [event for event in events if event["description"] == "RunningJob"]
+        localization = _event_seconds(events, "Localization", exclude="Delocalization")
+        delocalization = _event_seconds(events, "Delocalization")
+        if len(running_events) > 0:
+            queueing = (running_events[0]["startTime"] - start).total_seconds()
+            running = sum(
+                (event["endTime"] - event["startTime"]).total_seconds() for event in running_events
+            )
+            running = max(running - localization - delocalization, 0.0)
+        else:
+            queueing = 0.0
+            running = (end - start).total_seconds()
+        records.append(
+            dict(
+                workflow_id=wf_id,
+                task=task_name,
+                shard=call.get("shardIndex", -1),
+                attempt=call.get("attempt", 1),
+                status=call.get("executionStatus", ""),
+                start=start,
+                end=end,
+                duration=(end - start).total_seconds(),
+                queueing=max(queueing, 0.0),
+                localization=localization,
+                running=running,
+                delocalization=delocalization,
+            )
+        )
+    df = pd.DataFrame.from_records(records)
+    if df.shape[0] > 0:
+        df = df.sort_values("start", ignore_index=True)
+    return df
+
 
-    if resp.status_code == 200:
-        if output_file is None:
-            output_file = job_id + ".html"
-        with open(output_file, "wt") as out:
-            out.write(resp.text)
+def find_critical_path(df: pd.DataFrame) -> list:
+    """Return row indices of df along the critical path, from first to last.
+
+    Call dependencies are not part of the metadata, so the path is traced back from the call that
+    ends last, each time stepping to the call that ended last before the current call started.
+    Every step goes to a call earlier in the order of end times, so zero-length calls (e.g. cache
+    hits) cannot be picked twice.
+    """
+    if df.shape[0] == 0:
+        return []
+    order = np.argsort(df["end"].values, kind="stable")
+    ends = df["end"].values[order]
+    starts = df["start"].values
+    pos = len(order) - 1
+    path = [order[pos]]
+    while True:
+        pos = min(np.searchsorted(ends, starts[order[pos]], side="right"), pos) - 1
+        if pos < 0:
+            break
+        path.append(order[pos])
+    return [df.index[i] for i in reversed(path)]
+
+
+def summarize_timings(df: pd.DataFrame, critical_path: list) -> pd.DataFrame:
+    """Summarize call timings per task, with shard duration percentiles in seconds."""
+    df = df.assign(critical_path=df["duration"].where(df.index.isin(critical_path), 0.0))
+    grouped = df.groupby("task", sort=False)
+    summary = pd.DataFrame(
+        {
+            "n_calls": grouped.size(),
+            "first_start": grouped["start"].min(),
+            "last_end": grouped["end"].max(),
+            "queueing_mean": grouped["queueing"].mean(),
+            "localization_mean": grouped["localization"].mean(),
+            "running_mean": grouped["running"].mean(),
+            "delocalization_mean": grouped["delocalization"].mean(),
+            "duration_p50": grouped["duration"].quantile(0.5),
+            "duration_p90": grouped["duration"].quantile(0.9),
+            "duration_max": grouped["duration"].max(),
+            "critical_path_seconds": grouped["critical_path"].sum(),
+        }
+    )
+    numeric_columns = summary.columns[3:]
+    summary[numeric_columns] = summary[numeric_columns].round(1)
+    return summary.sort_values("first_start").reset_index()
+
+
+def plot_gantt(df: pd.DataFrame, critical_path: list, plot_filename: str, max_rows: int = 200):
+    """Draw a Gantt chart of calls. If there are more than max_rows calls, calls of the same task
+    are drawn on one row."""
+    import matplotlib.pyplot as plt
+
+    origin = df["start"].min()
+    starts = (df["start"] - origin).dt.total_seconds().values / 60.0
+    durations = df["duration"].values / 60.0
+    queueing = df["queueing"].values / 60.0
+
+    per_call = df.shape[0] <= max_rows
+    if per_call:
+        labels = [
+            f"{task} ({shard})" if shard >= 0 else task
+            for task, shard in zip(df["task"], df["shard"])
+        ]
+        rows = np.arange(df.shape[0])
     else:
-        print("Invalid response from server")
+        labels = list(dict.fromkeys(df["task"]))
+        row_of_task = {task: i for i, task in enumerate(labels)}
+        rows = df["task"].map(row_of_task).values
+
+    fig, ax = plt.subplots(figsize=(12, max(2, 0.25 * len(labels) + 1)))
+    alpha = 1.0 if per_call else 0.3
+    ax.barh(rows, queueing, left=starts, height=0.8, color="lightgrey", alpha=alpha)
+    ax.barh(
+        rows,
+        durations - queueing,
+        left=starts + queueing,
+        height=0.8,
+        color="tab:blue",
+        alpha=alpha,
+    )
+    on_path = df.index.isin(critical_path)
+    ax.barh(
+        rows[on_path],
+        durations[on_path] - queueing[on_path],
+        left=starts[on_path] + queueing[on_path],
+        height=0.8,
+        color="tab:red",
+    )
+    ax.set_yticks(np.arange(len(labels)))
+    ax.set_yticklabels(labels, fontsize=8)
+    ax.invert_yaxis()
+    ax.set_xlabel("Elapsed Minutes")
+    ax.set_title("Queueing (grey), execution (blue) and critical path (red)")
+    fig.tight_layout()
+    fig.savefig(plot_filename)
+    plt.close(fig)
+
+
+def analyze_timing(
+    server, port, job_id, tsv_file=None, plot_file=None, max_rows=200, max_workers=8
+):
+    df = get_call_timings(server, port, job_id, max_workers=max_workers)
+    if df.shape[0] == 0:
+        print("No task call has started yet.")
+        return
+
+    critical_path = find_critical_path(df)
+    summary = summarize_timings(df, critical_path)
+    if tsv_file is not None:
+        summary.to_csv(tsv_file, sep="\t", index=False)
+    if plot_file is not None:
+        plot_gantt(df, critical_path, plot_file, max_rows=max_rows)
+
+    total = (df["end"].max() - df["start"].min()).total_seconds()
+    print(f"Critical path ({total / 60:.1f} minutes from first call start to last call end):")
+    for idx in critical_path:
+        row = df.loc[idx]
+        shard = f" ({row['shard']})" if row["shard"] >= 0 else ""
+        print(
+            f"  {row['task']}{shard}: {row['duration'] / 60:.1f} min "
+            f"(queueing {row['queueing'] / 60:.1f}, localization {row['localization'] / 60:.1f}, "
+            f"running {row['running'] / 60:.1f}, delocalization {row['delocalization'] / 60:.1f})"
+        )
 
 
 def main(argv):
@@ -45,9 +253,47 @@ def main(argv):
         "--output",
         dest="output",
         action="store",
-        help="HTML file to save timing diagram. Defaults to <job_id>.html",
+        help="HTML file to save timing diagram. Defaults to <job_id>.html unless --tsv or --plot is set.",
+    )
+    parser.add_argument(
+        "--tsv",
+        dest="tsv",
+        action="store",
+        help="Analyze call timings from the job metadata, and write a per-task summary (queueing, localization and running time, shard duration percentiles and time on the critical path) to this TSV file.",
+    )
+    parser.add_argument(
+        "--plot",
+        dest="plot",
+        action="store",
+        help="Analyze call timings from the job metadata, and draw a Gantt chart of calls to this image file.",
+    )
+    parser.add_argument(
+        "--max-rows",
+        dest="max_rows",
+        type=int,
+        default=200,
+        help="If a job has more calls than this, calls of the same task are drawn on one row of the Gantt chart. The default is 200.",
+    )
+    parser.add_argument(
+        "--max-workers",
+        dest="max_workers",
+        type=int,
+        default=8,
+        help="Maximum number of subworkflow metadata requests sent concurrently. The default is 8.",
     )
 
     args = parser.parse_args(argv)
 
+    if args.tsv is not None or args.plot is not None:
+        analyze_timing(
+            args.server,
+            args.port,
+            args.job_id,
+            tsv_file=args.tsv,
+            plot_file=args.plot,
+            max_rows=args.max_rows,
+            max_workers=args.max_workers,
+        )
+        if args.output is None:
+            return
     get_timing(args.server, args.port, args.job_id, args.output)
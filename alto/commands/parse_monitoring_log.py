@@ -1,6 +1,11 @@
+import os
+import json
+import time
 import argparse
+from datetime import datetime
 from pathlib import Path
 
+import numpy as np
 import fsspec
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -28,12 +33,100 @@ def main(argv):
         required=False,
         help="Optional filename to create a plot of utilization vs. time for each task",
     )
+    parser.add_argument(
+        "--recommend",
+        dest="recommend",
+        action="store",
+        required=False,
+        help="Optional filename to write a TSV table of recommended cpu, memory and disk runtime attributes for each task",
+    )
+    parser.add_argument(
+        "--recommend-json",
+        dest="recommend_json",
+        action="store",
+        required=False,
+        help="Optional filename to write the recommended runtime attributes as an inputs JSON overlay",
+    )
+    parser.add_argument(
+        "--json-prefix",
+        dest="json_prefix",
+        action="store",
+        default="",
+        help="Prefix (e.g. workflow name followed by a dot) added to every key of the inputs JSON overlay",
+    )
+    parser.add_argument(
+        "--percentile",
+        dest="percentile",
+        type=float,
+        default=95.0,
+        help="Percentile of peak usage across shards and runs used for recommendation. The default is 95.",
+    )
+    parser.add_argument(
+        "--headroom",
+        dest="headroom",
+        type=float,
+        default=0.2,
+        help="Fraction added on top of the percentile of peak usage. The default is 0.2, i.e. 20%%.",
+    )
+    parser.add_argument(
+        "--state",
+        dest="state",
+        action="store",
+        required=False,
+        help="Incremental mode: remember per-file byte offsets and partial results in this state file, and only read newly appended bytes on the next run",
+    )
+    parser.add_argument(
+        "--follow",
+        dest="follow",
+        type=float,
+        required=False,
+        help="Incremental mode: refresh the report every <follow> seconds until interrupted",
+    )
     args = parser.parse_args(argv)
-    execute(args.path, args.report, args.plot)
+    execute(
+        args.path,
+        args.report,
+        args.plot,
+        recommend_filename=args.recommend,
+        recommend_json_filename=args.recommend_json,
+        json_prefix=args.json_prefix,
+        percentile=args.percentile,
+        headroom=args.headroom,
+        state_filename=args.state,
+        follow=args.follow,
+    )
 
 
-def execute(input_path, report_filename, plot_filename=None):
+def execute(
+    input_path,
+    report_filename,
+    plot_filename=None,
+    recommend_filename=None,
+    recommend_json_filename=None,
+    json_prefix="",
+    percentile=95.0,
+    headroom=0.2,
+    state_filename=None,
+    follow=None,
+):
+    recommend = recommend_filename is not None or recommend_json_filename is not None
     generate_plot = plot_filename is not None
+    if generate_plot and (state_filename is not None or follow is not None):
+        raise ValueError("Plotting is not supported in incremental mode")
+    if state_filename is not None or follow is not None:
+        execute_incremental(
+            input_path,
+            report_filename,
+            state_filename=state_filename,
+            follow=follow,
+            recommend_filename=recommend_filename,
+            recommend_json_filename=recommend_json_filename,
+            json_prefix=json_prefix,
+            percentile=percentile,
+            headroom=headroom,
+        )
+        return
+
     if generate_plot:
         from pandas.plotting import register_matplotlib_converters
 
@@ -63,7 +156,7 @@ def execute(input_path, report_filename, plot_filename=None):
             scheme + "://" + log_path,
             details=generate_plot,
         )
-        if is_dir:
+        if is_dir or recommend:
             task, shard = get_task_and_shard(log_path)
             result["task"] = task
             result["shard"] = shard
@@ -74,10 +167,162 @@ def execute(input_path, report_filename, plot_filename=None):
         del result["details"]
 
         results.append(result)
-    pd.DataFrame(results).to_csv(report_filename, sep="\t", index=False)
     if generate_plot:
         fig.tight_layout()
         fig.savefig(plot_filename)
+    write_report(
+        results,
+        report_filename,
+        recommend_filename=recommend_filename,
+        recommend_json_filename=recommend_json_filename,
+        json_prefix=json_prefix,
+        percentile=percentile,
+        headroom=headroom,
+    )
+
+
+def write_report(
+    results,
+    report_filename,
+    recommend_filename=None,
+    recommend_json_filename=None,
+    json_prefix="",
+    percentile=95.0,
+    headroom=0.2,
+):
+    df = pd.DataFrame(results)
+    df.to_csv(report_filename, sep="\t", index=False)
+    if recommend_filename is not None or recommend_json_filename is not None:
+        df_rec = recommend_resources(df, percentile=percentile, headroom=headroom)
+        if recommend_filename is not None:
+            df_rec.to_csv(recommend_filename, sep="\t", index=False)
+        if recommend_json_filename is not None:
+            with open(recommend_json_filename, "w") as fout:
+                json.dump(recommendation_to_inputs(df_rec, prefix=json_prefix), fout, indent=4)
+
+
+def execute_incremental(
+    input_path,
+    report_filename,
+    state_filename=None,
+    follow=None,
+    **report_kwargs,
+):
+    """Only read bytes appended to monitoring logs since the last run.
+
+    Per-file byte offsets and partial aggregates are kept in state_filename (if given) across runs.
+    If follow is set, refresh the report every follow seconds until interrupted.
+    """
+    state = load_state(state_filename)
+    while True:
+        results = update_state(input_path, state)
+        if state_filename is not None:
+            save_state(state, state_filename)
+        write_report(results, report_filename, **report_kwargs)
+        if follow is None:
+            break
+        print(
+            f"[{datetime.now().strftime('%H:%M:%S')}] Updated {report_filename} from {len(results)} monitoring logs."
+        )
+        try:
+            time.sleep(follow)
+        except KeyboardInterrupt:
+            break
+
+
+def load_state(state_filename):
+    if state_filename is not None and os.path.exists(state_filename):
+        with open(state_filename, "r") as f:
+            return json.load(f)
+    return {"files": {}}
+
+
+def save_state(state, state_filename):
+    tmp_filename = f"{state_filename}.tmp"
+    with open(tmp_filename, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_filename, state_filename)
+
+
+def update_state(input_path, state):
+    scheme = _get_scheme(input_path)
+    fs = fsspec.filesystem(scheme)
+
+    is_dir = fs.isdir(input_path)
+    if is_dir:
+        input_path = input_path.rstrip(fs.sep)
+        log_infos = fs.glob(f"{input_path}{fs.sep}**{fs.sep}monitoring.log", detail=True)
+        if len(log_infos) == 0:
+            raise ValueError("No monitoring.log files found")
+    else:
+        log_infos = {input_path: fs.info(input_path)}
+
+    results = []
+    for log_path, info in log_infos.items():
+        file_state = state["files"].get(log_path)
+        size = info.get("size")
+        if file_state is None or (size is not None and size < file_state["offset"]):
+            file_state = _new_log_state()  # new or truncated file
+            state["files"][log_path] = file_state
+        if size is None or size > file_state["offset"]:
+            with fs.open(log_path, "rb") as f:
+                f.seek(file_state["offset"])
+                data = f.read()
+            end = data.rfind(b"\n") + 1  # only consume complete lines
+            for line in data[:end].decode().splitlines():
+                _update_log_result(file_state, line.strip(), None)
+            file_state["offset"] += end
+
+        result = _finalize_log_result(file_state)
+        result["task"], result["shard"] = get_task_and_shard(log_path)
+        results.append(result)
+    return results
+
+
+def recommend_resources(df, percentile=95.0, headroom=0.2):
+    """Recommend cpu, memory (GB) and disk (GB) runtime attributes for each task.
+
+    Peak usage of each log is converted to absolute units, the given percentile is computed per task
+    across all shards and runs, and headroom is added on top before rounding up.
+    """
+    usage = pd.DataFrame(
+        {
+            "task": df["task"],
+            "cpu": df["max_cpu_percent"] / 100.0 * df["cpus"].astype(float),
+            "memory": df["max_memory_percent"] / 100.0 * df["total_memory"].astype(float),
+            "disk": df["max_disk_percent"] / 100.0 * df["total_disk"].astype(float),
+            "provisioned_cpu": df["cpus"].astype(float),
+            "provisioned_memory": df["total_memory"].astype(float),
+            "provisioned_disk": df["total_disk"].astype(float),
+        }
+    )
+    grouped = usage.groupby("task", sort=True)
+    attrs = ["cpu", "memory", "disk"]
+    peaks = grouped[attrs].quantile(percentile / 100.0)
+    provisioned = grouped[[f"provisioned_{attr}" for attr in attrs]].max()
+    recommended = np.ceil(peaks * (1.0 + headroom))
+    recommended["cpu"] = recommended["cpu"].clip(lower=1)
+
+    results = pd.DataFrame({"n_logs": grouped.size()})
+    pct = f"{percentile:g}"
+    for attr in attrs:
+        results[f"{attr}_p{pct}"] = peaks[attr].round(2)
+        results[f"provisioned_{attr}"] = provisioned[f"provisioned_{attr}"]
+        results[f"recommended_{attr}"] = recommended[attr]
+    return results.reset_index()
+
+
+def recommendation_to_inputs(df_rec, prefix=""):
+    """Convert recommended runtime attributes into an inputs JSON overlay."""
+    inputs = dict()
+    for row in df_rec.itertuples(index=False):
+        if not pd.isna(row.recommended_cpu):
+            inputs[f"{prefix}{row.task}.cpu"] = int(row.recommended_cpu)
+        if not pd.isna(row.recommended_memory):
+            inputs[f"{prefix}{row.task}.memory"] = f"{int(row.recommended_memory)}G"
+        if not pd.isna(row.recommended_disk):
+            inputs[f"{prefix}{row.task}.disk"] = int(row.recommended_disk)
+    return inputs
 
 
 def _figsize(nrow=1, ncol=1, aspect=1, size=3):
@@ -107,68 +352,89 @@ def get_task_and_shard(log_path):
     return task_name, shard_name
 
 
-def parse_log(path, details=True) -> dict:
-    max_memory_percent = 0
-    max_cpu_percent = 0
-    max_disk_percent = 0
+def _new_log_state() -> dict:
+    return dict(
+        offset=0,
+        max_memory_percent=0,
+        max_cpu_percent=0,
+        max_disk_percent=0,
+        cpus=None,
+        total_memory=None,
+        total_disk=None,
+        first_time=None,
+        last_time=None,
+    )
 
-    cpus = None
-    total_memory = None
-    total_disk = None
-    elapsed_minutes = 0
 
-    # details
-    times = []
-    cpu_values = []
-    memory_values = []
-    disk_values = []
+def _update_log_result(result, line, details):
+    """Update the partial aggregates in result (and details if not None) with one log line."""
+    if line.startswith("[") and line.endswith("]"):
+        # e.g. [Tue Jan 24 17:34:29 UTC 2023]
+        log_time = parse(line[1:-1])
+        if result["first_time"] is None:
+            result["first_time"] = log_time.isoformat()
+        result["last_time"] = log_time.isoformat()
+        if details is not None:
+            details["times"].append(log_time)
+    if line.startswith("* CPU usage:"):
+        value = float(line[line.index(":") + 1 : len(line) - 1])
+        if details is not None:
+            details["cpu"].append(value)
+        result["max_cpu_percent"] = max(result["max_cpu_percent"], value)
+    elif line.startswith("* Memory usage:"):
+        value = float(line[line.index(":") + 1 : len(line) - 1])
+        if details is not None:
+            details["memory"].append(value)
+        result["max_memory_percent"] = max(result["max_memory_percent"], value)
+    elif line.startswith("* Disk usage:"):
+        value = line[line.index(":") + 1 : len(line) - 1]
+        if value != "":
+            value = float(value)
+            if details is not None:
+                details["disk"].append(value)
+            result["max_disk_percent"] = max(result["max_disk_percent"], value)
+    elif line.startswith("#CPU"):
+        result["cpus"] = int(line[line.index(":") + 1 : len(line)])
+    elif line.startswith("Total Memory:"):
+        result["total_memory"] = float(line[line.index(":") + 1 : len(line) - 1])
+    elif line.startswith("Total Disk space:"):
+        value = line[line.index(":") + 1 : len(line) - 1]
+        if value != "":
+            result["total_disk"] = float(value)
 
-    with fsspec.open(path, "rt") as f:
-        for line in f:
-            line = line.strip()
-            if line.startswith("[") and line.endswith("]"):
-                # e.g. [Tue Jan 24 17:34:29 UTC 2023]
-                times.append(parse(line[1:-1]))
-            if line.startswith("* CPU usage:"):
-                value = float(line[line.index(":") + 1 : len(line) - 1])
-                if details:
-                    cpu_values.append(value)
-                max_cpu_percent = max(max_cpu_percent, value)
-            elif line.startswith("* Memory usage:"):
-                value = float(line[line.index(":") + 1 : len(line) - 1])
-                if details:
-                    memory_values.append(value)
-                max_memory_percent = max(max_memory_percent, value)
-            elif line.startswith("* Disk usage:"):
-                value = line[line.index(":") + 1 : len(line) - 1]
-                if value != "":
-                    value = float(value)
-                    if details:
-                        disk_values.append(value)
-                    max_disk_percent = max(max_disk_percent, value)
-            elif line.startswith("#CPU"):
-                cpus = int(line[line.index(":") + 1 : len(line)])
-            elif line.startswith("Total Memory:"):
-                total_memory = float(line[line.index(":") + 1 : len(line) - 1])
-            elif line.startswith("Total Disk space:"):
-                value = line[line.index(":") + 1 : len(line) - 1]
-                if value != "":
-                    total_disk = float(value)
-    if len(times) >= 2:
-        elapsed_minutes = ((times[-1] - times[0]).total_seconds()) / 60
+
+def _finalize_log_result(result) -> dict:
+    elapsed_minutes = 0
+    if result["first_time"] is not None and result["first_time"] != result["last_time"]:
+        elapsed = datetime.fromisoformat(result["last_time"]) - datetime.fromisoformat(
+            result["first_time"]
+        )
+        elapsed_minutes = elapsed.total_seconds() / 60
 
     return dict(
-        max_memory_percent=max_memory_percent,
-        max_cpu_percent=max_cpu_percent,
-        max_disk_percent=max_disk_percent,
-        cpus=cpus,
-        total_memory=total_memory,
-        total_disk=total_disk,
+        max_memory_percent=result["max_memory_percent"],
+        max_cpu_percent=result["max_cpu_percent"],
+        max_disk_percent=result["max_disk_percent"],
+        cpus=result["cpus"],
+        total_memory=result["total_memory"],
+        total_disk=result["total_disk"],
         elapsed_minutes=elapsed_minutes,
-        details=dict(times=times, cpu=cpu_values, memory=memory_values, disk=disk_values),
     )
 
 
+def parse_log(path, details=True) -> dict:
+    result = _new_log_state()
+    log_details = dict(times=[], cpu=[], memory=[], disk=[])
+
+    with fsspec.open(path, "rt") as f:
+        for line in f:
+            _update_log_result(result, line.strip(), log_details if details else None)
+
+    result = _finalize_log_result(result)
+    result["details"] = log_details
+    return result
+
+
 def plot_single_task(result, ax):
     cpu_str = "{:.0f}/{} ({:.0f}%)".format(
         result["max_cpu_percent"] / 100 * result["cpus"], result["cpus"], result["max_cpu_percent"]
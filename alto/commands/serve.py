@@ -0,0 +1,193 @@
+import io
+import os
+import sys
+import json
+import signal
+import socket
+import argparse
+import threading
+import traceback
+import socketserver
+from contextlib import redirect_stderr, redirect_stdout
+
+from alto.commands import cromwell
+from alto.daemon import forwarded_environment, get_socket_path, is_forwarded, send_message
+from alto.utils.cromwell_client import ClientPool, set_client_pool
+from alto.utils.output_utils import set_output_format
+
+
+class ClientDisconnected(BaseException):
+    """Raised when writing the output of a command to a client that is gone, to stop the command.
+
+    Like SystemExit, it is not an Exception, so that it is not caught by the command itself.
+    """
+
+
+class _MessageStream(io.TextIOBase):
+    """Text stream sending everything written to it to the client as ``{key: text}`` messages."""
+
+    def __init__(self, wfile, key: str):
+        self.wfile = wfile
+        self.key = key
+        self.connected = True
+
+    def writable(self):
+        return True
+
+    def write(self, s: str) -> int:
+        if not s:
+            return 0
+        if not self.connected:
+            raise ClientDisconnected()
+        try:
+            send_message(self.wfile, {self.key: s})
+        except OSError as e:  # the client is gone, so is the command
+            self.connected = False
+            raise ClientDisconnected() from e
+        return len(s)
+
+
+def _set_environment(env: dict) -> None:
+    """Set the variables of forwarded_environment given in env, unsetting those that are None."""
+    for key in forwarded_environment:
+        if key not in env:
+            continue
+        if env[key] is None:
+            os.environ.pop(key, None)
+        else:
+            os.environ[key] = env[key]
+
+
+def run_forwarded_command(request: dict, stdout: io.TextIOBase, stderr: io.TextIOBase) -> int:
+    """Run the command of a request in the working directory, output format and environment of
+    the client, writing its output to stdout and stderr, and return its exit code.
+
+    ClientDisconnected is raised out of the command as soon as it writes to a client that is gone.
+    """
+    argv = request["argv"]
+    if not is_forwarded(argv):
+        stderr.write(f"Command '{' '.join(argv[:2])}' cannot be run by the alto daemon.\n")
+        return 1
+
+    cwd = os.getcwd()
+    env = {key: os.environ.get(key) for key in forwarded_environment}
+    try:
+        _set_environment(request.get("env", {}))
+        os.chdir(request["cwd"])
+        set_output_format(request.get("output", "text"))
+        sys.argv[0] = f"alto {argv[0]}"
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                cromwell.main(argv[1:])
+            except SystemExit as e:  # e.g. raised by argparse
+                if e.code is None or isinstance(e.code, int):
+                    return e.code or 0
+                print(e.code, file=sys.stderr)
+                return 1
+            except Exception:
+                traceback.print_exc()
+                return 1
+        return 0
+    except (OSError, ValueError) as e:  # unknown working directory or output format
+        stderr.write(f"{e}\n")
+        return 1
+    finally:
+        os.chdir(cwd)
+        set_output_format("text")
+        _set_environment(env)
+
+
+class CommandHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            return
+        stdout = _MessageStream(self.wfile, "stdout")
+        stderr = _MessageStream(self.wfile, "stderr")
+        try:
+            # Commands change the working directory, output format and sys.stdout of the process.
+            with self.server.command_lock:
+                exit_code = run_forwarded_command(request, stdout, stderr)
+            send_message(self.wfile, {"exit": exit_code})
+        except (ClientDisconnected, OSError):
+            pass
+
+
+class CommandServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server running alto commands sent by :func:`alto.daemon.forward_command`.
+
+    Commands run in this process one at a time, sharing its imported modules and, through a
+    :class:`ClientPool`, open connections to Cromwell servers.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str):
+        self.command_lock = threading.Lock()
+        super().__init__(socket_path, CommandHandler)
+
+
+def is_running(socket_path: str) -> bool:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def serve(socket_path: str, max_connections: int = 16) -> None:
+    if os.path.exists(socket_path):
+        if is_running(socket_path):
+            raise ValueError(f"An alto daemon is already listening on {socket_path}!")
+        os.remove(socket_path)
+    os.makedirs(os.path.dirname(os.path.abspath(socket_path)), exist_ok=True)
+
+    pool = ClientPool(max_connections=max_connections)
+    set_client_pool(pool)
+    old_umask = os.umask(0o077)  # only the user can connect to the socket
+    try:
+        server = CommandServer(socket_path)
+    finally:
+        os.umask(old_umask)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"alto daemon is listening on {socket_path}.", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        set_client_pool(None)
+        pool.close()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description="Run a local daemon that runs alto commands sent by other alto processes of the same user, so that they do not pay for starting Python, importing modules and connecting to servers. While it is running, 'alto cromwell check_status', 'abort', 'list_jobs', 'get_task_status', 'get_metadata' and 'timing' are forwarded to it. Set ALTO_NO_DAEMON to run them locally."
+    )
+    parser.add_argument(
+        "--socket",
+        dest="socket_path",
+        action="store",
+        default=get_socket_path(),
+        help="Path of the Unix socket. The default is $ALTO_SOCKET if set, otherwise alto.sock under $ALTO_CACHE_DIR (or ~/.cache/altocumulus). Clients use the same default.",
+    )
+    parser.add_argument(
+        "--max-connections",
+        dest="max_connections",
+        type=int,
+        default=16,
+        help="Maximum number of connections kept open to each Cromwell server. The default is 16.",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        serve(args.socket_path, max_connections=args.max_connections)
+    except ValueError as e:
+        parser.error(str(e))
@@ -1,7 +1,7 @@
 import sys
 import argparse
 
-from . import add_method, remove_method, run, storage_estimate
+from . import add_method, remove_method, run, storage_estimate, watch
 
 
 def main(args):
@@ -10,13 +10,14 @@ def main(args):
         "add_method": add_method,
         "remove_method": remove_method,
         "storage_estimate": storage_estimate,
+        "watch": watch,
     }
 
     parser = argparse.ArgumentParser(description="Run a terra sub-command.")
     parser.add_argument(
         "subcommand",
         help="The sub-command",
-        choices=["run", "add_method", "remove_method", "storage_estimate"],
+        choices=["run", "add_method", "remove_method", "storage_estimate", "watch"],
     )
     parser.add_argument(
         "subcommand_args", help="The sub-command arguments", nargs=argparse.REMAINDER
@@ -1,20 +1,30 @@
 import argparse
-from typing import Union
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple, Union
 
 from alto.utils import (
+    RecordWriter,
+    create_entity_set,
     get_dockstore_workflow,
     get_firecloud_workflow,
+    get_submission_url,
     get_workspace_info,
+    is_structured_output,
+    launch_terra_submission,
     parse_dockstore_workflow,
     parse_firecloud_workflow,
     parse_workspace,
     prefix_float,
     read_wdl_inputs,
-    submit_a_job_to_terra,
     update_workflow_config_in_workspace,
+    upload_entity_table,
     upload_to_cloud_bucket,
+    watch_submissions,
 )
 
+from .watch import write_results
+
 
 def detect_workflow_source(workflow_string: str) -> str:
     """Detect if a workflow is from Dockerstore or Broad Methods Repository."""
@@ -23,11 +33,21 @@ def detect_workflow_source(workflow_string: str) -> str:
     return "Broad Methods Repository"
 
 
-def convert_inputs(inputs: dict) -> dict:
-    """Convert elements in the dictionary loaded by json to formats that Terra accepts as inputs."""
+def convert_inputs(inputs: dict, keep_expressions: bool = False) -> dict:
+    """Convert elements in the dictionary loaded by json to formats that Terra accepts as inputs.
+
+    If keep_expressions is True, strings starting with 'this.' or 'workspace.' are kept as Terra
+    expressions referring to entity or workspace attributes, instead of being quoted.
+    """
     results = {}
     for key, value in inputs.items():
-        if isinstance(value, bool):
+        if (
+            keep_expressions
+            and isinstance(value, str)
+            and (value.startswith("this.") or value.startswith("workspace."))
+        ):
+            pass
+        elif isinstance(value, bool):
             value = "true" if value else "false"
         elif isinstance(value, str) and value.startswith(prefix_float):
             # input is float, prefix_float + 'float'
@@ -44,6 +64,20 @@ def convert_inputs(inputs: dict) -> dict:
     return results
 
 
+def resolve_workflow(workflow_string: str) -> Tuple[str, str, dict]:
+    """Locate a workflow from Dockstore or Broad Methods Repository, and return the config
+    namespace, config name and workflow definition used for it."""
+    if detect_workflow_source(workflow_string) == "Dockstore":
+        organization, collection, workflow, version = parse_dockstore_workflow(workflow_string)
+        return (
+            collection,
+            workflow,
+            get_dockstore_workflow(organization, collection, workflow, version),
+        )
+    namespace, name, version = parse_firecloud_workflow(workflow_string)
+    return namespace, name, get_firecloud_workflow(namespace, name, version)
+
+
 def submit_to_terra(
     workflow_string: str,
     workspace: str,
@@ -51,6 +85,15 @@ def submit_to_terra(
     out_json: str = None,
     bucket_folder: str = None,
     use_callcache: bool = True,
+    entity_table: str = None,
+    entity_type: str = "sample",
+    entity_set: str = None,
+    wait: bool = False,
+    time_out: float = None,
+    result_json: str = None,
+    localize_remote: bool = False,
+    verbose: bool = True,
+    callbacks: Optional[List[Callable[[dict], None]]] = None,
 ) -> str:
     """Submit a workflow to Terra. The workflow can from either Dockstore or Broad Methods
     Repository.
@@ -75,6 +118,33 @@ def submit_to_terra(
     use_callcache: `bool`, optional (default: True)
         If use call caching.
 
+    entity_table: `str`, optional (default: None)
+        Path to a TSV file of entities (e.g. samples), one per row with entity IDs in the first column. If set, the table is uploaded to the workspace data model, and the workflow runs on every entity in one submission. Inputs can then refer to entity attributes by expressions such as 'this.input_file'.
+
+    entity_type: `str`, optional (default: 'sample')
+        Entity type of entity_table, unless its first column header is in Terra's format of 'entity:<type>_id'.
+
+    entity_set: `str`, optional (default: None)
+        Name of the entity set created to hold all entities of entity_table. By default, it is '<config_name>_<timestamp>'.
+
+    wait: `bool`, optional (default: False)
+        Wait for the submission to finish, and raise a ValueError if any of its workflows does not succeed.
+
+    time_out: `float`, optional (default: None)
+        With wait, stop waiting after time_out hours.
+
+    result_json: `str`, optional (default: None)
+        With wait, write the submission status and per-workflow outputs and failures to this JSON file.
+
+    localize_remote: `bool`, optional (default: False)
+        With out_json, also copy inputs in other Google buckets into the workspace bucket, by provider-side copies that do not download them, so that tasks read them from the workspace bucket.
+
+    verbose: `bool`, optional (default: True)
+        Print upload commands, and with wait, the status URL and status changes of the submission.
+
+    callbacks: `List[Callable[[dict], None]]`, optional (default: None)
+        Functions called with the submission (its 'submission_id', 'workspace', 'url' and 'status') once it is submitted, and with wait, with its result (see :func:`watch_submissions`) once it finishes.
+
     Returns
     -------
     `str` object.
@@ -86,35 +156,46 @@ def submit_to_terra(
     """
     inputs = read_wdl_inputs(wdl_inputs)  # read inputs from JSON
 
-    # check method
-    workflow_def = None
-    config_namespace = config_name = None
-    if detect_workflow_source(workflow_string) == "Dockstore":
-        organization, collection, workflow, version = parse_dockstore_workflow(workflow_string)
-        config_namespace = collection
-        config_name = workflow
-        workflow_def = get_dockstore_workflow(organization, collection, workflow, version)
-    else:
-        namespace, name, version = parse_firecloud_workflow(workflow_string)
-        config_namespace = namespace
-        config_name = name
-        workflow_def = get_firecloud_workflow(namespace, name, version)
-
-    # check workspace
+    # check method and workspace concurrently
     workspace_namespace, workspace_name = parse_workspace(workspace)
-    workspace_def = get_workspace_info(workspace_namespace, workspace_name)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        method_future = executor.submit(resolve_workflow, workflow_string)
+        workspace_future = executor.submit(get_workspace_info, workspace_namespace, workspace_name)
+        config_namespace, config_name, workflow_def = method_future.result()
+        workspace_def = workspace_future.result()
 
     # upload input data to google bucket and generate modified JSON input file
     if out_json is not None:
         bucket = workspace_def["bucketName"]
-        upload_to_cloud_bucket(inputs, "gcp", bucket, bucket_folder, out_json, False)
+        upload_to_cloud_bucket(
+            inputs,
+            "gcp",
+            bucket,
+            bucket_folder,
+            out_json,
+            False,
+            verbose=verbose,
+            localize_remote=localize_remote,
+        )
+
+    # upload entities to the workspace data model and group them into one set
+    root_entity_type = None  # Do not use data model
+    if entity_table is not None:
+        root_entity_type, entity_ids = upload_entity_table(
+            workspace_namespace, workspace_name, entity_table, entity_type
+        )
+        if entity_set is None:
+            entity_set = f"{config_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        create_entity_set(
+            workspace_namespace, workspace_name, root_entity_type, entity_set, entity_ids
+        )
 
     # update workflow configuration in the workspace
     method_body = {
         "namespace": config_namespace,
         "name": config_name,
-        "rootEntityType": None,  # Do not use data model
-        "inputs": convert_inputs(inputs),
+        "rootEntityType": root_entity_type,
+        "inputs": convert_inputs(inputs, keep_expressions=entity_table is not None),
         "outputs": {},
         "prerequisites": {},
         "methodRepoMethod": {"methodUri": workflow_def["methodUri"]},
@@ -126,13 +207,42 @@ def submit_to_terra(
     )
 
     # submit a job to terra
-    return submit_a_job_to_terra(
+    submission_id = launch_terra_submission(
         workspace_namespace,
         workspace_name,
         config_namespace,
         config_name,
         use_callcache=use_callcache,
+        entity=entity_set if entity_table is not None else None,
+        entity_type=f"{root_entity_type}_set" if entity_table is not None else None,
+        expression=f"this.{root_entity_type}s" if entity_table is not None else None,
     )
+    status_url = get_submission_url(workspace_namespace, workspace_name, submission_id)
+    for callback in callbacks or []:
+        callback(
+            dict(
+                submission_id=submission_id,
+                workspace=f"{workspace_namespace}/{workspace_name}",
+                url=status_url,
+                status="Submitted",
+            )
+        )
+
+    # wait for the submission to finish
+    if wait:
+        if verbose:
+            print(status_url)
+        result = watch_submissions(
+            workspace_namespace, workspace_name, [submission_id], time_out=time_out, verbose=verbose
+        )[0]
+        for callback in callbacks or []:
+            callback(result)
+        if result_json is not None:
+            write_results([result], result_json)
+        if not result["succeeded"]:
+            raise ValueError(f"Submission {submission_id} did not succeed - {status_url}!")
+
+    return status_url
 
 
 def main(argv):
@@ -173,18 +283,84 @@ def main(argv):
         action="store",
         help="Upload files/directories to the workspace Google Cloud bucket and output updated input json (with local path replaced by google bucket urls) to <updated_json>.",
     )
+    parser.add_argument(
+        "--localize-remote",
+        dest="localize_remote",
+        action="store_true",
+        default=False,
+        help="With -o, also copy inputs (and sample sheet entries) stored in other Google buckets into the workspace bucket, by concurrent bucket-to-bucket copies without downloading them. This avoids cross-region egress and requester-pays reads by every task. Remote folders must end with '/'.",
+    )
     parser.add_argument(
         "--no-cache", dest="no_cache", action="store_true", help="Disable call caching."
     )
+    parser.add_argument(
+        "--entity-table",
+        dest="entity_table",
+        action="store",
+        help="Batch mode: TSV file of entities (e.g. samples) to run the workflow on, one per row with entity IDs in the first column and attributes in other columns. The table is uploaded to the workspace data model, and one submission runs the workflow on all entities. In the input JSON, refer to attributes by expressions like 'this.<column>'.",
+    )
+    parser.add_argument(
+        "--entity-type",
+        dest="entity_type",
+        action="store",
+        default="sample",
+        help="Entity type of --entity-table, unless its first column header is in Terra's format of 'entity:<type>_id'. The default is 'sample'.",
+    )
+    parser.add_argument(
+        "--entity-set",
+        dest="entity_set",
+        action="store",
+        help="Name of the entity set holding all entities of --entity-table. The default is '<config_name>_<timestamp>'.",
+    )
+    parser.add_argument(
+        "--wait",
+        dest="wait",
+        action="store_true",
+        default=False,
+        help="Wait for the submission to finish. Exit with an error if any workflow does not succeed.",
+    )
+    parser.add_argument(
+        "--time-out",
+        dest="time_out",
+        type=float,
+        help="With --wait, stop waiting after time_out hours.",
+    )
+    parser.add_argument(
+        "--result",
+        dest="result_json",
+        metavar="<result_json>",
+        action="store",
+        help="With --wait, write the submission status and per-workflow outputs and failures to <result_json>.",
+    )
     args = parser.parse_args(argv)
+    if args.localize_remote and args.out_json is None:
+        parser.error("--localize-remote requires -o.")
 
-    url = submit_to_terra(
-        args.method,
-        args.workspace,
-        args.wdl_inputs,
-        out_json=args.out_json,
-        bucket_folder=args.bucket_folder,
-        use_callcache=not args.no_cache,
-    )
+    records = []
+    try:
+        url = submit_to_terra(
+            args.method,
+            args.workspace,
+            args.wdl_inputs,
+            out_json=args.out_json,
+            bucket_folder=args.bucket_folder,
+            use_callcache=not args.no_cache,
+            entity_table=args.entity_table,
+            entity_type=args.entity_type,
+            entity_set=args.entity_set,
+            wait=args.wait,
+            time_out=args.time_out,
+            result_json=args.result_json,
+            localize_remote=args.localize_remote,
+            verbose=not is_structured_output(),
+            callbacks=[records.append] if is_structured_output() else None,
+        )
+    finally:
+        if len(records) > 0:  # the submission, or its result if waited for
+            RecordWriter(
+                ["submission_id", "workspace", "url", "status", "succeeded", "workflows"]
+            ).write(records[-1])
 
-    print(url)
+    # With --wait, the URL is printed before waiting.
+    if not args.wait and not is_structured_output():
+        print(url)
@@ -0,0 +1,85 @@
+import sys
+import json
+import argparse
+
+from alto.utils import parse_workspace, watch_submissions
+
+
+def write_results(results: list, result_json: str):
+    with open(result_json, "w") as fout:
+        json.dump(results, fout, indent=4)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description="Wait for Terra submissions to finish, and write their status, per-workflow outputs and failures to a JSON file. Exit with status 1 if any workflow does not succeed or the time-out is reached."
+    )
+    parser.add_argument(
+        "-w",
+        "--workspace",
+        dest="workspace",
+        action="store",
+        required=True,
+        help="Workspace name (e.g. foo/bar).",
+    )
+    parser.add_argument(
+        "--id",
+        dest="submission_ids",
+        action="store",
+        nargs="+",
+        required=True,
+        help="Submission ID(s) to watch.",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        dest="output",
+        action="store",
+        help="JSON file to write submission results to. If not set, results are printed.",
+    )
+    parser.add_argument(
+        "--interval",
+        dest="interval",
+        type=float,
+        default=30.0,
+        help="Minimum seconds between two polls. The interval doubles up to --max-interval while no workflow changes status. The default is 30.",
+    )
+    parser.add_argument(
+        "--max-interval",
+        dest="max_interval",
+        type=float,
+        default=600.0,
+        help="Maximum seconds between two polls. The default is 600.",
+    )
+    parser.add_argument(
+        "--time-out",
+        dest="time_out",
+        type=float,
+        help="Stop waiting after time_out hours. By default, wait until all submissions finish.",
+    )
+    parser.add_argument(
+        "--no-outputs",
+        dest="no_outputs",
+        action="store_true",
+        default=False,
+        help="Do not collect outputs and failures of workflows.",
+    )
+    args = parser.parse_args(argv)
+
+    workspace_namespace, workspace_name = parse_workspace(args.workspace)
+    results = watch_submissions(
+        workspace_namespace,
+        workspace_name,
+        args.submission_ids,
+        min_interval=args.interval,
+        max_interval=args.max_interval,
+        time_out=args.time_out,
+        collect_outputs=not args.no_outputs,
+    )
+    if args.output is not None:
+        write_results(results, args.output)
+    else:
+        print(json.dumps(results, indent=4))
+
+    if not all(result["succeeded"] for result in results):
+        sys.exit(1)
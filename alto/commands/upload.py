@@ -1,7 +1,18 @@
 import os
+import json
 import argparse
 
-from alto.utils import get_workspace_info, parse_workspace, read_wdl_inputs, upload_to_cloud_bucket
+from alto.utils import (
+    RecordWriter,
+    UploadPlan,
+    execute_upload_plan,
+    get_workspace_info,
+    is_structured_output,
+    parse_workspace,
+    read_wdl_inputs,
+    upload_to_cloud_bucket,
+)
+from alto.utils.io_utils import dump_wdl_inputs
 
 
 def main(argv):
@@ -9,7 +20,7 @@ def main(argv):
         description="Upload files/directories to a Cloud (gcp or aws) bucket."
     )
 
-    group = parser.add_mutually_exclusive_group(required=True)
+    group = parser.add_mutually_exclusive_group()
     group.add_argument(
         "-b",
         "--bucket",
@@ -51,10 +62,95 @@ def main(argv):
         action="store",
         help="AWS profile. Only works if dealing with AWS S3 buckets, and if not set, use the default profile.",
     )
-    parser.add_argument(dest="input", help="Input JSONs or files (e.g. sample sheet).", nargs="+")
+    parser.add_argument(
+        "--plan",
+        dest="plan",
+        action="store",
+        metavar="<plan_json>",
+        help="Do not upload. Instead, write the upload commands, with total bytes and file counts per destination, duplicated references and an estimated transfer time, to <plan_json>, which can be run later by --execute-plan.",
+    )
+    parser.add_argument(
+        "--bandwidth",
+        dest="bandwidth",
+        type=float,
+        default=100.0,
+        help="Network bandwidth in MB/s used to estimate transfer time with --plan. The default is 100.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        dest="concurrency",
+        type=int,
+        default=8,
+        help="Number of files transferred in parallel, used to estimate transfer time with --plan and as the number of concurrent transfers with --parallel. The default is 8.",
+    )
+    parser.add_argument(
+        "--execute-plan",
+        dest="execute_plan",
+        action="store",
+        metavar="<plan_json>",
+        help="Run the upload commands of a plan written by --plan, and write the updated input JSON to the path given by -o when the plan was made.",
+    )
+    parser.add_argument(
+        "--parallel",
+        dest="parallel",
+        action="store_true",
+        default=False,
+        help="Run transfers of all inputs concurrently, with at most --concurrency transfers at a time. Plain folders are synchronized file by file: the destination is listed once, and only new or changed files (by size and modification time) are uploaded. Checksums are not compared, so a file rewritten with the same size and an older modification time (e.g. restored with its original time) is not uploaded again; upload without --parallel to compare contents. Cannot be used with --plan, --metrics or --progress.",
+    )
+    parser.add_argument(
+        "--compress",
+        dest="compress",
+        choices=["gzip", "zstd"],
+        help="Compress local text files (see --compress-ext) while uploading them, without temporary files, and refer to the compressed files (with '.gz' or '.zst' appended) in the updated inputs and sample sheets. Only use it if the workflow accepts compressed files. Sample sheets given as inputs are not compressed.",
+    )
+    parser.add_argument(
+        "--compress-ext",
+        dest="compress_ext",
+        action="store",
+        default=".mtx,.csv,.tsv,.txt",
+        help="Comma-separated extensions of files to compress with --compress. The default is '.mtx,.csv,.tsv,.txt'.",
+    )
+    parser.add_argument(
+        "--dedup-content",
+        dest="dedup_content",
+        action="store_true",
+        default=False,
+        help="Upload files with identical contents only once. Symbolic and hard links to one file are always uploaded once.",
+    )
+    parser.add_argument(
+        "--metrics",
+        dest="metrics",
+        action="store",
+        metavar="<metrics_jsonl>",
+        help="Write bytes, files, duration and throughput (MB/s) of every transfer and every destination, and the totals, to <metrics_jsonl>, one JSON object per line.",
+    )
+    parser.add_argument(
+        "--progress",
+        dest="progress",
+        action="store_true",
+        default=False,
+        help="Print the aggregate upload progress and throughput after every transfer.",
+    )
+    parser.add_argument(dest="input", help="Input JSONs or files (e.g. sample sheet).", nargs="*")
 
     args = parser.parse_args(argv)
 
+    if args.execute_plan is not None:
+        execute_upload_plan(
+            args.execute_plan, dry_run=args.dry_run, verbose=not is_structured_output()
+        )
+        return
+    if args.bucket is None and args.workspace is None:
+        parser.error("one of the arguments -b/--bucket -w/--workspace is required")
+    if len(args.input) == 0:
+        parser.error("the following arguments are required: input")
+    if args.plan is not None and (args.metrics is not None or args.progress):
+        parser.error("--metrics and --progress cannot be used with --plan.")
+    if args.parallel and (args.plan is not None or args.metrics is not None or args.progress):
+        parser.error("--parallel cannot be used with --plan, --metrics or --progress.")
+    if args.progress and is_structured_output():
+        parser.error("--progress can only be used with the text output format.")
+
     if args.bucket is not None:
         if args.bucket.startswith("gs://"):
             backend = "gcp"
@@ -78,6 +174,10 @@ def main(argv):
 
             inputs.update({str(uuid.uuid1()): path})
 
+    plan = None
+    if args.plan is not None:
+        plan = UploadPlan(bandwidth=args.bandwidth, concurrency=args.concurrency)
+
     upload_to_cloud_bucket(
         inputs=inputs,
         backend=backend,
@@ -86,4 +186,37 @@ def main(argv):
         out_json=args.out_json,
         dry_run=args.dry_run,
         profile=args.profile,
+        verbose=plan is None and not is_structured_output(),
+        plan=plan,
+        metrics_file=args.metrics,
+        show_progress=args.progress,
+        content_hash=args.dedup_content,
+        parallel=args.parallel,
+        max_workers=args.concurrency,
+        compress=args.compress,
+        compress_extensions=set(ext.strip().lower() for ext in args.compress_ext.split(",")),
     )
+
+    if plan is not None:
+        plan.write(args.plan)
+        if is_structured_output():
+            RecordWriter(
+                ["files", "bytes", "destinations", "commands", "duplicates", "estimated_seconds"]
+            ).write(
+                dict(
+                    files=plan.total_files,
+                    bytes=plan.total_bytes,
+                    destinations=len(plan.destinations),
+                    commands=len(plan.commands),
+                    duplicates=len(plan.duplicates),
+                    estimated_seconds=round(plan.estimate_seconds(), 1),
+                )
+            )
+        else:
+            print(plan.summary())
+    elif is_structured_output():
+        # Inputs are updated in place, with local paths replaced by cloud URLs.
+        updated_inputs = json.loads(dump_wdl_inputs(inputs))
+        RecordWriter(["input", "value"]).write_all(
+            dict(input=key, value=value) for key, value in updated_inputs.items()
+        )
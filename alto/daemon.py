@@ -0,0 +1,106 @@
+import os
+import sys
+import json
+import socket
+from typing import List, Optional
+
+
+# Client side of 'alto serve'. Only the standard library is imported here, so that forwarding a
+# command does not import the command modules and their dependencies.
+
+# Commands run by the daemon. They only talk to Cromwell and read or write local files by path,
+# whereas other commands run transfer subprocesses, whose output the daemon cannot forward.
+forwarded_commands = {
+    ("cromwell", "check_status"),
+    ("cromwell", "abort"),
+    ("cromwell", "list_jobs"),
+    ("cromwell", "get_task_status"),
+    ("cromwell", "get_metadata"),
+    ("cromwell", "timing"),
+}
+
+# Environment variables read by forwarded commands, e.g. for the job index of 'list_jobs --cache'.
+# The caller's values are sent with each request and set in the daemon while its command runs.
+forwarded_environment = ("ALTO_CACHE_DIR",)
+
+# Options making a command run until the job finishes. The daemon runs one command at a time, so
+# such commands run locally instead of blocking every other client.
+local_options = {"--watch"}
+
+
+def is_forwarded(argv: List[str]) -> bool:
+    """Return if the command of argv can be run by the daemon."""
+    if tuple(argv[:2]) not in forwarded_commands:
+        return False
+    # argparse also accepts '--option=value' and unambiguous prefixes of long options.
+    options = [arg.split("=", 1)[0] for arg in argv[2:] if arg.startswith("--") and arg != "--"]
+    return not any(option.startswith(prefix) for option in local_options for prefix in options)
+
+
+def get_socket_path() -> str:
+    """Return the path of the daemon's Unix socket: ``$ALTO_SOCKET`` if set, otherwise alto.sock
+    under altocumulus' local cache directory (see :func:`alto.utils.get_cache_dir`)."""
+    if "ALTO_SOCKET" in os.environ:
+        return os.environ["ALTO_SOCKET"]
+    cache_dir = os.environ.get(
+        "ALTO_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "altocumulus")
+    )
+    return os.path.join(cache_dir, "alto.sock")
+
+
+def send_message(wfile, message: dict) -> None:
+    wfile.write(json.dumps(message).encode() + b"\n")
+    wfile.flush()
+
+
+def forward_command(
+    argv: List[str], output_format: str = "text", socket_path: Optional[str] = None
+) -> Optional[int]:
+    """Run an alto command in the daemon if it is running and the command can be forwarded.
+
+    The request sends argv, the working directory, the output format and the variables of
+    ``forwarded_environment`` (None if unset) as one JSON line. The
+    daemon answers with JSON lines of 'stdout' and 'stderr' text as the command writes it, then
+    the 'exit' code. Forwarding is disabled if ``$ALTO_NO_DAEMON`` is set, and commands given
+    an option of ``local_options``, e.g. 'get_task_status --watch', always run locally.
+
+    Parameters
+    ----------
+    argv: `List[str]`
+        Command and its arguments, e.g. ['cromwell', 'check_status', '-s', 'localhost', ...].
+    output_format: `str`, optional (default: 'text')
+        Output format of the command (see :func:`alto.utils.set_output_format`).
+    socket_path: `str`, optional
+        Path of the daemon's socket. The default is :func:`get_socket_path`.
+
+    Returns
+    -------
+    `int` or ``None``.
+        The exit code of the command, or None if it was not forwarded and must run locally.
+    """
+    if os.environ.get("ALTO_NO_DAEMON") or not is_forwarded(argv):
+        return None
+    if socket_path is None:
+        socket_path = get_socket_path()
+    if not os.path.exists(socket_path):
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError:  # stale socket of a daemon that is gone
+        sock.close()
+        return None
+
+    with sock, sock.makefile("rwb") as f:
+        env = {key: os.environ.get(key) for key in forwarded_environment}
+        send_message(f, dict(argv=argv, cwd=os.getcwd(), output=output_format, env=env))
+        for line in f:
+            message = json.loads(line)
+            if "exit" in message:
+                return message["exit"]
+            stream = sys.stdout if "stdout" in message else sys.stderr
+            stream.write(message.get("stdout", message.get("stderr")))
+            stream.flush()
+    print("The alto daemon closed the connection before the command finished.", file=sys.stderr)
+    return 1
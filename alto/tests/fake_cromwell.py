@@ -0,0 +1,241 @@
+import json
+import time
+import uuid
+import threading
+import http.server
+from email.parser import BytesParser
+from urllib.parse import parse_qs, urlparse
+
+from dateutil.parser import isoparse
+
+
+class FakeCromwell:
+    """A minimal in-process Cromwell server for tests and benchmarks.
+
+    It keeps jobs in memory: submitted jobs are 'Submitted' until their status is changed in
+    ``jobs``, and every request is appended to ``requests`` as (method, path, parsed body). Every
+    reply is delayed by latency seconds, to mimic a remote server.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.jobs = dict()
+        self.requests = []
+        self.lock = threading.Lock()
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def add_job(self, status="Running", **fields) -> str:
+        job_id = str(uuid.uuid4())
+        self.jobs[job_id] = dict(id=job_id, status=status, **fields)
+        return job_id
+
+    def add_jobs(self, n: int, status="Succeeded", name="workflow", creator="alto") -> list:
+        """Add n finished jobs with timestamps and labels, as listed by the /query endpoint."""
+        return [
+            self.add_job(
+                status=status,
+                name=name,
+                submission=f"2023-06-{1 + i % 28:02d}T10:00:00.000Z",
+                start=f"2023-06-{1 + i % 28:02d}T10:01:00.000Z",
+                end=f"2023-06-{1 + i % 28:02d}T11:00:00.000Z",
+                labels={"creator": creator},
+            )
+            for i in range(n)
+        ]
+
+    def add_workflow(
+        self,
+        depth: int = 0,
+        width: int = 2,
+        tasks: int = 2,
+        shards: int = 2,
+        padding: int = 0,
+        status: str = "Succeeded",
+    ) -> str:
+        """Add a job running tasks tasks of shards shards each, and width subworkflows nested
+        depth levels deep, each of the same shape. Every call carries padding extra bytes of
+        metadata, to mimic large metadata. Return the ID of the root workflow."""
+        job_id = str(uuid.uuid4())
+        calls = dict()
+        for t in range(tasks):
+            calls[f"wf.task_{t}"] = [
+                dict(
+                    executionStatus="Done" if status == "Succeeded" else "Running",
+                    jobId=f"{job_id}-{t}-{s}",
+                    shardIndex=s,
+                    attempt=1,
+                    start="2023-06-01T10:00:00.000Z",
+                    end="2023-06-01T10:30:00.000Z",
+                    executionEvents=[
+                        dict(
+                            description="RunningJob",
+                            startTime="2023-06-01T10:05:00.000Z",
+                            endTime="2023-06-01T10:30:00.000Z",
+                        )
+                    ],
+                    callCaching=dict(hit=s == 0),
+                    stdout=f"gs://fake-bucket/{job_id}/call-task_{t}/shard-{s}/stdout",
+                    stderr=f"gs://fake-bucket/{job_id}/call-task_{t}/shard-{s}/stderr",
+                    padding="x" * padding,
+                )
+                for s in range(shards)
+            ]
+        if depth > 0:
+            for w in range(width):
+                sub_id = self.add_workflow(depth - 1, width, tasks, shards, padding, status)
+                calls[f"wf.sub_{w}"] = [dict(subWorkflowId=sub_id, shardIndex=-1, attempt=1)]
+        self.jobs[job_id] = dict(
+            id=job_id, status=status, metadata=dict(id=job_id, status=status, calls=calls)
+        )
+        return job_id
+
+    def _metadata(self, job, query):
+        metadata = job.get("metadata", dict(id=job["id"], status=job["status"]))
+        include_keys = query.get("includeKey")
+        if include_keys is None:
+            return metadata
+        # Like Cromwell, keep only included keys, at the workflow and the call level.
+        result = {key: value for key, value in metadata.items() if key in include_keys + ["id"]}
+        if "calls" in metadata:
+            result["calls"] = {
+                task: [{k: v for k, v in call.items() if k in include_keys} for call in call_list]
+                for task, call_list in metadata["calls"].items()
+            }
+        return result
+
+    def _matches(self, job, filters):
+        """Apply the filters of a /query request like Cromwell: values of the same key are ORed,
+        except for labels, which must all match, and timestamps are compared as dates."""
+        for key in ["id", "status", "name"]:
+            if key in filters and job.get(key) not in filters[key]:
+                return False
+        labels = job.get("labels", dict())
+        for label in filters.get("label", []):
+            key, _, value = label.partition(":")
+            if labels.get(key) != value:
+                return False
+        for key, after in [("submission", True), ("start", True), ("end", False)]:
+            if key in filters:
+                if key not in job:
+                    return False
+                value, bound = isoparse(job[key]), isoparse(filters[key][0])
+                if (value < bound) if after else (value > bound):
+                    return False
+        return True
+
+    def _logs(self, job):
+        calls = job.get("metadata", dict()).get("calls", dict())
+        return dict(
+            id=job["id"],
+            calls={
+                task: [
+                    dict(
+                        stdout=call["stdout"], stderr=call["stderr"], shardIndex=call["shardIndex"]
+                    )
+                    for call in call_list
+                ]
+                for task, call_list in calls.items()
+                if all("subWorkflowId" not in call for call in call_list)
+            },
+        )
+
+    def _handler(self):
+        fake = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, code, body, content_type="application/json"):
+                data = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+                if fake.latency > 0:
+                    time.sleep(fake.latency)
+                self.send_response(code)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length", 0))
+                data = self.rfile.read(length)
+                content_type = self.headers.get("Content-Type", "")
+                if content_type.startswith("multipart/form-data"):
+                    message = BytesParser().parsebytes(
+                        f"Content-Type: {content_type}\r\n\r\n".encode() + data
+                    )
+                    return {
+                        part.get_param("name", header="content-disposition"): part.get_payload(
+                            decode=True
+                        )
+                        for part in message.get_payload()
+                    }
+                return json.loads(data) if data else None
+
+            def _route(self, method):
+                url = urlparse(self.path)
+                parts = url.path.rstrip("/").split("/")[4:]  # after /api/workflows/v1
+                body = self._body() if method == "POST" else parse_qs(url.query)
+                with fake.lock:
+                    fake.requests.append((method, url.path, body))
+                    if method == "POST" and len(parts) == 0:
+                        job_id = fake.add_job(status="Submitted")
+                        reply = (201, {"id": job_id, "status": "Submitted"})
+                    elif method == "POST" and parts == ["query"]:
+                        reply = (200, self._query(body))
+                    elif len(parts) != 2 or parts[0] not in fake.jobs:
+                        message = f"Unrecognized workflow ID: {parts[0]}"
+                        reply = (404, {"status": "fail", "message": message})
+                    else:
+                        reply = self._job_route(method, fake.jobs[parts[0]], parts[1], body)
+                self._reply(*reply)
+
+            def _job_route(self, method, job, endpoint, query):
+                if "reply" in job:  # e.g. (200, "<html>", "text/html") to mimic a broken proxy
+                    return job["reply"]
+                if method == "POST" and endpoint == "abort":
+                    job["status"] = "Aborted"
+                    return 200, {"id": job["id"], "status": "Aborting"}
+                if endpoint == "status":
+                    return 200, {"id": job["id"], "status": job["status"]}
+                if endpoint == "metadata":
+                    return 200, fake._metadata(job, query)
+                if endpoint == "logs":
+                    return 200, job.get("logs", fake._logs(job))
+                if endpoint == "outputs":
+                    return 200, {"id": job["id"], "outputs": job.get("outputs", {})}
+                if endpoint == "timing":
+                    return 200, f"<html>{job['id']}</html>", "text/html"
+                return 404, {"status": "fail", "message": "Not found"}
+
+            def _query(self, body):
+                filters = dict()
+                for item in body:
+                    for key, value in item.items():
+                        filters.setdefault(key, []).append(value)
+                jobs = [job for job in fake.jobs.values() if fake._matches(job, filters)]
+                page, page_size = int(filters["page"][0]), int(filters["pageSize"][0])
+                results = [
+                    {key: value for key, value in job.items() if key != "metadata"}
+                    for job in jobs[(page - 1) * page_size : page * page_size]
+                ]
+                return {"results": results, "totalResultsCount": len(jobs)}
+
+            def do_GET(self):
+                self._route("GET")
+
+            def do_POST(self):
+                self._route("POST")
+
+        return Handler
@@ -0,0 +1,99 @@
+import os
+import sys
+import shutil
+import argparse
+from typing import Dict, Optional, Tuple
+
+
+def local_path(url: str) -> str:
+    """Map a gs:// or s3:// URL to a path under $FAKE_STRATO_ROOT."""
+    scheme, _, path = url.partition("://")
+    if path == "":
+        return url
+    return os.path.join(os.environ["FAKE_STRATO_ROOT"], scheme, path)
+
+
+def list_directory(url: str, profile: Optional[str] = None) -> Dict[str, Tuple[int, float]]:
+    """A fake :func:`alto.utils.sync_utils.list_remote_directory`, listing the local folder of
+    url instead of calling gcloud or aws."""
+    root = local_path(url.rstrip("/"))
+    objects = dict()
+    for folder, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(folder, name)
+            stat = os.stat(path)
+            objects[os.path.relpath(path, root)] = (stat.st_size, stat.st_mtime)
+    return objects
+
+
+def copy(source: str, dest: str, into_folder: bool, recursive: bool):
+    if into_folder:
+        dest = os.path.join(dest, os.path.basename(source.rstrip("/")))
+    os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+    if os.path.isdir(source):
+        if not recursive:
+            raise ValueError(f"{source} is a folder!")
+        shutil.copytree(source, dest, dirs_exist_ok=True)
+    else:
+        shutil.copyfile(source, dest)
+
+
+def main(argv):
+    """A fake 'strato' command, whose buckets are local folders under $FAKE_STRATO_ROOT.
+
+    It supports the cp, sync, rm and exists sub-commands with the options alto uses.
+    """
+    parser = argparse.ArgumentParser(prog="strato")
+    parser.add_argument("subcommand", choices=["cp", "sync", "rm", "exists"])
+    parser.add_argument("-r", dest="recursive", action="store_true")
+    parser.add_argument("-m", dest="parallel", action="store_true")
+    parser.add_argument("--quiet", action="store_true")
+    parser.add_argument("--ionice", action="store_true")
+    parser.add_argument("--profile")
+    parser.add_argument("paths", nargs="+")
+    args = parser.parse_args(argv)
+
+    paths = [local_path(path) for path in args.paths]
+    if args.subcommand == "cp":
+        into_folder = len(paths) > 2 or args.paths[-1].endswith("/")
+        for source in paths[:-1]:
+            copy(source, paths[-1], into_folder, args.recursive)
+    elif args.subcommand == "sync":  # make the destination mirror the source
+        if os.path.isdir(paths[1]):
+            shutil.rmtree(paths[1])
+        shutil.copytree(paths[0], paths[1])
+    elif args.subcommand == "rm":
+        for path in paths:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            elif os.path.exists(path):
+                os.remove(path)
+    else:
+        sys.exit(0 if os.path.exists(paths[0]) else 1)
+
+
+def install_fake_strato(folder: str, monkeypatch) -> str:
+    """Put a fake strato executable on PATH with monkeypatch, storing buckets under
+    folder/buckets, which is returned. Cloud folders are also listed from there by the directory
+    sync of parallel uploads."""
+    from alto.utils import sync_utils  # not imported by the fake strato executable
+
+    bin_folder = os.path.join(folder, "bin")
+    bucket_root = os.path.join(folder, "buckets")
+    os.makedirs(bin_folder, exist_ok=True)
+    os.makedirs(bucket_root, exist_ok=True)
+    repo_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    script = os.path.join(bin_folder, "strato")
+    with open(script, "w") as f:
+        f.write(
+            f"#!{sys.executable}\n"
+            "import sys\n"
+            f"sys.path.insert(0, {repo_root!r})\n"
+            "from alto.tests.fake_strato import main\n"
+            "main(sys.argv[1:])\n"
+        )
+    os.chmod(script, 0o755)
+    monkeypatch.setenv("PATH", bin_folder + os.pathsep + os.environ["PATH"])
+    monkeypatch.setenv("FAKE_STRATO_ROOT", bucket_root)
+    monkeypatch.setattr(sync_utils, "list_remote_directory", list_directory)
+    return bucket_root
@@ -0,0 +1,211 @@
+import re
+import json
+import time
+import uuid
+import threading
+import http.server
+from urllib.parse import parse_qs, urlparse
+
+import requests
+import firecloud.api as fapi
+
+from alto.utils import dockstore_utils, firecloud_utils
+
+
+class FakeTerra:
+    """A minimal in-process stand-in for the Firecloud (Terra orchestration) and Dockstore APIs.
+
+    While entered, firecloud.api and alto's Dockstore lookups are pointed to it, with an
+    unauthenticated session, and alto's lookup caches are cleared. Workflows are registered by
+    :meth:`add_dockstore_workflow` and :meth:`add_method`, and workspaces by
+    :meth:`add_workspace`. Submissions finish immediately with one succeeded workflow per
+    submission (or per entity), and every request is appended to ``requests`` as (method, path,
+    parsed body). Every reply is delayed by latency seconds, to mimic a remote server.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.workspaces = dict()
+        self.methods = []
+        self.dockstore_workflows = []
+        self.configs = dict()
+        self.submissions = dict()
+        self.requests = []
+        self.lock = threading.Lock()
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        self._saved = (
+            fapi.fcconfig.root_url,
+            getattr(fapi, "__SESSION"),
+            dockstore_utils.dockstore_api,
+        )
+        fapi.fcconfig.root_url = f"{self.url}api/"
+        setattr(fapi, "__SESSION", requests.Session())
+        dockstore_utils.dockstore_api = f"{self.url}dockstore/api/"
+        self._clear_caches()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        fapi.fcconfig.root_url, session, dockstore_utils.dockstore_api = self._saved
+        setattr(fapi, "__SESSION", session)
+        self._clear_caches()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _clear_caches(self):
+        dockstore_utils.get_dockstore_workflow.cache_clear()
+        firecloud_utils.get_firecloud_workflow.cache_clear()
+        firecloud_utils.get_workspace_info.cache_clear()
+
+    def add_workspace(self, namespace: str, name: str, bucket: str = "fc-fake-bucket"):
+        self.workspaces[(namespace, name)] = dict(namespace=namespace, name=name, bucketName=bucket)
+
+    def add_method(self, namespace: str, name: str, snapshots: int = 1):
+        for snapshot_id in range(1, snapshots + 1):
+            self.methods.append(dict(namespace=namespace, name=name, snapshotId=snapshot_id))
+
+    def add_dockstore_workflow(
+        self, organization: str, collection: str, workflow: str, versions=("1.0",)
+    ):
+        entry_path = f"github.com/{organization}/{workflow}"
+        self.dockstore_workflows.append(
+            dict(
+                id=len(self.dockstore_workflows) + 1,
+                organization=organization.lower(),
+                collection=collection.lower(),
+                entryPath=entry_path,
+                workflowName=workflow,
+                path=entry_path,
+                full_workflow_path=f"#workflow/{entry_path}",
+                defaultVersion=versions[0],
+                workflowVersions=[
+                    dict(name=version, hidden=False, workflow_path=f"/workflows/{workflow}.wdl")
+                    for version in versions
+                ],
+            )
+        )
+
+    def _dockstore(self, parts):
+        # organizations/name/<org>, organizations/<org>/collections/<collection>/name and
+        # workflows/published/<id>
+        if parts[:2] == ["organizations", "name"]:
+            found = any(wf["organization"] == parts[2].lower() for wf in self.dockstore_workflows)
+            return (200, {"name": parts[2]}) if found else (404, "Organization not found")
+        if parts[0] == "organizations" and len(parts) == 5:
+            entries = [
+                dict(id=wf["id"], entryPath=wf["entryPath"])
+                for wf in self.dockstore_workflows
+                if wf["organization"] == parts[1].lower() and wf["collection"] == parts[3].lower()
+            ]
+            return (200, {"entries": entries}) if entries else (404, "Collection not found")
+        if parts[:2] == ["workflows", "published"]:
+            for wf in self.dockstore_workflows:
+                if str(wf["id"]) == parts[2]:
+                    return 200, wf
+        return 404, "Not found"
+
+    def _firecloud(self, method, parts, query, body):
+        if parts[0] == "methods":
+            if len(parts) == 4:
+                for record in self.methods:
+                    if [record["namespace"], record["name"], str(record["snapshotId"])] == parts[
+                        1:
+                    ]:
+                        return 200, record
+                return 404, {"message": "Method not found"}
+            return 200, [
+                record
+                for record in self.methods
+                if record["namespace"] == query.get("namespace", [None])[0]
+                and record["name"] == query.get("name", [None])[0]
+            ]
+
+        if parts[0] != "workspaces" or tuple(parts[1:3]) not in self.workspaces:
+            return 404, {"message": "Workspace not found"}
+        workspace = self.workspaces[tuple(parts[1:3])]
+        rest = parts[3:]
+        if len(rest) == 0:
+            return 200, {"workspace": workspace}
+        if rest[0] == "method_configs" and len(rest) == 3:
+            key = (workspace["namespace"], workspace["name"], rest[1], rest[2])
+            if method == "POST":
+                self.configs[key] = body
+                return 200, body
+            return (200, self.configs[key]) if key in self.configs else (404, {"message": "None"})
+        if rest == ["methodconfigs"] and method == "POST":
+            key = (workspace["namespace"], workspace["name"], body["namespace"], body["name"])
+            self.configs[key] = body
+            return 201, body
+        if rest[0] in ["importEntities", "flexibleImportEntities"]:
+            return 200, {}
+        if rest == ["submissions"] and method == "POST":
+            submission_id = str(uuid.uuid4())
+            self.submissions[submission_id] = dict(
+                submissionId=submission_id,
+                status="Done",
+                submission=body,
+                workflows=[
+                    dict(
+                        workflowId=str(uuid.uuid4()),
+                        workflowEntity=dict(entityName=body.get("entityName")),
+                        status="Succeeded",
+                    )
+                ],
+            )
+            return 201, {"submissionId": submission_id}
+        if rest[0] == "submissions" and rest[1] in self.submissions:
+            submission = self.submissions[rest[1]]
+            if len(rest) == 2:
+                return 200, submission
+            return 200, {"outputs": {}, "workflowId": rest[3]}
+        return 404, {"message": "Not found"}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _route(self, method):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                length = int(self.headers.get("Content-Length", 0))
+                data = self.rfile.read(length) if length > 0 else b""
+                try:
+                    body = json.loads(data) if data else None
+                except ValueError:  # e.g. entity TSV uploads
+                    body = data.decode()
+                parts = [part for part in re.split("/+", url.path) if part != ""]
+                with fake.lock:
+                    fake.requests.append((method, url.path, body))
+                    if parts[:2] == ["dockstore", "api"]:
+                        code, reply = fake._dockstore(parts[2:])
+                    elif parts[:1] == ["api"] and len(parts) > 1:
+                        code, reply = fake._firecloud(method, parts[1:], query, body)
+                    else:
+                        code, reply = 404, {"message": "Not found"}
+                data = reply.encode() if isinstance(reply, str) else json.dumps(reply).encode()
+                if fake.latency > 0:
+                    time.sleep(fake.latency)
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._route("GET")
+
+            def do_POST(self):
+                self._route("POST")
+
+            def do_PUT(self):
+                self._route("PUT")
+
+        return Handler
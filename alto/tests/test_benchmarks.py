@@ -0,0 +1,133 @@
+"""Benchmarks of commands that talk to Cromwell, Terra and cloud buckets, run against the local
+stand-ins in fake_cromwell, fake_terra and fake_strato.
+
+Run them alone with ``pytest alto/tests/test_benchmarks.py``, compare runs with
+``--benchmark-autosave`` and ``--benchmark-compare``, or skip them with ``--benchmark-skip``. CI
+compares every run with the last one of the default branch.
+"""
+
+import os
+import json
+
+import pytest
+
+from alto.commands import parse_monitoring_log
+from alto.commands.cromwell.get_logs import collect_log_uris
+from alto.commands.cromwell.get_task_status import JobIDFetcher
+from alto.commands.cromwell.list_jobs import list_jobs
+from alto.commands.cromwell.run import submit_to_cromwell
+from alto.utils.cromwell_client import run_with_client
+from alto.utils.io_utils import upload_to_cloud_bucket
+
+from .fake_cromwell import FakeCromwell
+from .fake_strato import install_fake_strato
+from .fake_terra import FakeTerra
+from .test_parse_monitoring_log import write_monitoring_log
+
+
+pytest.importorskip("pytest_benchmark")
+
+# Every reply of the fake servers is delayed by this many seconds, like a remote server.
+latency = 0.005
+
+
+@pytest.fixture
+def cromwell():
+    with FakeCromwell(latency=latency) as server:
+        yield server
+
+
+def test_get_task_status(benchmark, cromwell):
+    # 1 + 3 + 9 + 27 workflows with 4 tasks of 8 shards, and 1 kB of extra metadata per call.
+    job_id = cromwell.add_workflow(depth=3, width=3, tasks=4, shards=8, padding=1000)
+    status, summary = benchmark.pedantic(
+        lambda: JobIDFetcher("127.0.0.1", cromwell.port).get_task_summary(job_id), rounds=5
+    )
+    assert status == "Succeeded" and summary["wf.task_0"]["Done"] == 40 * 7
+
+
+def test_get_logs(benchmark, cromwell):
+    job_id = cromwell.add_workflow(depth=3, width=3, tasks=4, shards=8, padding=1000)
+    uris = benchmark.pedantic(
+        lambda: run_with_client(
+            "127.0.0.1", cromwell.port, lambda client: collect_log_uris(client, job_id)
+        ),
+        rounds=5,
+    )
+    assert len(uris) == 40 * 4 * 8 * 2
+
+
+def test_list_jobs(benchmark, cromwell, capsys):
+    cromwell.add_jobs(5000)
+    benchmark.pedantic(
+        lambda: list_jobs("127.0.0.1", cromwell.port, True, None, [], None), rounds=5
+    )
+    capsys.readouterr()
+    # The number of rounds depends on the options, e.g. --benchmark-disable runs one.
+    list_jobs("127.0.0.1", cromwell.port, True, None, [], None)
+    assert capsys.readouterr().out.count("\n") == 1 + 5000
+
+
+def test_submit_to_cromwell(benchmark, cromwell, tmp_path):
+    input_json = str(tmp_path / "inputs.json")
+    with open(input_json, "w") as f:
+        json.dump({f"wf.input_{i}": i for i in range(100)}, f)
+
+    with FakeTerra(latency=latency) as terra:
+        terra.add_dockstore_workflow("org", "coll", "wf")
+
+        def submit():
+            # Dockstore lookups are cached per process, so the first round pays for them.
+            return submit_to_cromwell(
+                "127.0.0.1",
+                cromwell.port,
+                "org:coll:wf:1.0",
+                input_json,
+                None,
+                None,
+                False,
+                False,
+                None,
+                None,
+                None,
+            )
+
+        job_id = benchmark.pedantic(submit, rounds=10)
+    assert job_id in cromwell.jobs
+
+
+def test_upload_to_cloud_bucket(benchmark, tmp_path, monkeypatch):
+    bucket_root = install_fake_strato(str(tmp_path / "strato"), monkeypatch)
+    data = tmp_path / "data"
+    inputs = dict()
+    for i in range(10):
+        (data / f"sample_{i}").mkdir(parents=True)
+        for lane in range(4):
+            (data / f"sample_{i}" / f"L00{lane}.fastq.gz").write_bytes(b"x" * 10000)
+        (data / f"sample_{i}.h5ad").write_bytes(b"x" * 10000)
+        inputs[f"wf.folder_{i}"] = str(data / f"sample_{i}")
+        inputs[f"wf.file_{i}"] = str(data / f"sample_{i}.h5ad")
+
+    def upload():
+        upload_to_cloud_bucket(
+            dict(inputs), "gcp", "bucket", "run", None, False, verbose=False, parallel=True
+        )
+
+    benchmark.pedantic(upload, rounds=3)
+    assert len(os.listdir(os.path.join(bucket_root, "gs", "bucket", "run"))) == 20
+
+
+def test_parse_monitoring_log(benchmark, tmp_path):
+    run_dir = tmp_path / "workflow" / "92f48dc5"
+    for task in range(10):
+        for shard in range(50):
+            write_monitoring_log(
+                run_dir / f"call-task_{task}" / f"shard-{shard}" / "monitoring.log",
+                (shard * 7) % 100,
+                (shard * 3) % 100,
+                shard % 100,
+            )
+    report = str(tmp_path / "report.tsv")
+    benchmark.pedantic(lambda: parse_monitoring_log.execute(str(tmp_path), report), rounds=3)
+    with open(report) as f:
+        assert len(f.readlines()) > 10
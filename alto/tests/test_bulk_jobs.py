@@ -0,0 +1,42 @@
+from alto.commands.cromwell import abort, check_status
+
+from .fake_cromwell import FakeCromwell
+
+
+def test_bulk_check_status(tmp_path, capsys):
+    with FakeCromwell() as server:
+        job_ids = server.add_jobs(3, status="Running", creator="alice")
+        failed_id = server.add_job(status="Failed", name="other", labels={"creator": "bob"})
+        broken_id = server.add_job(reply=(502, "<html>Bad gateway</html>", "text/html"))
+        id_file = tmp_path / "ids.txt"
+        id_file.write_text(f"# jobs\n{job_ids[0]}\n\n{broken_id}\n{job_ids[0]}\n")
+        args = ["-s", "127.0.0.1", "-p", str(server.port)]
+
+        check_status.main(args + ["--id", job_ids[1], "--id-file", str(id_file)])
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[0].split() == ["Job", "ID", "Status", "Message"]
+        assert [line.split()[:2] for line in lines[1:3]] == [
+            [job_ids[1], "Running"],
+            [job_ids[0], "Running"],
+        ]
+        # A bad response only fails its job.
+        assert lines[3].split() == [broken_id, "<html>Bad", "gateway</html>"]
+
+        check_status.main(args + ["-u", "alice", "--status", "Running"])
+        lines = capsys.readouterr().out.splitlines()
+        assert sorted(line.split()[0] for line in lines[1:]) == sorted(job_ids)
+
+        check_status.main(args + ["--name", "other"])
+        assert capsys.readouterr().out == f"Job {failed_id} is in status Failed.\n"
+
+
+def test_bulk_abort(capsys):
+    with FakeCromwell() as server:
+        job_ids = server.add_jobs(2, status="Running", name="wf")
+        abort.main(["-s", "127.0.0.1", "-p", str(server.port), "--name", "wf", "--id", "unknown"])
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[1].split()[:2] == ["unknown", "Unrecognized"]
+        assert [line.split()[:2] for line in lines[2:]] == [
+            [job_id, "Aborting"] for job_id in job_ids
+        ]
+        assert all(server.jobs[job_id]["status"] == "Aborted" for job_id in job_ids)
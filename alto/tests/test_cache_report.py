@@ -0,0 +1,77 @@
+import pandas as pd
+
+from alto.commands.cromwell import cache_report
+
+from .fake_cromwell import FakeCromwell
+
+
+def test_cache_report(tmp_path, capsys):
+    with FakeCromwell() as server:
+        original_id = server.add_job(
+            status="Succeeded",
+            metadata=dict(
+                status="Succeeded",
+                calls={
+                    "wf.align": [
+                        dict(
+                            shardIndex=0,
+                            start="2023-06-01T10:00:00.000Z",
+                            end="2023-06-01T12:00:00.000Z",
+                        )
+                    ]
+                },
+            ),
+        )
+
+        def done(shard, **call_caching):
+            return dict(executionStatus="Done", shardIndex=shard, callCaching=call_caching)
+
+        job_id = server.add_job(
+            status="Succeeded",
+            metadata=dict(
+                status="Succeeded",
+                calls={
+                    "wf.align": [
+                        done(0, hit=True, result=f"Cache Hit: {original_id}:wf.align:0"),
+                        # The original workflow was pruned from the server.
+                        done(1, hit=True, result="Cache Hit: pruned-id:wf.align:1"),
+                        done(2, hit=False, result="Cache Miss"),
+                    ],
+                    "wf.count": [
+                        done(
+                            -1,
+                            hit=False,
+                            hitFailures=[
+                                {"pruned-id:wf.count:-1": [{"message": "file not found"}]}
+                            ],
+                        ),
+                        done(-1, hit=False, effectiveCallCachingMode="WriteCache"),
+                        dict(executionStatus="Running", shardIndex=0),
+                    ],
+                },
+            ),
+        )
+
+        output = str(tmp_path / "cache.tsv")
+        calls = str(tmp_path / "calls.tsv")
+        cache_report.main(
+            ["-s", "127.0.0.1", "-p", str(server.port), "--id", job_id]
+            + ["--output", output, "--calls", calls]
+        )
+
+    assert capsys.readouterr().out == (
+        "2 of 5 finished calls in 1 job(s) were cache hits, saving 2.00 hours of compute time.\n"
+    )
+    df = pd.read_csv(calls, sep="\t", keep_default_na=False)
+    assert df["miss_reason"].tolist() == [
+        "",
+        "",
+        "no matching cache entry",
+        "cache hit failed: file not found",
+        "reading from cache disabled (WriteCache)",
+    ]
+    assert df["saved_seconds"].tolist() == [7200.0, 0.0, 0.0, 0.0, 0.0]
+
+    summary = pd.read_csv(output, sep="\t", keep_default_na=False).set_index("task")
+    assert summary.loc["wf.align"].tolist() == [3, 2, 1, 0.667, 2.0, "no matching cache entry"]
+    assert summary.loc["wf.count", "hits"] == 0 and summary.loc["wf.count", "hit_rate"] == 0.0
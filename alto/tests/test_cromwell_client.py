@@ -0,0 +1,140 @@
+import json
+import asyncio
+
+import pytest
+
+from alto.commands.cromwell import check_status
+from alto.commands.cromwell import run as cromwell_run
+from alto.utils.cromwell_client import (
+    ClientPool,
+    CromwellClient,
+    CromwellError,
+    run_with_client,
+    set_client_pool,
+)
+
+from .fake_cromwell import FakeCromwell
+
+
+def test_cromwell_client():
+    async def session(port, job_ids):
+        async with CromwellClient("127.0.0.1", port, max_connections=4) as client:
+            submitted = await client.submit(
+                workflow_source=b"workflow w {}", inputs={"w.a": 1}, labels={"k": "v"}
+            )
+            statuses = await client.map_jobs("status", job_ids + ["unknown"])
+            aborted = await client.abort(job_ids[0])
+            running = await client.query([{"status": "Running"}], page_size=2)
+            with pytest.raises(CromwellError) as e:
+                await client.metadata("unknown")
+            return submitted, statuses, aborted, running, e.value.status
+
+    with FakeCromwell() as server:
+        job_ids = [server.add_job() for _ in range(5)]
+        submitted, statuses, aborted, running, error_status = asyncio.run(
+            session(server.port, job_ids)
+        )
+
+        assert submitted["status"] == "Submitted" and submitted["id"] in server.jobs
+        method, path, body = server.requests[0]
+        assert body["workflowSource"] == b"workflow w {}"
+        assert json.loads(body["workflowInputs"]) == {"w.a": 1}
+        assert json.loads(body["labels"]) == {"k": "v"}
+        assert "workflowOptions" not in body
+
+        assert [status["status"] for status in statuses] == ["Running"] * 5 + [""]
+        assert "Unrecognized workflow ID" in statuses[-1]["message"]
+        assert aborted["status"] == "Aborting" and server.jobs[job_ids[0]]["status"] == "Aborted"
+        assert sorted(job["id"] for job in running) == sorted(job_ids[1:])
+        assert error_status == 404
+
+
+def test_submit_files(tmp_path):
+    wdl = tmp_path / "w.wdl"
+    wdl.write_text("version 1.0\nworkflow w {}\n")
+    deps = tmp_path / "deps.zip"
+    deps.write_bytes(b"PK" + bytes(range(256)) * 64)
+    with FakeCromwell() as server, open(deps, "rb") as handle:
+        for dependencies in [str(deps), handle]:
+            run_with_client(
+                "127.0.0.1",
+                server.port,
+                lambda client: client.submit(workflow_source=str(wdl), dependencies=dependencies),
+            )
+    for _, _, body in server.requests:
+        assert body["workflowSource"] == wdl.read_bytes()
+        assert body["workflowDependencies"] == deps.read_bytes()
+
+
+def test_cli_wrappers(tmp_path, capsys):
+    wdl = tmp_path / "w.wdl"
+    wdl.write_text("version 1.0\nworkflow w {}\n")
+    inputs = tmp_path / "inputs.json"
+    inputs.write_text('{"w.x": 1.50}')
+    with FakeCromwell() as server:
+        port = str(server.port)
+        cromwell_run.main(
+            ["-s", "127.0.0.1", "-p", port, "-m", str(wdl), "-i", str(inputs), "--no-cache"]
+        )
+        _, _, body = server.requests[0]
+        assert body["workflowSource"] == wdl.read_bytes()
+        assert body["workflowInputs"].decode().replace(" ", "").replace("\n", "") == '{"w.x":1.50}'
+        assert json.loads(body["workflowOptions"]) == {"read_from_cache": False}
+
+        job_id = list(server.jobs)[0]
+        check_status.main(["-s", "127.0.0.1", "-p", port, "--id", job_id])
+        assert capsys.readouterr().out.splitlines()[-1] == f"Job {job_id} is in status Submitted."
+
+
+def test_client_pool():
+    pool = ClientPool(max_connections=2)
+    set_client_pool(pool)
+    try:
+        with FakeCromwell() as server:
+            job_id = server.add_job()
+            for _ in range(3):
+                status = run_with_client(
+                    "127.0.0.1", server.port, lambda client: client.status(job_id)
+                )
+                assert status["status"] == "Running"
+        assert len(pool.clients) == 1
+    finally:
+        set_client_pool(None)
+        pool.close()
+
+
+def test_map_jobs_errors():
+    with FakeCromwell() as server:
+        job_id = server.add_job()
+        broken_id = server.add_job(reply=(200, "<html>Bad gateway</html>", "text/html"))
+        statuses = run_with_client(
+            "127.0.0.1", server.port, lambda client: client.map_jobs("status", [job_id, broken_id])
+        )
+        assert statuses[0] == {"id": job_id, "status": "Running", "message": ""}
+        assert statuses[1] == {
+            "id": broken_id,
+            "status": "",
+            "message": "Invalid response from Cromwell.",
+        }
+        port = server.port
+
+    # The server is gone: every job fails with the connection error instead of raising.
+    statuses = run_with_client(
+        "127.0.0.1", port, lambda client: client.map_jobs("status", ["a", "b"])
+    )
+    assert [status["id"] for status in statuses] == ["a", "b"]
+    assert all(status["status"] == "" and status["message"] != "" for status in statuses)
+
+
+def test_wait_and_check(capsys):
+    with FakeCromwell() as server:
+        job_id = server.add_job(status="Succeeded")
+        assert cromwell_run.wait_and_check("127.0.0.1", server.port, job_id, 1, freq=0.01) == (
+            "Succeeded"
+        )
+        # The first check happens after freq seconds, and a time-out gives an empty status.
+        job_id = server.add_job(status="Running")
+        server.requests.clear()
+        assert cromwell_run.wait_and_check("127.0.0.1", server.port, job_id, 0.1 / 3600, 0.06) == ""
+        assert len(server.requests) == 2
+        assert capsys.readouterr().out == f"{0.1 / 3600}-hour time-out is reached!\n"
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from alto.utils.cromwell_utils import build_labels, build_workflow_options
+
+
+def test_build_workflow_options(tmp_path, capsys):
+    options_file = str(tmp_path / "options.json")
+    with open(options_file, "w") as f:
+        json.dump(
+            {"write_to_cache": True, "default_runtime_attributes": {"zones": "us-east1-b"}}, f
+        )
+
+    options = build_workflow_options(
+        options_file,
+        [
+            "default_runtime_attributes.preemptible=2",
+            "final_workflow_outputs_dir=gs://foo/outputs",
+            "write_to_cache=false",
+        ],
+        overrides={"read_from_cache": False},
+    )
+    assert options == {
+        "write_to_cache": False,
+        "read_from_cache": False,
+        "final_workflow_outputs_dir": "gs://foo/outputs",
+        "default_runtime_attributes": {"zones": "us-east1-b", "preemptible": 2},
+    }
+
+    # Warnings do not mix with the structured output of 'alto --output json cromwell run'.
+    assert build_workflow_options(None, ["foo=1"]) == {"foo": 1}
+    captured = capsys.readouterr()
+    assert captured.out == "" and "'foo' is not a known" in captured.err
+
+    with pytest.raises(ValueError):
+        build_workflow_options(None, ["workflow_failure_mode=Sometimes"])
+    with pytest.raises(ValueError):
+        build_workflow_options(None, ["read_from_cache"])
+
+
+def test_build_labels():
+    assert build_labels(["project=atlas", "batch=1"], overrides={"creator": "me"}) == {
+        "project": "atlas",
+        "batch": "1",
+        "creator": "me",
+    }
+    with pytest.raises(ValueError):
+        build_labels(["=foo"])
@@ -0,0 +1,99 @@
+import os
+
+import pytest
+
+from alto.utils import io_utils, sync_utils
+from alto.utils.io_utils import upload_to_cloud_bucket
+
+
+def test_diff_directory(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.txt").write_text("a")
+    (tmp_path / "sub" / "b.txt").write_text("bb")
+    local_files = sync_utils.scan_local_directory(str(tmp_path))
+    assert {rel_path: size for rel_path, (size, _) in local_files.items()} == {
+        "a.txt": 1,
+        "sub/b.txt": 2,
+    }
+
+    mtime = os.path.getmtime(tmp_path / "a.txt")
+    remote_objects = {
+        "a.txt": (1, mtime + 10),  # uploaded after the last change
+        "sub/b.txt": (1, mtime + 10),  # size differs
+        "old.txt": (3, mtime),
+    }
+    assert sync_utils.diff_directory(local_files, remote_objects) == (["sub/b.txt"], ["old.txt"])
+
+
+def test_parallel_upload(tmp_path, monkeypatch):
+    commands = []
+    monkeypatch.setattr(
+        sync_utils, "run_command", lambda command, *args, **kwargs: commands.append(command)
+    )
+    monkeypatch.setattr(
+        sync_utils, "list_remote_directory", lambda url, profile=None: {"stale.txt": (1, 0.0)}
+    )
+    folder = tmp_path / "data"
+    (folder / "sub").mkdir(parents=True)
+    for name in ["a.txt", "b.txt", "sub/c.txt"]:
+        (folder / name).write_text(name)
+    (tmp_path / "ref.fa").write_text("ACGT")
+
+    inputs = {"wf.folder": str(folder), "wf.ref": str(tmp_path / "ref.fa")}
+    upload_to_cloud_bucket(
+        inputs, "gcp", "foo", None, None, dry_run=True, verbose=False, parallel=True
+    )
+    assert inputs == {"wf.folder": "gs://foo/data", "wf.ref": "gs://foo/ref.fa"}
+    assert sorted(commands) == sorted(
+        [
+            [
+                "strato",
+                "cp",
+                "--ionice",
+                "--quiet",
+                f"{folder}/a.txt",
+                f"{folder}/b.txt",
+                "gs://foo/data/",
+            ],
+            ["strato", "cp", "--ionice", "--quiet", f"{folder}/sub/c.txt", "gs://foo/data/sub/"],
+            ["strato", "rm", "--quiet", "gs://foo/data/stale.txt"],
+            ["strato", "cp", "--ionice", "--quiet", str(tmp_path / "ref.fa"), "gs://foo/ref.fa"],
+        ]
+    )
+
+
+def test_parallel_upload_failure(tmp_path, monkeypatch):
+    monkeypatch.setattr(sync_utils, "run_command", lambda command, *args, **kwargs: None)
+    monkeypatch.setattr(sync_utils, "list_remote_directory", lambda url, profile=None: {})
+    transfer_data = io_utils.transfer_data
+
+    def fail_on_ref(source, *args, **kwargs):
+        if source.endswith("ref.fa"):
+            raise ValueError("Cannot upload ref.fa!")
+        transfer_data(source, *args, **kwargs)
+
+    monkeypatch.setattr(io_utils, "transfer_data", fail_on_ref)
+    pools = []
+
+    class RecordedPool(sync_utils.TransferPool):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            pools.append(self)
+
+    monkeypatch.setattr(io_utils, "TransferPool", RecordedPool)
+    folder = tmp_path / "fastqs"
+    folder.mkdir()
+    (folder / "s1_S1_L001_R1_001.fastq.gz").write_bytes(b"x")
+    sample_sheet = tmp_path / "sample_sheet.csv"
+    sample_sheet.write_text(f"Sample,Location\ns1,{folder}\n")
+    (tmp_path / "ref.fa").write_text("ACGT")
+
+    inputs = {"wf.sheet": str(sample_sheet), "wf.ref": str(tmp_path / "ref.fa")}
+    with pytest.raises(ValueError, match="Cannot upload ref.fa!"):
+        upload_to_cloud_bucket(
+            inputs, "gcp", "foo", None, None, dry_run=True, verbose=False, parallel=True
+        )
+    # The pool is shut down and the rewritten sample sheet is removed.
+    (pool,) = pools
+    assert pool.executor._shutdown
+    assert len(pool.temporary_files) == 1 and not os.path.exists(pool.temporary_files[0])
@@ -0,0 +1,99 @@
+import os
+import json
+
+from alto.commands.cromwell.get_logs import collect_log_uris
+from alto.commands.cromwell.get_task_status import JobIDFetcher
+from alto.commands.cromwell.run import submit_to_cromwell
+from alto.commands.terra.run import submit_to_terra
+from alto.utils.cromwell_client import run_with_client
+from alto.utils.io_utils import upload_to_cloud_bucket
+
+from .fake_cromwell import FakeCromwell
+from .fake_strato import install_fake_strato
+from .fake_terra import FakeTerra
+
+
+def test_nested_workflow():
+    with FakeCromwell() as server:
+        job_id = server.add_workflow(depth=2, width=2, tasks=3, shards=4)
+        status, summary = JobIDFetcher("127.0.0.1", server.port).get_task_summary(job_id)
+        assert status == "Succeeded"
+        # Calls of a task are merged across the 1 + 2 + 4 workflows of the tree.
+        assert summary["wf.task_0"]["Done"] == 7 * 3 and summary["wf.task_0"]["cached"] == 7
+
+        uris = run_with_client(
+            "127.0.0.1", server.port, lambda client: collect_log_uris(client, job_id)
+        )
+        assert len(uris) == 7 * 3 * 4 * 2
+
+
+def test_submit_dockstore_workflow(tmp_path):
+    input_json = str(tmp_path / "inputs.json")
+    with open(input_json, "w") as f:
+        json.dump({"wf.a": 1}, f)
+
+    with FakeTerra() as terra, FakeCromwell() as server:
+        terra.add_dockstore_workflow("org", "coll", "wf", versions=("1.0", "2.0"))
+        job_id = submit_to_cromwell(
+            "127.0.0.1",
+            server.port,
+            "org:coll:wf:2.0",
+            input_json,
+            None,
+            None,
+            False,
+            False,
+            None,
+            None,
+            None,
+        )
+        _, _, body = server.requests[-1]
+        assert job_id in server.jobs
+        assert (
+            body["workflowUrl"] == b"https://raw.githubusercontent.com/org/wf/2.0/workflows/wf.wdl"
+        )
+
+
+def test_submit_to_fake_terra():
+    with FakeTerra() as terra:
+        terra.add_method("foo", "bar", snapshots=2)
+        terra.add_workspace("ns", "ws")
+        url = submit_to_terra("foo/bar", "ns/ws", '{"bar.a": 1}', wait=True)
+        (submission,) = terra.submissions.values()
+        assert url.endswith(f"/ns/ws/job_history/{submission['submissionId']}")
+        (config,) = terra.configs.values()
+        assert config["methodRepoMethod"]["methodUri"] == "agora://foo/bar/2"
+
+
+def test_upload_to_fake_bucket(tmp_path, monkeypatch):
+    bucket_root = install_fake_strato(str(tmp_path / "strato"), monkeypatch)
+    folder = tmp_path / "data"
+    (folder / "sub").mkdir(parents=True)
+    (folder / "sub" / "b.txt").write_text("b")
+    (tmp_path / "a.h5ad").write_text("a")
+    inputs = {"wf.a": str(tmp_path / "a.h5ad"), "wf.b": str(folder)}
+    # The parallel upload lists the fake bucket and removes objects without a local file.
+    stale = os.path.join(bucket_root, "gs", "bucket", "run1", "data", "stale.txt")
+    os.makedirs(os.path.dirname(stale))
+    open(stale, "w").close()
+
+    for parallel in [False, True]:
+        upload_to_cloud_bucket(
+            inputs,
+            "gcp",
+            "bucket",
+            f"run{parallel:d}",
+            None,
+            False,
+            verbose=False,
+            parallel=parallel,
+        )
+        assert inputs == {
+            "wf.a": f"gs://bucket/run{parallel:d}/a.h5ad",
+            "wf.b": f"gs://bucket/run{parallel:d}/data",
+        }
+        assert os.path.isfile(
+            os.path.join(bucket_root, "gs", "bucket", f"run{parallel:d}", "data", "sub", "b.txt")
+        )
+        inputs = {"wf.a": str(tmp_path / "a.h5ad"), "wf.b": str(folder)}
+    assert not os.path.exists(stale)
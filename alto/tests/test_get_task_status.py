@@ -0,0 +1,64 @@
+import json
+
+from alto.commands.cromwell import get_task_status
+
+from .fake_cromwell import FakeCromwell
+
+
+def test_task_status(capsys):
+    with FakeCromwell() as server:
+        sub_id = server.add_workflow(tasks=1, shards=2)
+        job_id = server.add_job(
+            status="Running",
+            metadata=dict(
+                status="Running",
+                calls={
+                    "wf.task_0": [
+                        dict(executionStatus="Running", jobId="job-1", shardIndex=0),
+                        dict(executionStatus="Done", shardIndex=1, callCaching=dict(hit=False)),
+                    ],
+                    "wf.cached": [
+                        dict(executionStatus="Done", shardIndex=-1, callCaching=dict(hit=True))
+                    ],
+                    "wf.sub": [dict(subWorkflowId=sub_id, shardIndex=-1, attempt=1)],
+                },
+            ),
+        )
+        args = ["-s", "127.0.0.1", "-p", str(server.port), "--id", job_id]
+
+        get_task_status.main(args)
+        task_status = json.loads(capsys.readouterr().out)
+        # Calls without a backend job ID are listed as cached, whether or not they hit the cache.
+        assert task_status["wf.task_0"] == {
+            "job-1": "Running",
+            "cached": ["Done"],
+            f"{sub_id}-0-0": "Done",
+            f"{sub_id}-0-1": "Done",
+        }
+        assert task_status["wf.cached"] == {"cached": ["Done"]}
+
+        get_task_status.main(args + ["--summary"])
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[0] == f"Job {job_id} is in status Running."
+        # 'wf.task_0' has a running shard, a shard done without a cache hit, and the two shards of
+        # the subworkflow, one of which is a cache hit.
+        assert lines[-1].split() == ["wf.task_0", "4", "0", "1", "2", "1", "0", "0"]
+
+
+def test_watch_task_status(capsys, monkeypatch):
+    with FakeCromwell() as server:
+        job_id = server.add_workflow(tasks=1, shards=1, status="Running")
+        sleeps = []
+
+        def finish(seconds):
+            sleeps.append(seconds)
+            server.jobs[job_id]["metadata"]["status"] = "Succeeded"
+
+        monkeypatch.setattr(get_task_status.time, "sleep", finish)
+        get_task_status.main(
+            ["-s", "127.0.0.1", "-p", str(server.port), "--id", job_id, "--watch", "5"]
+        )
+        out = capsys.readouterr().out
+        assert sleeps == [5.0]
+        assert f"Job {job_id} is in status Running." in out
+        assert out.rstrip().split("\n\n")[-1].startswith(f"Job {job_id} is in status Succeeded.")
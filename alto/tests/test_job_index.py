@@ -0,0 +1,80 @@
+import sqlite3
+
+from alto.utils.job_index import JobIndex, normalize_timestamp
+
+from .fake_cromwell import FakeCromwell
+
+
+def test_normalize_timestamp():
+    assert normalize_timestamp("2024-01-01T00:00:00Z") == "2024-01-01T00:00:00.000000Z"
+    assert normalize_timestamp("2024-01-01T00:00:00.5Z") == "2024-01-01T00:00:00.500000Z"
+    assert normalize_timestamp("2024-01-01T01:00:00.123+01:00") == "2024-01-01T00:00:00.123000Z"
+    assert normalize_timestamp(None) is None
+
+
+def test_job_index(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    with FakeCromwell() as server:
+        # Cromwell gives timestamps with or without milliseconds.
+        old_id = server.add_job(
+            status="Succeeded",
+            submission="2024-01-01T00:00:00Z",
+            end="2024-01-01T02:00:00.25Z",
+            labels={"creator": "alice"},
+        )
+        running_id = server.add_job(
+            status="Running",
+            name="wf",
+            submission="2024-01-02T00:00:00.123Z",
+            start="2024-01-02T00:01:00Z",
+            labels={"creator": "bob"},
+        )
+        index = JobIndex("127.0.0.1", server.port, path=path)
+        assert index.last_sync() is None
+        assert index.sync() == 2
+        assert index.last_sync()[0] == "2024-01-02T00:00:00.123000Z"
+
+        def query_ids(*args, **kwargs):
+            return [job["id"] for job in index.query(*args, **kwargs)]
+
+        assert query_ids([]) == [running_id, old_id]
+        # Bounds are inclusive, whatever the precision of the stored and given timestamps.
+        assert query_ids([], submitted_after="2024-01-01T00:00:00.000Z") == [running_id, old_id]
+        assert query_ids([], submitted_after="2024-01-01T00:00:00.001Z") == [running_id]
+        assert query_ids([], ended_before="2024-01-01T02:00:00.250Z") == [old_id]
+        assert query_ids([], ended_before="2024-01-01T02:00:00.249Z") == []
+        assert query_ids([], started_after="2024-01-02T00:01:00.000Z") == [running_id]
+        assert query_ids(["Succeeded"], creator="alice") == [old_id]
+        assert query_ids([], names=["wf"], labels=["creator:bob"]) == [running_id]
+        assert query_ids([], num_shown=1) == [running_id]
+
+        # Only new jobs and jobs that were unfinished are requested again.
+        server.jobs[running_id]["status"] = "Failed"
+        new_id = server.add_job(status="Running", submission="2024-01-03T00:00:00Z")
+        server.requests.clear()
+        index.sync()
+        queries = [body for _, _, body in server.requests]
+        assert {"submission": "2024-01-02T00:00:00.123000Z"} in queries[0]
+        assert {"id": running_id} in queries[1]
+        assert query_ids(["Failed"]) == [running_id]
+        assert query_ids(["Running"]) == [new_id]
+
+
+def test_job_index_upgrade(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    JobIndex("127.0.0.1", 8000, path=path).conn.close()
+    # An index written before timestamps were normalized.
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("PRAGMA user_version = 0")
+        conn.execute(
+            "INSERT INTO jobs VALUES ('127.0.0.1:8000', 'a', NULL, 'Succeeded', '{}', "
+            "'2024-01-01T00:00:00Z', NULL, NULL)"
+        )
+        conn.execute("INSERT INTO syncs VALUES ('127.0.0.1:8000', '2024-01-01T00:00:00Z', NULL)")
+    conn.close()
+
+    index = JobIndex("127.0.0.1", 8000, path=path)
+    assert index.last_sync()[0] == "2024-01-01T00:00:00.000000Z"
+    jobs = list(index.query([], submitted_after="2024-01-01T00:00:00.000Z"))
+    assert [job["submission"] for job in jobs] == ["2024-01-01T00:00:00.000000Z"]
@@ -0,0 +1,102 @@
+from alto.commands.cromwell import list_jobs
+from alto.utils.cromwell_client import ClientPool, iterate_with_client, set_client_pool
+
+from .fake_cromwell import FakeCromwell
+
+
+def count_queries(server):
+    return sum(path.endswith("/query") for _, path, _ in server.requests)
+
+
+def query_jobs(server, **kwargs):
+    return list(
+        iterate_with_client(
+            "127.0.0.1", server.port, lambda client: client.iter_query([], **kwargs)
+        )
+    )
+
+
+def test_query_pages():
+    with FakeCromwell() as server:
+        job_ids = server.add_jobs(25)
+        jobs = query_jobs(server, page_size=10)
+        assert [job["id"] for job in jobs] == job_ids
+        assert count_queries(server) == 3
+        pages = [body[-2:] for _, _, body in server.requests]
+        assert pages[-1] == [{"page": "3"}, {"pageSize": "10"}]
+
+        # No empty page is requested once totalResultsCount jobs are seen.
+        server.add_jobs(5)
+        server.requests.clear()
+        assert len(query_jobs(server, page_size=10)) == 30
+        assert count_queries(server) == 3
+
+        # num_shown caps the page size and stops the loop.
+        server.requests.clear()
+        assert len(query_jobs(server, num_shown=12, page_size=5)) == 12
+        assert count_queries(server) == 3
+
+        # Pages are only requested as jobs are consumed, also through a client pool.
+        pool = ClientPool()
+        set_client_pool(pool)
+        try:
+            server.requests.clear()
+            jobs = iterate_with_client(
+                "127.0.0.1", server.port, lambda client: client.iter_query([], page_size=10)
+            )
+            assert [next(jobs)["id"] for _ in range(11)] == job_ids[:11]
+            jobs.close()
+            assert count_queries(server) == 2
+        finally:
+            set_client_pool(None)
+            pool.close()
+
+
+def test_list_jobs(capsys):
+    with FakeCromwell() as server:
+        server.add_jobs(25, creator="alice")
+        server.add_jobs(3, creator="bob", name="other")
+        server.add_jobs(2, creator="alice", status="Failed")
+        args = ["-s", "127.0.0.1", "-p", str(server.port)]
+
+        list_jobs.main(args + ["-u", "alice", "-n", "12"])
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[0].startswith("Job ID") and len(lines) == 1 + 12
+        assert count_queries(server) == 1
+
+        list_jobs.main(args + ["-u", "alice", "--only-failed"])
+        assert len(capsys.readouterr().out.splitlines()) == 1 + 2
+
+        list_jobs.main(args + ["-a", "--name", "other"])
+        assert len(capsys.readouterr().out.splitlines()) == 1 + 3
+
+        server.requests.clear()
+        list_jobs.main(
+            args
+            + ["-u", "alice", "--label", "creator:alice", "--submitted-after", "2023-06-20T00:00Z"]
+        )
+        # Jobs are submitted on June 1st to 25th, and the 2 failed jobs on June 1st and 2nd.
+        assert len(capsys.readouterr().out.splitlines()) == 1 + 6
+        _, _, body = server.requests[-1]
+        assert {"label": "creator:alice"} in body
+        assert {"submission": "2023-06-20T00:00:00.000Z"} in body
+
+
+def test_build_query():
+    query = list_jobs.build_query(
+        False,
+        "alice",
+        ["Failed", "Aborted"],
+        names=["wf"],
+        started_after="2023-06-20T10:00:00+02:00",
+        ended_before="2023-06-21T00:00:00Z",
+    )
+    assert query == [
+        {"additionalQueryResultFields": "labels"},
+        {"label": "creator:alice"},
+        {"status": "Failed"},
+        {"status": "Aborted"},
+        {"name": "wf"},
+        {"start": "2023-06-20T08:00:00.000Z"},
+        {"end": "2023-06-21T00:00:00.000Z"},
+    ]
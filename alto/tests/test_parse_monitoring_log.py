@@ -0,0 +1,83 @@
+import json
+
+import pandas as pd
+
+from alto.commands import parse_monitoring_log
+
+
+def write_monitoring_log(path, cpu, memory, disk):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wt") as f:
+        f.write("#CPU: 4\n")
+        f.write("Total Memory: 16G\n")
+        f.write("Total Disk space: 100G\n")
+        f.write("[Tue Jan 24 17:34:29 UTC 2023]\n")
+        f.write(f"* CPU usage: {cpu}%\n")
+        f.write(f"* Memory usage: {memory}%\n")
+        f.write(f"* Disk usage: {disk}%\n")
+        f.write("[Tue Jan 24 17:35:29 UTC 2023]\n")
+
+
+def test_recommend(tmp_path):
+    run_dir = tmp_path / "my_workflow" / "92f48dc5"
+    for shard, (cpu, memory, disk) in enumerate([(50, 25, 10), (25, 50, 20)]):
+        write_monitoring_log(
+            run_dir / "call-count" / f"shard-{shard}" / "monitoring.log", cpu, memory, disk
+        )
+    report = str(tmp_path / "report.tsv")
+    recommend = str(tmp_path / "recommend.tsv")
+    overlay = str(tmp_path / "overlay.json")
+    parse_monitoring_log.main(
+        [
+            str(tmp_path),
+            report,
+            "--recommend",
+            recommend,
+            "--recommend-json",
+            overlay,
+            "--json-prefix",
+            "my_workflow.",
+            "--percentile",
+            "100",
+            "--headroom",
+            "0.5",
+        ]
+    )
+    df_rec = pd.read_csv(recommend, sep="\t")
+    assert df_rec.shape[0] == 1
+    row = df_rec.iloc[0]
+    assert row["task"] == "count"
+    assert row["n_logs"] == 2
+    assert row["recommended_cpu"] == 3
+    assert row["recommended_memory"] == 12
+    assert row["recommended_disk"] == 30
+    with open(overlay) as f:
+        inputs = json.load(f)
+    assert inputs == {
+        "my_workflow.count.cpu": 3,
+        "my_workflow.count.memory": "12G",
+        "my_workflow.count.disk": 30,
+    }
+
+
+def test_incremental(tmp_path):
+    log_path = tmp_path / "call-count" / "shard-0" / "monitoring.log"
+    write_monitoring_log(log_path, 50, 25, 10)
+    report = str(tmp_path / "report.tsv")
+    state = str(tmp_path / "state.json")
+    parse_monitoring_log.main([str(tmp_path), report, "--state", state])
+    df = pd.read_csv(report, sep="\t")
+    assert df.loc[0, "max_cpu_percent"] == 50
+
+    with open(log_path, "at") as f:
+        f.write("* CPU usage: 75%\n")
+        f.write("* Memory usage: 30")  # incomplete line is not consumed yet
+    parse_monitoring_log.main([str(tmp_path), report, "--state", state])
+    df = pd.read_csv(report, sep="\t")
+    assert df.loc[0, "max_cpu_percent"] == 75
+    assert df.loc[0, "max_memory_percent"] == 25
+    assert df.loc[0, "elapsed_minutes"] == 1
+
+    with open(state) as f:
+        offsets = [file_state["offset"] for file_state in json.load(f)["files"].values()]
+    assert offsets == [log_path.stat().st_size - len("* Memory usage: 30")]
@@ -0,0 +1,98 @@
+import io
+import os
+import sys
+import json
+import socket
+import subprocess
+
+import pytest
+
+from alto.commands import serve
+from alto.daemon import forward_command, is_forwarded
+
+from .fake_cromwell import FakeCromwell
+
+
+def test_forward_command(tmp_path, capsys, monkeypatch):
+    monkeypatch.delenv("ALTO_NO_DAEMON", raising=False)
+    socket_path = str(tmp_path / "alto.sock")
+    assert forward_command(["cromwell", "check_status"], socket_path=socket_path) is None
+
+    daemon = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "import sys; from alto.commands import serve; serve.main(sys.argv[1:])",
+        ]
+        + ["--socket", socket_path],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        assert daemon.stdout.readline() == f"alto daemon is listening on {socket_path}.\n"
+        with FakeCromwell() as cromwell:
+            job_id = cromwell.add_job()
+            args = ["cromwell", "check_status", "-s", "127.0.0.1", "-p", str(cromwell.port)]
+            assert forward_command(args + ["--id", job_id], socket_path=socket_path) == 0
+            assert capsys.readouterr().out == f"Job {job_id} is in status Running.\n"
+
+            assert forward_command(args + ["--id", job_id], "json", socket_path) == 0
+            assert json.loads(capsys.readouterr().out)["status"] == "Running"
+
+            # Files are written in the working directory of the client.
+            monkeypatch.chdir(tmp_path)
+            args[1] = "get_metadata"
+            assert forward_command(args + ["--id", job_id], socket_path=socket_path) == 0
+            with open(tmp_path / f"{job_id}.metadata.json") as f:
+                assert json.load(f)["id"] == job_id
+
+        assert forward_command(["cromwell", "check_status"], socket_path=socket_path) == 2
+        assert "required: -s/--server" in capsys.readouterr().err
+        assert forward_command(["cromwell", "run"], socket_path=socket_path) is None
+    finally:
+        daemon.terminate()
+        daemon.wait(timeout=30)
+    assert not os.path.exists(socket_path)
+
+
+def test_is_forwarded():
+    args = ["cromwell", "get_task_status", "-s", "localhost", "--id", "1"]
+    assert is_forwarded(args)
+    # Watching a job would keep the daemon from running other commands until the job finishes.
+    assert not is_forwarded(args + ["--watch", "10"])
+    assert not is_forwarded(args + ["--watch=10"])
+    assert not is_forwarded(args + ["--wat", "10"])
+    assert not is_forwarded(["cromwell", "run"])
+
+
+def test_client_disconnected(tmp_path):
+    client, daemon = socket.socketpair()
+    client.close()
+    with daemon:
+        wfile = daemon.makefile("wb", buffering=0)
+        stdout = serve._MessageStream(wfile, "stdout")
+        stderr = serve._MessageStream(wfile, "stderr")
+        with FakeCromwell() as cromwell:
+            job_id = cromwell.add_job()
+            argv = ["cromwell", "check_status", "-s", "127.0.0.1", "-p", str(cromwell.port)]
+            request = dict(argv=argv + ["--id", job_id], cwd=str(tmp_path))
+            cwd = os.getcwd()
+            # The command is stopped by its first output instead of running on for nobody.
+            with pytest.raises(serve.ClientDisconnected):
+                serve.run_forwarded_command(request, stdout, stderr)
+            assert os.getcwd() == cwd and not stdout.connected
+
+
+def test_forwarded_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv("ALTO_CACHE_DIR", str(tmp_path / "daemon"))
+    stdout = serve._MessageStream(io.BytesIO(), "stdout")
+    stderr = serve._MessageStream(io.BytesIO(), "stderr")
+    with FakeCromwell() as cromwell:
+        cromwell.add_job()
+        argv = ["cromwell", "list_jobs", "-s", "127.0.0.1", "-p", str(cromwell.port), "--cache"]
+        request = dict(argv=argv, cwd=str(tmp_path), env={"ALTO_CACHE_DIR": str(tmp_path / "a")})
+        assert serve.run_forwarded_command(request, stdout, stderr) == 0
+    # The job index of the client is used, and the daemon's environment is restored.
+    assert os.path.exists(tmp_path / "a" / "cromwell_jobs.sqlite")
+    assert not os.path.exists(tmp_path / "daemon")
+    assert os.environ["ALTO_CACHE_DIR"] == str(tmp_path / "daemon")
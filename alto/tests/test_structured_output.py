@@ -0,0 +1,48 @@
+import io
+import json
+
+from alto.commands import cromwell
+from alto.commands.cromwell import list_jobs
+from alto.utils import output_utils
+from alto.utils.output_utils import RecordWriter
+
+from .fake_cromwell import FakeCromwell
+
+
+def test_record_writer():
+    stream = io.StringIO()
+    writer = RecordWriter(["id", "status", "labels"], "tsv", stream=stream)
+    writer.write_all([{"id": "a\tb", "status": None, "labels": {"k": "v"}, "other": 1}])
+    assert stream.getvalue() == 'id\tstatus\tlabels\na\\tb\t\t{"k": "v"}\n'
+
+    stream = io.StringIO()
+    RecordWriter(["id", "status"], "json", stream=stream).write_all(
+        [{"id": "a", "status": "Running"}, {"id": "b"}]
+    )
+    assert [json.loads(line) for line in stream.getvalue().splitlines()] == [
+        {"id": "a", "status": "Running"},
+        {"id": "b", "status": None},
+    ]
+
+
+def test_cromwell_records(capsys, monkeypatch):
+    with FakeCromwell() as server:
+        job_ids = [server.add_job(), server.add_job(status="Succeeded", name="w")]
+        port = str(server.port)
+
+        monkeypatch.setattr(output_utils, "_output_format", "json")
+        cromwell.main(["check_status", "-s", "127.0.0.1", "-p", port, "--id"] + job_ids + ["x"])
+        records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert [(r["id"], r["status"]) for r in records] == [
+            (job_ids[0], "Running"),
+            (job_ids[1], "Succeeded"),
+            ("x", ""),
+        ]
+
+        monkeypatch.setattr(output_utils, "_output_format", "tsv")
+        list_jobs.main(["-s", "127.0.0.1", "-p", port, "-a", "--only-succeeded"])
+        lines = capsys.readouterr().out.splitlines()
+        assert lines == [
+            "id\tcreator\tname\tstatus\tsubmission\tstart\tend",
+            f"{job_ids[1]}\t\tw\tSucceeded\t\t\t",
+        ]
@@ -0,0 +1,160 @@
+from types import SimpleNamespace
+
+import alto.utils
+from alto.commands.terra import run as terra_run
+from alto.utils import firecloud_utils
+
+
+def response(status_code, body=None):
+    return SimpleNamespace(status_code=status_code, json=lambda: body, text=str(body))
+
+
+def test_convert_inputs():
+    inputs = {"wf.a": "this.fastq", "wf.b": "foo", "wf.c": True}
+    assert terra_run.convert_inputs(dict(inputs)) == {
+        "wf.a": '"this.fastq"',
+        "wf.b": '"foo"',
+        "wf.c": "true",
+    }
+    assert terra_run.convert_inputs(dict(inputs), keep_expressions=True)["wf.a"] == "this.fastq"
+
+
+def test_batch_submission(tmp_path, monkeypatch):
+    entity_table = str(tmp_path / "samples.tsv")
+    with open(entity_table, "w") as f:
+        f.write("sample\tfastq\ns1\tgs://foo/s1.fq.gz\ns2\tgs://foo/s2.fq.gz\n")
+
+    calls = {}
+    fapi = firecloud_utils.fapi
+    monkeypatch.setattr(
+        terra_run,
+        "get_firecloud_workflow",
+        lambda *args: {"methodUri": "agora://foo/bar/1"},
+    )
+    monkeypatch.setattr(terra_run, "get_workspace_info", lambda *args: {"bucketName": "fc-bucket"})
+    monkeypatch.setattr(
+        fapi,
+        "upload_entities",
+        lambda ns, ws, data, model: calls.setdefault("upload", []).append(data) or response(200),
+    )
+    monkeypatch.setattr(fapi, "get_workspace_config", lambda *args: response(404))
+    monkeypatch.setattr(
+        fapi,
+        "create_workspace_config",
+        lambda ns, ws, body: calls.update(config=body) or response(201),
+    )
+    monkeypatch.setattr(
+        fapi,
+        "create_submission",
+        lambda *args, **kwargs: calls.update(submission=kwargs)
+        or response(201, {"submissionId": "sub-1"}),
+    )
+
+    url = terra_run.submit_to_terra(
+        "foo/bar/1",
+        "ns/ws",
+        '{"bar.fastq": "this.fastq"}',
+        entity_table=entity_table,
+        entity_set="cohort",
+    )
+    assert url.endswith("/ns/ws/job_history/sub-1")
+    assert calls["upload"][0].startswith("entity:sample_id\tfastq\n")
+    assert calls["upload"][1] == "membership:sample_set_id\tsample\ncohort\ts1\ncohort\ts2\n"
+    assert calls["config"]["rootEntityType"] == "sample"
+    assert calls["config"]["inputs"] == {"bar.fastq": "this.fastq"}
+    assert calls["submission"]["entity"] == "cohort"
+    assert calls["submission"]["etype"] == "sample_set"
+    assert calls["submission"]["expression"] == "this.samples"
+
+
+def test_skip_unchanged_config(monkeypatch):
+    method_body = {
+        "namespace": "foo",
+        "name": "bar",
+        "rootEntityType": None,
+        "inputs": {"bar.x": '"y"'},
+        "outputs": {},
+        "methodRepoMethod": {"methodUri": "agora://foo/bar/1"},
+    }
+    config = dict(method_body, methodRepoMethod={"methodUri": "agora://foo/bar/0"})
+    calls = []
+    fapi = firecloud_utils.fapi
+    monkeypatch.setattr(
+        fapi, "get_workspace_config", lambda *args: calls.append("get") or response(200, config)
+    )
+    monkeypatch.setattr(
+        fapi,
+        "update_workspace_config",
+        lambda *args: calls.append("update") or config.update(args[-1]) or response(200),
+    )
+
+    for _ in range(3):
+        firecloud_utils.update_workflow_config_in_workspace("foo", "bar", method_body, "ns", "ws")
+    assert calls == ["get", "update", "get", "get"]
+
+    # The config is changed elsewhere, e.g. in the Terra UI: it is updated again.
+    config["inputs"] = {}
+    firecloud_utils.update_workflow_config_in_workspace("foo", "bar", method_body, "ns", "ws")
+    assert calls[4:] == ["get", "update"]
+
+
+def test_lookup_cache(monkeypatch):
+    requests = []
+    monkeypatch.setattr(
+        firecloud_utils.fapi,
+        "get_workspace",
+        lambda ns, ws: requests.append(ws) or response(200, {"workspace": {"bucketName": ws}}),
+    )
+    firecloud_utils.get_workspace_info.cache_clear()
+    info = firecloud_utils.get_workspace_info("ns", "ws")
+    info["bucketName"] = "changed"  # callers get copies
+    assert firecloud_utils.get_workspace_info("ns", "ws") == {"bucketName": "ws"}
+    assert requests == ["ws"]
+
+    # Cached results expire.
+    monkeypatch.setattr(alto.utils, "lookup_cache_ttl", 0.0)
+    firecloud_utils.get_workspace_info("ns", "ws")
+    assert requests == ["ws", "ws"]
+    firecloud_utils.get_workspace_info.cache_clear()
+
+
+def test_watch_submissions(monkeypatch):
+    polls = {"sub-1": 0, "sub-2": 0}
+    sleeps = []
+
+    def get_submission(ns, ws, submission_id):
+        polls[submission_id] += 1
+        done = polls[submission_id] >= (2 if submission_id == "sub-1" else 4)
+        workflow = {
+            "workflowId": f"wf-{submission_id}",
+            "status": (
+                ("Succeeded" if submission_id == "sub-1" else "Failed") if done else "Running"
+            ),
+            "workflowEntity": {"entityName": "s1"},
+        }
+        return response(
+            200,
+            {
+                "submissionId": submission_id,
+                "status": "Done" if done else "Running",
+                "workflows": [workflow],
+            },
+        )
+
+    fapi = firecloud_utils.fapi
+    monkeypatch.setattr(fapi, "get_submission", get_submission)
+    monkeypatch.setattr(
+        fapi,
+        "get_workflow_metadata",
+        lambda ns, ws, sid, wid, include_key: response(200, {"outputs": {"wf.out": f"gs://{wid}"}}),
+    )
+    monkeypatch.setattr(firecloud_utils.time, "sleep", sleeps.append)
+
+    results = firecloud_utils.watch_submissions(
+        "ns", "ws", ["sub-1", "sub-2"], min_interval=10, max_interval=30, verbose=False
+    )
+    assert [result["succeeded"] for result in results] == [True, False]
+    assert results[0]["workflows"][0]["outputs"] == {"wf.out": "gs://wf-sub-1"}
+    assert results[1]["workflows"][0]["entity"] == "s1"
+    # The interval backs off while nothing changes, and resets on a status change.
+    assert sleeps == [10, 10, 20]
@@ -0,0 +1,66 @@
+import pandas as pd
+
+from alto.commands.cromwell import timing
+
+from .fake_cromwell import FakeCromwell
+
+
+def make_calls(calls):
+    """Build call timings from (task, start minute, end minute) tuples."""
+    origin = pd.Timestamp("2023-06-01T10:00:00Z")
+    records = []
+    for task, start, end in calls:
+        records.append(
+            dict(
+                task=task,
+                shard=-1,
+                start=origin + pd.Timedelta(minutes=start),
+                end=origin + pd.Timedelta(minutes=end),
+                duration=(end - start) * 60.0,
+                queueing=0.0,
+                localization=0.0,
+                running=(end - start) * 60.0,
+                delocalization=0.0,
+            )
+        )
+    return pd.DataFrame.from_records(records)
+
+
+def test_critical_path():
+    assert timing.find_critical_path(make_calls([])) == []
+    # Zero-length calls, e.g. cache hits, end where they start.
+    assert timing.find_critical_path(make_calls([("a", 5, 5)])) == [0]
+    assert timing.find_critical_path(make_calls([("a", 5, 5), ("b", 5, 5)])) == [0, 1]
+
+    df = make_calls(
+        [("a", 0, 10), ("b", 5, 20), ("c", 10, 30), ("d", 30, 30), ("e", 30, 40), ("f", 35, 38)]
+    )
+    # b overlaps a and c, and f overlaps e, so neither is on the path.
+    assert timing.find_critical_path(df) == [0, 2, 3, 4]
+
+
+def test_summarize_timings():
+    df = make_calls([("a", 0, 10), ("b", 10, 20), ("b", 10, 40), ("c", 40, 40)])
+    summary = timing.summarize_timings(df, timing.find_critical_path(df)).set_index("task")
+    assert list(summary.index) == ["a", "b", "c"]
+    assert summary["n_calls"].tolist() == [1, 2, 1]
+    assert summary.loc["b", "duration_max"] == 1800.0
+    assert summary.loc["b", "duration_p50"] == 1200.0
+    assert summary["critical_path_seconds"].tolist() == [600.0, 1800.0, 0.0]
+
+
+def test_analyze_timing(tmp_path, capsys):
+    with FakeCromwell() as server:
+        job_id = server.add_workflow(depth=1, width=1, tasks=2, shards=2)
+        df = timing.get_call_timings("127.0.0.1", server.port, job_id)
+        assert df.shape[0] == 8
+        assert (df["queueing"] == 300.0).all() and (df["running"] == 1500.0).all()
+
+        tsv_file = str(tmp_path / "timing.tsv")
+        timing.analyze_timing("127.0.0.1", server.port, job_id, tsv_file=tsv_file)
+        summary = pd.read_csv(tsv_file, sep="\t")
+        assert sorted(summary["task"]) == ["wf.task_0", "wf.task_1"]
+        assert summary["n_calls"].tolist() == [4, 4]
+        assert capsys.readouterr().out.startswith(
+            "Critical path (30.0 minutes from first call start to last call end):\n"
+        )
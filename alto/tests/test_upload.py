@@ -1,6 +1,14 @@
+import os
+import sys
+import gzip
 import json
+import subprocess
+
+import pytest
 
 from alto.commands import upload
+from alto.utils import compress_utils, io_utils, transfer_metrics
+from alto.utils.io_utils import dump_wdl_inputs, read_wdl_inputs
 
 
 def test_upload_directory(tmp_path):
@@ -9,3 +17,181 @@ def test_upload_directory(tmp_path):
     with open(output_json, "r") as f:
         reformatted_input = json.load(f)
     assert reformatted_input["foo"] == "gs://foo/test_sample"
+
+
+def test_dump_wdl_inputs():
+    inputs_str = '{"wf.a": 1.10, "wf.b": [0.5, 2.000], "wf.c": "x"}'
+    inputs = read_wdl_inputs(inputs_str)
+    assert json.loads(dump_wdl_inputs(inputs)) == json.loads(inputs_str)
+    assert "1.10" in dump_wdl_inputs(inputs) and "2.000" in dump_wdl_inputs(inputs)
+
+
+def test_upload_plan(tmp_path):
+    data_file = tmp_path / "data.h5ad"
+    data_file.write_bytes(b"x" * 1000)
+    fastq_dir = tmp_path / "fastqs"
+    fastq_dir.mkdir()
+    for sample in ["s1", "s2"]:
+        (fastq_dir / f"{sample}_S1_L001_R1_001.fastq.gz").write_bytes(b"x" * 100)
+    sample_sheet = tmp_path / "sample_sheet.csv"
+    sample_sheet.write_text(f"Sample,Location\ns1,{fastq_dir}\n")
+    input_json = str(tmp_path / "inputs.json")
+    with open(input_json, "w") as f:
+        json.dump(
+            {"wf.a": str(data_file), "wf.b": str(data_file), "wf.sheet": str(sample_sheet)}, f
+        )
+
+    plan_json = str(tmp_path / "plan.json")
+    output_json = str(tmp_path / "updated.json")
+    upload.main(["-b", "gs://foo", "--plan", plan_json, "-o", output_json, input_json])
+    with open(plan_json, "r") as f:
+        plan = json.load(f)
+    destinations = {dest["url"]: (dest["bytes"], dest["files"]) for dest in plan["destinations"]}
+    assert destinations["gs://foo/data.h5ad"] == (1000, 1)
+    assert destinations["gs://foo/fastqs"] == (100, 1)  # only sample s1 is uploaded
+    assert plan["duplicates"] == [{"source": str(data_file), "url": "gs://foo/data.h5ad"}]
+    assert plan["total_files"] == 3
+    assert not os.path.exists(output_json)
+
+    upload.main(["--execute-plan", plan_json, "--dry-run"])
+    assert not os.path.exists(output_json)
+    for path in plan["temporary_files"]:
+        os.remove(path)
+
+
+def test_upload_metrics(tmp_path):
+    data_file = tmp_path / "data.h5ad"
+    data_file.write_bytes(b"x" * 1000)
+    inputs = {"wf.a": str(data_file), "wf.b": str(data_file)}
+    events = []
+    metrics_file = str(tmp_path / "metrics.jsonl")
+    io_utils.upload_to_cloud_bucket(
+        inputs,
+        "gcp",
+        "foo",
+        "bar",
+        None,
+        dry_run=True,
+        verbose=False,
+        callbacks=[events.append],
+        metrics_file=metrics_file,
+    )
+    assert [event["event"] for event in events] == [
+        "destination_start",
+        "transfer_start",
+        "transfer_end",
+        "upload_end",
+    ]
+    assert events[2]["bytes"] == 1000 and events[2]["status"] == "ok"
+    with open(metrics_file) as f:
+        records = [json.loads(line) for line in f]
+    assert [record["type"] for record in records] == ["transfer", "destination", "total"]
+    assert records[1]["url"] == inputs["wf.a"] == inputs["wf.b"]
+    assert records[2]["files"] == 1 and records[2]["bytes"] == 1000
+
+
+def test_upload_metrics_failed(tmp_path, monkeypatch):
+    def fail(command, *args, **kwargs):
+        raise subprocess.CalledProcessError(1, command)
+
+    monkeypatch.setattr(transfer_metrics, "run_command", fail)
+    data_file = tmp_path / "data.h5ad"
+    data_file.write_bytes(b"x" * 1000)
+    events = []
+    metrics_file = str(tmp_path / "metrics.jsonl")
+    with pytest.raises(subprocess.CalledProcessError):
+        io_utils.upload_to_cloud_bucket(
+            {"wf.a": str(data_file)},
+            "gcp",
+            "foo",
+            "bar",
+            None,
+            dry_run=False,
+            verbose=False,
+            callbacks=[events.append],
+            metrics_file=metrics_file,
+        )
+    assert events[-1]["event"] == "upload_end" and events[-1]["failed"] == 1
+    with open(metrics_file) as f:
+        records = [json.loads(line) for line in f]
+    assert records[0]["type"] == "transfer" and records[0]["status"] == "failed"
+    assert records[-1]["type"] == "total" and records[-1]["failed"] == 1
+
+
+def test_localize_remote(tmp_path, monkeypatch):
+    commands = []
+    monkeypatch.setattr(
+        io_utils, "run_command", lambda command, *args, **kwargs: commands.append(command)
+    )
+    sample_sheet = tmp_path / "sample_sheet.csv"
+    sample_sheet.write_text("Sample,Flowcell\ns1,gs://other/flowcell\ns2,gs://other/flowcell\n")
+    inputs = {
+        "wf.a": "gs://other/data.h5ad",
+        "wf.b": "gs://foo/bar/in_place.h5ad",
+        "wf.c": "s3://other/data.h5ad",
+        "wf.d": str(sample_sheet),
+    }
+    io_utils.upload_to_cloud_bucket(
+        inputs, "gcp", "foo", "bar", None, dry_run=True, verbose=False, localize_remote=True
+    )
+    assert inputs["wf.a"] == "gs://foo/bar/data.h5ad"
+    assert inputs["wf.b"] == "gs://foo/bar/in_place.h5ad"
+    assert inputs["wf.c"] == "s3://other/data.h5ad"
+    assert ["strato", "cp", "--quiet", "gs://other/data.h5ad", "gs://foo/bar/data.h5ad"] in commands
+    assert ["strato", "sync", "--quiet", "gs://other/flowcell", "gs://foo/bar/flowcell"] in commands
+    assert len(commands) == 3  # the rewritten sample sheet is uploaded as well
+
+
+def test_upload_links_once(tmp_path):
+    ref = tmp_path / "ref.fa"
+    ref.write_text("ACGT")
+    os.symlink(ref, tmp_path / "ref_link.fa")
+    os.link(ref, tmp_path / "ref_hardlink.fa")
+    (tmp_path / "ref_copy.fa").write_text("ACGT")
+    names = ["ref.fa", "ref_link.fa", "ref_hardlink.fa", "ref_copy.fa"]
+
+    inputs = {name: str(tmp_path / name) for name in names}
+    io_utils.upload_to_cloud_bucket(inputs, "gcp", "foo", None, None, dry_run=True, verbose=False)
+    assert len(set(inputs.values())) == 2
+    assert inputs["ref_link.fa"] == inputs["ref_hardlink.fa"] == "gs://foo/ref.fa"
+
+    inputs = {name: str(tmp_path / name) for name in names}
+    io_utils.upload_to_cloud_bucket(
+        inputs, "gcp", "foo", None, None, dry_run=True, verbose=False, content_hash=True
+    )
+    assert set(inputs.values()) == {"gs://foo/ref.fa"}
+
+
+def test_upload_compressed(tmp_path, monkeypatch):
+    commands = []
+    monkeypatch.setattr(
+        io_utils, "run_command", lambda command, *args, **kwargs: commands.append(command)
+    )
+    matrix = tmp_path / "matrix.mtx"
+    matrix.write_text("%%MatrixMarket matrix coordinate integer general\n1 1 1\n1 1 5\n")
+    sample_sheet = tmp_path / "sample_sheet.csv"
+    sample_sheet.write_text(f"Sample,Location\ns1,{matrix}\n")
+    inputs = {"wf.sheet": str(sample_sheet), "wf.barcodes": str(tmp_path / "barcodes.tsv")}
+    (tmp_path / "barcodes.tsv").write_text("AAAC\n")
+    io_utils.upload_to_cloud_bucket(
+        inputs,
+        "gcp",
+        "foo",
+        None,
+        None,
+        dry_run=True,
+        verbose=False,
+        compress="gzip",
+        compress_extensions={".mtx"},
+    )
+    module = [sys.executable, "-m", "alto.utils.compress_utils", "--codec", "gzip"]
+    assert module + [str(matrix), "gs://foo/matrix.mtx.gz"] in commands
+    assert inputs["wf.sheet"] == "gs://foo/sample_sheet.csv"  # sample sheets are not compressed
+    assert inputs["wf.barcodes"] == "gs://foo/barcodes.tsv"  # not in compress_extensions
+
+    output = tmp_path / "uploaded.gz"
+    monkeypatch.setattr(
+        compress_utils, "_uploader", lambda dest, profile: ["cp", "/dev/stdin", dest]
+    )
+    compress_utils.stream_compressed(str(matrix), str(output), "gzip")
+    assert gzip.decompress(output.read_bytes()) == matrix.read_bytes()
@@ -1,4 +1,17 @@
+import os
+import zipfile
+import functools
+import threading
+import http.server
+
+import pytest
+
 from alto.utils.io_utils import get_workflow_imports
+from alto.utils.wdl_utils import (
+    build_dependency_zip,
+    build_prefetched_workflow,
+    resolve_workflow_imports,
+)
 
 
 def test_imports(tmp_path):
@@ -12,3 +25,84 @@ def test_imports(tmp_path):
     assert len(workflow_imports) == 2
     assert workflow_imports[0] == "https://raw.githubusercontent.com/foo.wdl"
     assert workflow_imports[1] == "local.wdl"
+
+
+def write_wdl(path, imports):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wt") as f:
+        f.write("version 1.0\n")
+        for imported in imports:
+            f.write(f'import "{imported}"\n')
+
+
+def test_dependency_zip(tmp_path):
+    write_wdl(tmp_path / "main.wdl", ["tasks/a.wdl", "b.wdl"])
+    write_wdl(tmp_path / "tasks" / "a.wdl", ["../b.wdl"])
+    write_wdl(tmp_path / "b.wdl", ["https://raw.githubusercontent.com/foo.wdl"])
+
+    deps = resolve_workflow_imports(str(tmp_path / "main.wdl"))
+    assert sorted(deps.values()) == ["b.wdl", "tasks/a.wdl"]
+
+    cache_dir = str(tmp_path / "cache")
+    os.makedirs(cache_dir)
+    zip_path = build_dependency_zip(str(tmp_path / "main.wdl"), cache_dir=cache_dir)
+    with zipfile.ZipFile(zip_path) as f:
+        assert sorted(f.namelist()) == ["b.wdl", "tasks/a.wdl"]
+    assert build_dependency_zip(str(tmp_path / "main.wdl"), cache_dir=cache_dir) == zip_path
+
+    write_wdl(tmp_path / "b.wdl", [])
+    assert build_dependency_zip(str(tmp_path / "main.wdl"), cache_dir=cache_dir) != zip_path
+
+    write_wdl(tmp_path / "b.wdl", ["tasks/a.wdl"])
+    with pytest.raises(ValueError, match="Circular"):
+        resolve_workflow_imports(str(tmp_path / "main.wdl"))
+
+
+def test_prefetch_imports(tmp_path, capsys):
+    remote_dir = tmp_path / "remote"
+    write_wdl(remote_dir / "wf" / "a.wdl", ["tasks.wdl"])
+    write_wdl(remote_dir / "wf" / "tasks.wdl", [])
+
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=str(remote_dir))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/wf/a.wdl"
+    write_wdl(tmp_path / "main.wdl", [url, "local.wdl"])
+    write_wdl(tmp_path / "local.wdl", [])
+
+    import_cache_dir = str(tmp_path / "imports")
+    zip_cache_dir = str(tmp_path / "zips")
+    os.makedirs(import_cache_dir)
+    os.makedirs(zip_cache_dir)
+    try:
+        source, zip_path = build_prefetched_workflow(
+            str(tmp_path / "main.wdl"),
+            import_cache_dir=import_cache_dir,
+            zip_cache_dir=zip_cache_dir,
+        )
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    arcname = f"imports/127.0.0.1_{server.server_address[1]}/wf/a.wdl"
+    assert f'import "{arcname}"' in source.decode()
+    assert 'import "local.wdl"' in source.decode()
+    with zipfile.ZipFile(zip_path) as f:
+        assert sorted(f.namelist()) == [
+            arcname,
+            f"imports/127.0.0.1_{server.server_address[1]}/wf/tasks.wdl",
+            "local.wdl",
+        ]
+        assert 'import "imports/' in f.read(arcname).decode()
+
+    # The server is down: expired copies in the cache are used.
+    assert build_prefetched_workflow(
+        str(tmp_path / "main.wdl"),
+        ttl=0,
+        import_cache_dir=import_cache_dir,
+        zip_cache_dir=zip_cache_dir,
+    ) == (source, zip_path)
+    # The warning does not mix with the structured output of 'cromwell run --prefetch-imports'.
+    captured = capsys.readouterr()
+    assert captured.out == "" and "Use the copy cached at" in captured.err
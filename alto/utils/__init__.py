@@ -1,17 +1,34 @@
+import os
+import copy
+import time
+import functools
+import threading
 import subprocess
 from typing import List
 
 
 prefix_float = "_&@&_"
 
+# Seconds for which Dockstore, Agora and workspace lookups are cached in a process.
+lookup_cache_ttl = 600.0
+
 
 def run_command(
     command: List[str],
     dry_run: bool,
     suppress_stdout: bool = False,
     suppress_stderr: bool = False,
+    recorder=None,
 ) -> None:
-    """Print command and execute it (if dry_run == False)."""
+    """Print command and execute it (if dry_run == False).
+
+    If recorder (an UploadPlan or TransferMonitor object) is given, the command is passed to it
+    instead: an UploadPlan only records the command, and a TransferMonitor runs and measures it.
+    """
+    if recorder is not None:
+        recorder.add_command(command)
+        return
+
     cur_stdout = subprocess.DEVNULL if suppress_stdout else None
     cur_stderr = subprocess.DEVNULL if suppress_stderr else None
 
@@ -22,13 +39,63 @@ def run_command(
         subprocess.check_call(command, stdout=cur_stdout, stderr=cur_stderr)
 
 
+def get_cache_dir(*subdirs: str) -> str:
+    """Return (and create if needed) a folder under altocumulus' local cache directory.
+
+    The cache directory is ``$ALTO_CACHE_DIR`` if set, otherwise ``~/.cache/altocumulus``.
+    """
+    cache_dir = os.environ.get(
+        "ALTO_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "altocumulus")
+    )
+    cache_dir = os.path.join(cache_dir, *subdirs)
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def ttl_cache(func):
+    """Cache results of func by its arguments for ``lookup_cache_ttl`` seconds.
+
+    Callers get deep copies of the cached results, so they can modify them freely. Like
+    ``functools.lru_cache``, the wrapper has a ``cache_clear()`` method.
+    """
+    cache = dict()
+    lock = threading.Lock()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        with lock:
+            entry = cache.get(key)
+        if entry is None or time.monotonic() - entry[0] >= lookup_cache_ttl:
+            entry = (time.monotonic(), func(*args, **kwargs))
+            with lock:
+                cache[key] = entry
+        return copy.deepcopy(entry[1])
+
+    wrapper.cache_clear = cache.clear
+    return wrapper
+
+
+from .cromwell_client import CromwellClient, CromwellError  # noqa: F401, E402
 from .dockstore_utils import get_dockstore_workflow, parse_dockstore_workflow  # noqa: F401, E402
 from .firecloud_utils import (  # noqa: F401, E402
+    create_entity_set,
     get_firecloud_workflow,
+    get_submission_url,
     get_workspace_info,
+    launch_terra_submission,
     parse_firecloud_workflow,
     parse_workspace,
     submit_a_job_to_terra,
     update_workflow_config_in_workspace,
+    upload_entity_table,
+    watch_submissions,
 )
 from .io_utils import read_wdl_inputs, upload_to_cloud_bucket  # noqa: F401, E402
+from .output_utils import (  # noqa: F401, E402
+    RecordWriter,
+    is_structured_output,
+    set_output_format,
+)
+from .transfer_metrics import TransferMonitor  # noqa: F401, E402
+from .upload_plan import UploadPlan, execute_upload_plan  # noqa: F401, E402
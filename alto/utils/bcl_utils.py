@@ -43,6 +43,7 @@ def transfer_flowcell(
     dry_run: bool,
     profile: Optional[str] = None,
     verbose: bool = True,
+    recorder=None,
 ) -> None:
     """Transfer one flowcell (with selected lanes) to cloud.
 
@@ -60,6 +61,8 @@ def transfer_flowcell(
         If not None, use this profile for AWS backend.
     verbose: `bool`, optional, default: `True`
         Print messages to STDOUT.
+    recorder: `UploadPlan` or `TransferMonitor`, optional, default: `None`
+        If not None, pass commands to this object instead of running them.
 
     Returns
     -------
@@ -79,7 +82,7 @@ def transfer_flowcell(
     ]
     if profile is not None:
         strato_cmd.extend(["--profile", profile])
-    run_command(strato_cmd, dry_run, suppress_stdout=not verbose)
+    run_command(strato_cmd, dry_run, suppress_stdout=not verbose, recorder=recorder)
 
     if not os.path.exists(f"{source}/RTAComplete.txt"):
         raise FileNotFoundError(
@@ -95,7 +98,7 @@ def transfer_flowcell(
     ]
     if profile is not None:
         strato_cmd.extend(["--profile", profile])
-    run_command(strato_cmd, dry_run, suppress_stdout=not verbose)
+    run_command(strato_cmd, dry_run, suppress_stdout=not verbose, recorder=recorder)
 
     if os.path.exists(f"{source}/runParameters.xml"):
         strato_cmd = [
@@ -119,7 +122,7 @@ def transfer_flowcell(
         raise FileNotFoundError("Cannot find either runParameters.xml or RunParameters.xml!")
     if profile is not None:
         strato_cmd.extend(["--profile", profile])
-    run_command(strato_cmd, dry_run, suppress_stdout=not verbose)
+    run_command(strato_cmd, dry_run, suppress_stdout=not verbose, recorder=recorder)
 
     basecall_string = "{0}/Data/Intensities/BaseCalls"
     if len(lanes) == 1 and lanes[0] == "*":
@@ -143,7 +146,7 @@ def transfer_flowcell(
         ]
         if profile is not None:
             strato_cmd.extend(["--profile", profile])
-        run_command(strato_cmd, dry_run, suppress_stdout=not verbose)
+        run_command(strato_cmd, dry_run, suppress_stdout=not verbose, recorder=recorder)
 
     # copy locs files
     locs_string = "{0}/Data/Intensities/s.locs"
@@ -158,7 +161,7 @@ def transfer_flowcell(
         ]
         if profile is not None:
             strato_cmd.extend(["--profile", profile])
-        run_command(strato_cmd, dry_run, suppress_stdout=not verbose)
+        run_command(strato_cmd, dry_run, suppress_stdout=not verbose, recorder=recorder)
     else:
         locs_string = "{0}/Data/Intensities/{1}"
         for lane in lanes:
@@ -173,4 +176,4 @@ def transfer_flowcell(
             ]
             if profile is not None:
                 strato_cmd.extend(["--profile", profile])
-            run_command(strato_cmd, dry_run, suppress_stdout=not verbose)
+            run_command(strato_cmd, dry_run, suppress_stdout=not verbose, recorder=recorder)
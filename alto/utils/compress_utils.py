@@ -0,0 +1,112 @@
+import os
+import sys
+import shutil
+import argparse
+import subprocess
+from typing import List, Optional, Set
+
+
+compress_extension_whitelist = set([".mtx", ".csv", ".tsv", ".txt"])
+compressed_suffixes = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def get_compression(
+    path: str, compression: Optional[str], extensions: Optional[Set[str]] = None
+) -> Optional[str]:
+    """Return the codec to compress path with while uploading, or None to upload it verbatim.
+
+    Only files whose extension (case insensitive) is in extensions (default:
+    compress_extension_whitelist) are compressed, as the workflows reading them must accept the
+    compressed format.
+    """
+    if compression is None or not os.path.isfile(path):
+        return None
+    if extensions is None:
+        extensions = compress_extension_whitelist
+    return compression if os.path.splitext(path)[1].lower() in extensions else None
+
+
+def compress_upload_command(
+    source: str, dest: str, compression: str, profile: Optional[str] = None
+) -> List[str]:
+    """Command compressing source and streaming it to dest, which should end with the suffix of
+    compression. The command runs this module, so it can be recorded in upload plans."""
+    command = [
+        sys.executable,
+        "-m",
+        "alto.utils.compress_utils",
+        "--codec",
+        compression,
+        source,
+        dest,
+    ]
+    if profile is not None:
+        command.extend(["--profile", profile])
+    return command
+
+
+def _compressor(compression: str) -> List[str]:
+    if compression == "gzip":
+        return ["pigz" if shutil.which("pigz") is not None else "gzip", "-c"]
+    assert compression == "zstd"
+    if shutil.which("zstd") is None:
+        raise Exception("zstd is not installed!")
+    return ["zstd", "-c", "-q", "-T0"]
+
+
+def _uploader(dest: str, profile: Optional[str]) -> List[str]:
+    if dest.startswith("gs://"):
+        return ["gcloud", "storage", "--no-user-output-enabled", "cp", "-", dest]
+    assert dest.startswith("s3://"), "Must be a gs:// or s3:// URL!"
+    command = ["aws", "s3", "cp", "--only-show-errors", "-", dest]
+    if profile is not None:
+        command.extend(["--profile", profile])
+    return command
+
+
+def stream_compressed(
+    source: str, dest: str, compression: str, profile: Optional[str] = None
+) -> None:
+    """Compress source and upload the compressed stream to dest, without a temporary file.
+
+    Parameters
+    ----------
+    source: `str`
+        Local file path.
+    dest: `str`
+        Cloud URL (gs:// or s3://) of the compressed file.
+    compression: `str`
+        Codec, choosing from 'gzip' (pigz is used if installed) and 'zstd'.
+    profile: `str`, optional
+        AWS profile. Only works for S3 URLs.
+
+    Returns
+    -------
+    None
+    """
+    compressor_cmd = _compressor(compression)
+    uploader_cmd = _uploader(dest, profile)
+    with open(source, "rb") as fin:
+        compressor = subprocess.Popen(compressor_cmd, stdin=fin, stdout=subprocess.PIPE)
+        uploader = subprocess.Popen(uploader_cmd, stdin=compressor.stdout)
+        compressor.stdout.close()  # so that the compressor gets SIGPIPE if the uploader exits
+        uploader_code = uploader.wait()
+        compressor_code = compressor.wait()
+    if compressor_code != 0:
+        raise subprocess.CalledProcessError(compressor_code, compressor_cmd)
+    if uploader_code != 0:
+        raise subprocess.CalledProcessError(uploader_code, uploader_cmd)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Compress a local file while uploading it.")
+    parser.add_argument("--codec", dest="codec", choices=list(compressed_suffixes), required=True)
+    parser.add_argument("--profile", dest="profile", help="AWS profile.")
+    parser.add_argument("source", help="Local file.")
+    parser.add_argument("dest", help="Cloud URL of the compressed file.")
+    args = parser.parse_args(argv)
+    stream_compressed(args.source, args.dest, args.codec, profile=args.profile)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,379 @@
+import json
+import asyncio
+import threading
+from contextlib import ExitStack
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    TypeVar,
+    Union,
+)
+
+import aiohttp
+
+from .cromwell_utils import get_api_url, terminal_statuses
+
+
+T = TypeVar("T")
+
+
+class CromwellError(Exception):
+    """An error response of the Cromwell server, with its HTTP status code."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class CromwellClient:
+    """Asynchronous client of Cromwell's workflows API.
+
+    All requests share one aiohttp session, which keeps at most max_connections connections to
+    the server, so a large number of jobs can be handled concurrently by awaiting many requests
+    at once (e.g. with ``asyncio.gather``) from one process. Failed requests raise
+    :class:`CromwellError` with the server's message.
+
+    Examples
+    --------
+    >>> async def get_statuses(job_ids):
+    ...     async with CromwellClient('localhost', 8000) as client:
+    ...         return await asyncio.gather(*[client.status(job_id) for job_id in job_ids])
+    >>> results = asyncio.run(get_statuses(['<job_id_1>', '<job_id_2>']))
+    """
+
+    def __init__(self, server: str, port=8000, max_connections: int = 16, timeout: float = 300.0):
+        self.base_url = get_api_url(server, port)
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._session = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _request(self, method: str, path: str, parse_json: bool = True, **kwargs):
+        await self.open()
+        async with self._session.request(method, f"{self.base_url}{path}", **kwargs) as resp:
+            status = resp.status
+            text = await resp.text()
+        if status // 100 != 2:
+            try:
+                message = json.loads(text).get("message", text)
+            except (ValueError, AttributeError):
+                message = text
+            raise CromwellError(message, status)
+        return json.loads(text) if parse_json else text
+
+    async def submit(
+        self,
+        workflow_source: Union[str, bytes, BinaryIO, None] = None,
+        workflow_url: Optional[str] = None,
+        inputs: Union[str, dict, None] = None,
+        dependencies: Union[str, bytes, BinaryIO, None] = None,
+        options: Optional[dict] = None,
+        labels: Optional[dict] = None,
+        workflow_name: str = "workflow.wdl",
+    ) -> dict:
+        """Submit a workflow, given either its WDL source or its URL.
+
+        Parameters
+        ----------
+        workflow_source: `str`, `bytes` or binary file object, optional
+            Path to, content of, or open handle of the main WDL file, named workflow_name in the
+            request.
+        workflow_url: `str`, optional
+            HTTP or HTTPS URL of the main WDL file, if workflow_source is not given.
+        inputs: `str` or `dict`, optional
+            Workflow inputs, as a JSON string or a dictionary.
+        dependencies: `str`, `bytes` or binary file object, optional
+            Path to, content of, or open handle of the zip file of imported WDL files.
+        options: `dict`, optional
+            Workflow options.
+        labels: `dict`, optional
+            Job labels.
+
+        Returns
+        -------
+        `dict` object.
+            Cromwell's response, with the job 'id' and 'status'.
+        """
+        if (workflow_source is None) == (workflow_url is None):
+            raise ValueError("Exactly one of workflow_source and workflow_url must be given!")
+        # Files given by path are streamed from handles closed when the request is done.
+        with ExitStack() as stack:
+            form = aiohttp.FormData()
+            if workflow_source is not None:
+                if isinstance(workflow_source, str):
+                    workflow_source = stack.enter_context(open(workflow_source, "rb"))
+                form.add_field("workflowSource", workflow_source, filename=workflow_name)
+            else:
+                form.add_field("workflowUrl", workflow_url)
+            if inputs is not None:
+                if not isinstance(inputs, str):
+                    inputs = json.dumps(inputs)
+                form.add_field("workflowInputs", inputs.encode(), filename="inputs.json")
+            if dependencies is not None:
+                if isinstance(dependencies, str):
+                    dependencies = stack.enter_context(open(dependencies, "rb"))
+                form.add_field("workflowDependencies", dependencies, filename="dependencies.zip")
+            if labels is not None:
+                form.add_field("labels", json.dumps(labels).encode(), filename="labels.json")
+            if options:
+                form.add_field(
+                    "workflowOptions", json.dumps(options).encode(), filename="options.json"
+                )
+            return await self._request("POST", "", data=form)
+
+    async def status(self, job_id: str) -> dict:
+        """Return the job 'id' and 'status'."""
+        return await self._request("GET", f"/{job_id}/status")
+
+    async def abort(self, job_id: str) -> dict:
+        """Abort a job, and return its 'id' and new 'status'."""
+        return await self._request("POST", f"/{job_id}/abort")
+
+    async def metadata(
+        self,
+        job_id: str,
+        include_keys: Optional[List[str]] = None,
+        exclude_keys: Optional[List[str]] = None,
+        expand_subworkflows: bool = False,
+    ) -> dict:
+        """Return the job metadata, restricted to include_keys and without exclude_keys if set."""
+        params = [("expandSubWorkflows", "true" if expand_subworkflows else "false")]
+        params.extend(("includeKey", key) for key in include_keys or [])
+        params.extend(("excludeKey", key) for key in exclude_keys or [])
+        return await self._request("GET", f"/{job_id}/metadata", params=params)
+
+    async def outputs(self, job_id: str) -> dict:
+        return await self._request("GET", f"/{job_id}/outputs")
+
+    async def logs(self, job_id: str) -> dict:
+        """Return the URIs of stdout and stderr of each call of the job, excluding subworkflows."""
+        return await self._request("GET", f"/{job_id}/logs")
+
+    async def timing(self, job_id: str) -> str:
+        """Return the HTML page of the job's timing diagram."""
+        return await self._request("GET", f"/{job_id}/timing", parse_json=False)
+
+    async def iter_query(
+        self, query_data: List[dict], num_shown: Optional[int] = None, page_size: int = 1000
+    ) -> AsyncIterator[dict]:
+        """Yield jobs matching query_data (the body of a /query request) page by page, stopping
+        after num_shown jobs if set, which also caps the page size."""
+        if num_shown is not None:
+            page_size = max(min(num_shown, page_size), 1)
+        page = 1
+        n_jobs = 0
+        while True:
+            resp_dict = await self._request(
+                "POST",
+                "/query",
+                json=query_data + [{"page": str(page)}, {"pageSize": str(page_size)}],
+            )
+            results = resp_dict["results"]
+            for job in results:
+                yield job
+                n_jobs += 1
+                if num_shown is not None and n_jobs >= num_shown:
+                    return
+            # No empty page is requested once totalResultsCount jobs are seen.
+            if len(results) < page_size or n_jobs >= resp_dict.get("totalResultsCount", n_jobs + 1):
+                return
+            page += 1
+
+    async def query(
+        self, query_data: List[dict], num_shown: Optional[int] = None, page_size: int = 1000
+    ) -> List[dict]:
+        """Return all jobs yielded by :meth:`iter_query`."""
+        return [job async for job in self.iter_query(query_data, num_shown, page_size)]
+
+    async def wait(
+        self, job_id: str, interval: float = 60.0, time_out: Optional[float] = None
+    ) -> str:
+        """Check the job status every interval seconds, starting interval seconds from now, until
+        it finishes or time_out hours have passed. Return the last status."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + time_out * 3600 if time_out is not None else None
+        while True:
+            await asyncio.sleep(interval)
+            status = (await self.status(job_id))["status"]
+            if status in terminal_statuses:
+                return status
+            if deadline is not None and loop.time() >= deadline:
+                return status
+
+    async def map_jobs(self, method: str, job_ids: List[str]) -> List[Dict[str, str]]:
+        """Call the status or abort method for every job concurrently. Return one dictionary of
+        'id', 'status' and 'message' (the error message, or '' on success) per job, in order.
+
+        Error responses, connection errors, time-outs and invalid responses only fail the job
+        they happen to."""
+
+        async def call(job_id):
+            try:
+                resp_dict = await getattr(self, method)(job_id)
+                return {"id": resp_dict["id"], "status": resp_dict["status"], "message": ""}
+            except (CromwellError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                return {"id": job_id, "status": "", "message": str(e) or type(e).__name__}
+            except (ValueError, KeyError, TypeError):  # not the JSON document of a job
+                return {"id": job_id, "status": "", "message": "Invalid response from Cromwell."}
+
+        return list(await asyncio.gather(*[call(job_id) for job_id in job_ids]))
+
+
+class ClientPool:
+    """Cromwell clients kept open on an event loop running in a background thread.
+
+    One client is created per server and port on first use and shared by all later calls from
+    any thread, so HTTP connections to Cromwell are reused across calls. It is used by
+    ``alto serve``, whose requests would otherwise each open and close their own connections.
+    """
+
+    def __init__(self, max_connections: int = 16):
+        self.max_connections = max_connections
+        self.clients = dict()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def run(self, server: str, port, func: Callable[[CromwellClient], Awaitable[T]]) -> T:
+        """Await func with the client of server and port on the pool's loop, and return its
+        result."""
+
+        async def call():
+            key = (server, str(port))
+            client = self.clients.get(key)
+            if client is None:
+                client = self.clients[key] = CromwellClient(
+                    server, port, max_connections=self.max_connections
+                )
+            return await func(client)
+
+        return asyncio.run_coroutine_threadsafe(call(), self.loop).result()
+
+    def iterate(
+        self, server: str, port, func: Callable[[CromwellClient], AsyncIterator[T]]
+    ) -> Iterator[T]:
+        """Yield the items of func with the client of server and port as they arrive."""
+
+        async def start(client):
+            return func(client)
+
+        items = self.run(server, port, start)
+        yield from _iterate(
+            items, lambda coro: asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+        )
+
+    def close(self):
+        async def close_clients():
+            for client in self.clients.values():
+                await client.close()
+
+        asyncio.run_coroutine_threadsafe(close_clients(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+_client_pool = None
+
+
+def _iterate(items: AsyncIterator[T], run: Callable[[Awaitable], object]) -> Iterator[T]:
+    """Yield the items of an async iterator, running each step with run until it completes."""
+
+    async def next_item():
+        try:
+            return False, await items.__anext__()
+        except StopAsyncIteration:
+            return True, None
+
+    try:
+        while True:
+            done, item = run(next_item())
+            if done:
+                return
+            yield item
+    finally:  # e.g. the caller stopped early
+        if hasattr(items, "aclose"):
+            run(items.aclose())
+
+
+def set_client_pool(pool: Optional[ClientPool]) -> None:
+    """Make :func:`run_with_client` use the clients of pool, or open a client per call if None."""
+    global _client_pool
+    _client_pool = pool
+
+
+def run_with_client(
+    server: str, port, func: Callable[[CromwellClient], Awaitable[T]], max_connections: int = 16
+) -> T:
+    """Await func with a client of server and port, and return its result.
+
+    This is how commands call the client from synchronous code. A client with at most
+    max_connections connections is opened for this call, unless a pool is set by
+    :func:`set_client_pool`, whose shared clients are then used.
+
+    Examples
+    --------
+    >>> status = run_with_client('localhost', 8000, lambda client: client.status('<job_id>'))
+    """
+    if _client_pool is not None:
+        return _client_pool.run(server, port, func)
+
+    async def call():
+        async with CromwellClient(server, port, max_connections=max_connections) as client:
+            return await func(client)
+
+    return asyncio.run(call())
+
+
+def iterate_with_client(
+    server: str,
+    port,
+    func: Callable[[CromwellClient], AsyncIterator[T]],
+    max_connections: int = 16,
+) -> Iterator[T]:
+    """Yield the items of the async iterator returned by func with a client of server and port,
+    as they arrive.
+
+    It is the counterpart of :func:`run_with_client` for results that are streamed, e.g. jobs of
+    :meth:`CromwellClient.iter_query` printed while later pages are fetched.
+
+    Examples
+    --------
+    >>> for job in iterate_with_client('localhost', 8000, lambda client: client.iter_query([])):
+    ...     print(job['id'])
+    """
+    if _client_pool is not None:
+        yield from _client_pool.iterate(server, port, func)
+        return
+
+    loop = asyncio.new_event_loop()
+    client = CromwellClient(server, port, max_connections=max_connections)
+    try:
+        yield from _iterate(func(client), loop.run_until_complete)
+    finally:
+        loop.run_until_complete(client.close())
+        loop.close()
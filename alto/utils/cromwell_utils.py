@@ -0,0 +1,224 @@
+import sys
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+terminal_statuses = {"Succeeded", "Failed", "Aborted"}
+
+# Workflow options documented by Cromwell, see https://cromwell.readthedocs.io/en/stable/wf_options/Overview/
+workflow_option_keys = {
+    "final_workflow_outputs_dir",
+    "use_relative_output_paths",
+    "final_workflow_log_dir",
+    "final_call_logs_dir",
+    "workflow_failure_mode",
+    "default_runtime_attributes",
+    "continueOnReturnCode",
+    "write_to_cache",
+    "read_from_cache",
+    "delete_intermediate_output_files",
+    "workflow_callback_uri",
+    "jes_gcs_root",
+    "google_project",
+    "google_compute_service_account",
+    "google_labels",
+    "refresh_token",
+    "auth_bucket",
+    "monitoring_script",
+    "monitoring_image",
+    "monitoring_image_script",
+    "enable_ssh_access",
+    "delocalization_timeout",
+    "memory_retry_multiplier",
+    "user_service_account_json",
+    "google_legacy_machine_selection",
+    "backend",
+}
+workflow_failure_modes = {"ContinueWhilePossible", "NoNewCalls"}
+
+
+def get_api_url(server: str, port) -> str:
+    """Return the base URL of Cromwell's workflows API on the given server."""
+    return f"http://{server}:{port}/api/workflows/v1"
+
+
+def create_session(pool_size: int = 10) -> requests.Session:
+    """Create an HTTP session that keeps up to pool_size connections open for concurrent use."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def map_jobs(func: Callable, job_ids: List[str], max_workers: int = 16) -> list:
+    """Apply func to every job ID concurrently with a bounded pool, keeping the input order."""
+    if len(job_ids) <= 1:
+        return [func(job_id) for job_id in job_ids]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(func, job_ids))
+
+
+def read_job_ids(job_ids: Optional[List[str]], id_file: Optional[str]) -> List[str]:
+    """Collect job IDs given on the command line and in a file (one ID per line), without
+    duplicates."""
+    results = list(job_ids or [])
+    if id_file is not None:
+        with open(id_file, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line != "" and not line.startswith("#"):
+                    results.append(line)
+    return list(dict.fromkeys(results))
+
+
+def parse_key_value(key_value: str) -> Tuple[str, object]:
+    """Parse a 'key=value' string given on the command line. The value is parsed as JSON if
+    possible (e.g. 'true', '2', '{"a": 1}'), otherwise it is kept as a string."""
+    key, sep, value = key_value.partition("=")
+    key = key.strip()
+    if sep == "" or key == "":
+        raise ValueError(f"'{key_value}' is not in the format of key=value!")
+    try:
+        value = json.loads(value)
+    except ValueError:
+        pass
+    return key, value
+
+
+def build_workflow_options(
+    options_file: Optional[str] = None,
+    options: Optional[List[str]] = None,
+    overrides: Optional[dict] = None,
+) -> dict:
+    """Merge workflow options into one document sent to Cromwell.
+
+    Options are read from options_file (a JSON file) first, then updated by options, each in the
+    format of 'key=value', where a dotted key sets a nested option (e.g.
+    'default_runtime_attributes.preemptible=2'). Options in overrides, set by dedicated command
+    line flags, are applied last.
+    """
+    result = dict()
+    if options_file is not None:
+        with open(options_file, "r") as f:
+            result = json.load(f)
+        if not isinstance(result, dict):
+            raise ValueError(f"Workflow options file {options_file} must contain a JSON object!")
+
+    for key_value in options or []:
+        key, value = parse_key_value(key_value)
+        keys = key.split(".")
+        cur = result
+        for k in keys[:-1]:
+            cur = cur.setdefault(k, dict())
+            if not isinstance(cur, dict):
+                raise ValueError(f"Cannot set option {key}: {k} is not an object!")
+        cur[keys[-1]] = value
+    result.update(overrides or dict())
+
+    for key in result:
+        if key not in workflow_option_keys:
+            print(f"Warning: '{key}' is not a known Cromwell workflow option.", file=sys.stderr)
+    if (
+        "workflow_failure_mode" in result
+        and result["workflow_failure_mode"] not in workflow_failure_modes
+    ):
+        raise ValueError(
+            f"workflow_failure_mode must be one of {', '.join(sorted(workflow_failure_modes))}!"
+        )
+    if "default_runtime_attributes" in result and not isinstance(
+        result["default_runtime_attributes"], dict
+    ):
+        raise ValueError("default_runtime_attributes must be an object!")
+    for key in ["read_from_cache", "write_to_cache", "use_relative_output_paths"]:
+        if key in result and not isinstance(result[key], bool):
+            raise ValueError(f"{key} must be true or false!")
+    return result
+
+
+def build_labels(labels: Optional[List[str]] = None, overrides: Optional[dict] = None) -> dict:
+    """Merge job labels given in the format of 'key=value' with labels set by altocumulus.
+
+    Label values are kept as strings. Keys and values must follow Cromwell's rule of at most 255
+    characters, and keys cannot be empty.
+    """
+    result = dict()
+    for key_value in labels or []:
+        key, sep, value = key_value.partition("=")
+        if sep == "" or key == "":
+            raise ValueError(f"Label '{key_value}' is not in the format of key=value!")
+        result[key] = value
+    result.update(overrides or dict())
+    for key, value in result.items():
+        if len(key) > 255 or len(value) > 255:
+            raise ValueError(f"Label {key} exceeds 255 characters!")
+    return result
+
+
+class MetadataFetcher:
+    """Fetch call-level metadata of a workflow and all its subworkflows.
+
+    Subworkflows of the same level are fetched concurrently over one HTTP session, and only the
+    keys listed in include_keys are requested. Metadata of workflows in a terminal status does not
+    change any more, so it is kept in memory and never requested twice.
+    """
+
+    def __init__(self, server: str, port, include_keys: List[str], max_workers: int = 8):
+        self.base_url = get_api_url(server, port)
+        self.include_keys = list(include_keys)
+        for key in ["status", "subWorkflowId"]:
+            if key not in self.include_keys:
+                self.include_keys.append(key)
+        self.max_workers = max_workers
+        self.session = create_session(max_workers)
+        self.terminal_metadata = {}
+
+    def get_metadata(self, job_id: str) -> dict:
+        metadata = self.terminal_metadata.get(job_id)
+        if metadata is not None:
+            return metadata
+
+        resp = self.session.get(
+            f"{self.base_url}/{job_id}/metadata",
+            params={"includeKey": self.include_keys, "expandSubWorkflows": "false"},
+        )
+        metadata = resp.json()
+        if resp.status_code != 200:
+            raise Exception(metadata["message"])
+        if metadata.get("status") in terminal_statuses:
+            self.terminal_metadata[job_id] = metadata
+        return metadata
+
+    def get_metadata_tree(self, job_id: str) -> Dict[str, dict]:
+        """Return metadata of job_id and all its subworkflows, keyed by workflow ID."""
+        results = {}
+        pending = [job_id]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while len(pending) > 0:
+                fetched = list(executor.map(self.get_metadata, pending))
+                results.update(zip(pending, fetched))
+                pending = [
+                    call["subWorkflowId"]
+                    for metadata in fetched
+                    for call_list in metadata.get("calls", {}).values()
+                    for call in call_list
+                    if "subWorkflowId" in call and call["subWorkflowId"] not in results
+                ]
+        return results
+
+    def iter_calls(
+        self, job_id: str, metadata_tree: Optional[Dict[str, dict]] = None
+    ) -> Iterator[Tuple[str, str, dict]]:
+        """Yield (workflow ID, task name, call metadata) for every task call of job_id, including
+        calls inside subworkflows."""
+        if metadata_tree is None:
+            metadata_tree = self.get_metadata_tree(job_id)
+        for wf_id, metadata in metadata_tree.items():
+            for task_name, call_list in metadata.get("calls", {}).items():
+                for call in call_list:
+                    if "subWorkflowId" not in call:
+                        yield wf_id, task_name, call
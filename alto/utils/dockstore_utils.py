@@ -4,6 +4,8 @@ from urllib.parse import urljoin
 
 import requests
 
+from alto.utils import ttl_cache
+
 
 dockstore_api = "https://dockstore.org/api/"
 
@@ -39,6 +41,7 @@ def parse_dockstore_workflow(workflow_string: str) -> Tuple[str, str, str, str]:
     return organization, collection, workflow, version
 
 
+@ttl_cache
 def get_dockstore_workflow(
     organization: str,
     collection: str,
@@ -49,6 +52,8 @@ def get_dockstore_workflow(
     """Locate a workflow using the organization, collection and workflow hierachy and return results
     in a dictionary.
 
+    Results are cached for ``lookup_cache_ttl`` seconds (see :func:`alto.utils.ttl_cache`).
+
     Parameters
     ----------
     organization: `str`
@@ -30,6 +30,7 @@ def transfer_fastq(
     dry_run: bool,
     profile: Optional[str] = None,
     verbose: bool = True,
+    recorder=None,
 ) -> None:
     for sample in sample_set:
         if len(glob.glob(f"{source}/{sample}_*.fastq.gz")) > 0:
@@ -58,4 +59,4 @@ def transfer_fastq(
         if profile is not None:
             strato_cmd.extend(["--profile", profile])
 
-        run_command(strato_cmd, dry_run, suppress_stdout=not verbose)
+        run_command(strato_cmd, dry_run, suppress_stdout=not verbose, recorder=recorder)
@@ -1,11 +1,19 @@
+import time
 import warnings
-from typing import Tuple
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 
+import pandas as pd
 from firecloud import api as fapi
 
+from alto.utils import ttl_cache
+
 
 warnings.filterwarnings("ignore", "Your application has authenticated", UserWarning, "google")
 
+terra_submission_terminal_statuses = {"Done", "Aborted"}
+
 
 def parse_firecloud_workflow(workflow_string: str) -> Tuple[str, str, int]:
     """Split a Firecloud workflow string.
@@ -37,12 +45,15 @@ def parse_firecloud_workflow(workflow_string: str) -> Tuple[str, str, int]:
     return namespace, name, version
 
 
+@ttl_cache
 def get_firecloud_workflow(
     method_namespace: str, method_name: str, method_version: int = None
 ) -> dict:
     """Locate a workflow using the method_namespace, method_name and method_version hierachy and
     return results in a dictionary.
 
+    Results are cached for ``lookup_cache_ttl`` seconds (see :func:`alto.utils.ttl_cache`).
+
     Parameters
     ----------
     method_namespace: `str`
@@ -107,8 +118,12 @@ def parse_workspace(workspace: str) -> Tuple[str, str]:
     return fields[0], fields[1]
 
 
+@ttl_cache
 def get_workspace_info(workspace_namespace: str, workspace_name: str) -> dict:
-    """Get workspace attributes using workspace_namespace and workspace_name."""
+    """Get workspace attributes using workspace_namespace and workspace_name.
+
+    Results are cached for ``lookup_cache_ttl`` seconds (see :func:`alto.utils.ttl_cache`).
+    """
     ws = fapi.get_workspace(workspace_namespace, workspace_name)
     if ws.status_code == 404:
         raise ValueError(
@@ -117,6 +132,18 @@ def get_workspace_info(workspace_namespace: str, workspace_name: str) -> dict:
     return ws.json()["workspace"]
 
 
+def _same_config(config: dict, method_body: dict) -> bool:
+    """Check if an existing workflow config runs the same method with the same settings."""
+    return (
+        config.get("methodRepoMethod", {}).get("methodUri")
+        == method_body["methodRepoMethod"]["methodUri"]
+        and config.get("rootEntityType") == method_body["rootEntityType"]
+        and config.get("inputs", {}) == method_body["inputs"]
+        and config.get("outputs", {}) == method_body["outputs"]
+        and not config.get("deleted", False)
+    )
+
+
 def update_workflow_config_in_workspace(
     config_namespace: str,
     config_name: str,
@@ -126,12 +153,16 @@ def update_workflow_config_in_workspace(
 ):
     """Update workflow configuration in the given workspace.
 
-    If config does not exist, create one.
+    If config does not exist, create one. The update is skipped if the current config in the
+    workspace already runs the same method with the same settings. The current config is always
+    read, since it may have been changed elsewhere (e.g. in the Terra UI).
     """
     config_exists = fapi.get_workspace_config(
         workspace_namespace, workspace_name, config_namespace, config_name
     )
-    if config_exists.status_code == 200:
+    if config_exists.status_code == 200 and _same_config(config_exists.json(), method_body):
+        pass
+    elif config_exists.status_code == 200:
         config_submission = fapi.update_workspace_config(
             workspace_namespace, workspace_name, config_namespace, config_name, method_body
         )
@@ -149,24 +180,274 @@ def update_workflow_config_in_workspace(
             )
 
 
-def submit_a_job_to_terra(
+def upload_entity_table(
+    workspace_namespace: str, workspace_name: str, entity_tsv: str, entity_type: str = "sample"
+) -> Tuple[str, List[str]]:
+    """Upload a TSV table of entities to the workspace data model.
+
+    Parameters
+    ----------
+    workspace_namespace: `str`
+        Workspace namespace.
+    workspace_name: `str`
+        Workspace name.
+    entity_tsv: `str`
+        Path to a TSV file with one entity per row. The first column contains entity IDs, and the other columns are entity attributes. If the first column header is in Terra's format of 'entity:<type>_id', the entity type is taken from it.
+    entity_type: `str`, optional (default: 'sample')
+        Entity type used if the first column header is not in Terra's format.
+
+    Returns
+    -------
+    `tuple` object.
+        The entity type and the list of uploaded entity IDs.
+
+    Examples
+    --------
+    >>> entity_type, entity_ids = upload_entity_table('kco-tech', 'Cumulus', 'samples.tsv')
+    """
+    df = pd.read_csv(entity_tsv, sep="\t", header=0, dtype=str, keep_default_na=False)
+    id_column = df.columns[0]
+    if id_column.startswith("entity:") and id_column.endswith("_id"):
+        entity_type = id_column[len("entity:") : -len("_id")]
+    df = df.rename(columns={id_column: f"entity:{entity_type}_id"})
+    if df.iloc[:, 0].duplicated().any():
+        raise ValueError(f"Entity IDs in {entity_tsv} are not unique!")
+
+    resp = fapi.upload_entities(
+        workspace_namespace,
+        workspace_name,
+        df.to_csv(sep="\t", index=False),
+        model="flexible",
+    )
+    if resp.status_code != 200:
+        raise ValueError(
+            f"Unable to upload entities to the workspace {workspace_namespace}/{workspace_name}. Response: {resp.status_code} - {resp.text}!"
+        )
+    return entity_type, df.iloc[:, 0].tolist()
+
+
+def create_entity_set(
+    workspace_namespace: str,
+    workspace_name: str,
+    entity_type: str,
+    set_name: str,
+    entity_ids: List[str],
+):
+    """Create (or replace) an entity set of type '<entity_type>_set' containing entity_ids."""
+    rows = [f"membership:{entity_type}_set_id\t{entity_type}"]
+    rows.extend(f"{set_name}\t{entity_id}" for entity_id in entity_ids)
+    resp = fapi.upload_entities(
+        workspace_namespace, workspace_name, "\n".join(rows) + "\n", model="flexible"
+    )
+    if resp.status_code != 200:
+        raise ValueError(
+            f"Unable to create entity set {set_name} in the workspace {workspace_namespace}/{workspace_name}. Response: {resp.status_code} - {resp.text}!"
+        )
+
+
+def launch_terra_submission(
     workspace_namespace: str,
     workspace_name: str,
     config_namespace: str,
     config_name: str,
     use_callcache: bool = True,
+    entity: Optional[str] = None,
+    entity_type: Optional[str] = None,
+    expression: Optional[str] = None,
 ) -> str:
-    """Create a job submission to Terra and if success, return a URL for checking job status."""
+    """Create a job submission to Terra and if success, return the submission ID.
+
+    If entity is set, the method config runs on the entity of type entity_type, or on each entity
+    that expression (e.g. 'this.samples') evaluates to, all in one submission.
+    """
     launch_submission = fapi.create_submission(
         workspace_namespace,
         workspace_name,
         config_namespace,
         config_name,
+        entity=entity,
+        etype=entity_type,
+        expression=expression,
         use_callcache=use_callcache,
     )
     if launch_submission.status_code != 201:
         raise ValueError(f"Unable to launch submission - {launch_submission.json()}!")
 
-    submission_id = launch_submission.json()["submissionId"]
-    status_url = f"https://app.terra.bio/#workspaces/{workspace_namespace}/{workspace_name}/job_history/{submission_id}"
-    return status_url
+    return launch_submission.json()["submissionId"]
+
+
+def get_submission_url(workspace_namespace: str, workspace_name: str, submission_id: str) -> str:
+    """Return the URL for checking status of a submission on Terra."""
+    return f"https://app.terra.bio/#workspaces/{workspace_namespace}/{workspace_name}/job_history/{submission_id}"
+
+
+def submit_a_job_to_terra(
+    workspace_namespace: str,
+    workspace_name: str,
+    config_namespace: str,
+    config_name: str,
+    use_callcache: bool = True,
+    entity: Optional[str] = None,
+    entity_type: Optional[str] = None,
+    expression: Optional[str] = None,
+) -> str:
+    """Create a job submission to Terra and if success, return a URL for checking job status.
+
+    See :func:`launch_terra_submission` for the parameters.
+    """
+    submission_id = launch_terra_submission(
+        workspace_namespace,
+        workspace_name,
+        config_namespace,
+        config_name,
+        use_callcache=use_callcache,
+        entity=entity,
+        entity_type=entity_type,
+        expression=expression,
+    )
+    return get_submission_url(workspace_namespace, workspace_name, submission_id)
+
+
+def get_submission_result(
+    workspace_namespace: str,
+    workspace_name: str,
+    submission: dict,
+    collect_outputs: bool = True,
+    max_workers: int = 8,
+) -> dict:
+    """Summarize a submission returned by Terra's get_submission API, adding outputs and failures
+    of each workflow if collect_outputs is True. Workflow metadata is fetched concurrently."""
+    submission_id = submission["submissionId"]
+
+    def get_workflow_result(workflow):
+        result = dict(
+            workflow_id=workflow.get("workflowId"),
+            entity=workflow.get("workflowEntity", {}).get("entityName"),
+            status=workflow.get("status"),
+        )
+        if collect_outputs and result["workflow_id"] is not None:
+            resp = fapi.get_workflow_metadata(
+                workspace_namespace,
+                workspace_name,
+                submission_id,
+                result["workflow_id"],
+                include_key=["outputs", "failures"],
+            )
+            if resp.status_code == 200:
+                metadata = resp.json()
+                result["outputs"] = metadata.get("outputs", {})
+                if "failures" in metadata:
+                    result["failures"] = metadata["failures"]
+        return result
+
+    workflows = submission.get("workflows", [])
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        workflow_results = list(executor.map(get_workflow_result, workflows))
+
+    return dict(
+        submission_id=submission_id,
+        workspace=f"{workspace_namespace}/{workspace_name}",
+        url=get_submission_url(workspace_namespace, workspace_name, submission_id),
+        status=submission.get("status"),
+        succeeded=len(workflows) > 0
+        and all(workflow["status"] == "Succeeded" for workflow in workflow_results),
+        workflows=workflow_results,
+    )
+
+
+def watch_submissions(
+    workspace_namespace: str,
+    workspace_name: str,
+    submission_ids: List[str],
+    min_interval: float = 30.0,
+    max_interval: float = 600.0,
+    time_out: Optional[float] = None,
+    collect_outputs: bool = True,
+    verbose: bool = True,
+) -> List[dict]:
+    """Wait for Terra submissions to finish and return their results.
+
+    All unfinished submissions are polled in one loop. The polling interval starts at min_interval
+    seconds, doubles up to max_interval seconds while no workflow changes status, and goes back
+    to min_interval once one does.
+
+    Parameters
+    ----------
+    workspace_namespace: `str`
+        Workspace namespace.
+    workspace_name: `str`
+        Workspace name.
+    submission_ids: `list[str]`
+        Submission IDs.
+    min_interval: `float`, optional (default: 30.0)
+        Minimum seconds between two polls.
+    max_interval: `float`, optional (default: 600.0)
+        Maximum seconds between two polls.
+    time_out: `float`, optional (default: None)
+        Stop waiting after time_out hours. By default, wait until all submissions finish.
+    collect_outputs: `bool`, optional (default: True)
+        Collect outputs and failures of every workflow of finished submissions.
+    verbose: `bool`, optional (default: True)
+        Print status changes of submissions.
+
+    Returns
+    -------
+    `list[dict]` object.
+        Results of submissions in the order of submission_ids, each with the submission status, whether all its workflows succeeded, and the status, outputs and failures of each workflow. Submissions unfinished when time_out is reached have 'timed_out' set to True.
+
+    Examples
+    --------
+    >>> results = watch_submissions('kco-tech', 'Cumulus', ['6c0ac4a3-5ad8-4d2b-b8f6-36ad1fe5e0ba'])
+    """
+    submission_ids = list(dict.fromkeys(submission_ids))
+    pending = list(submission_ids)
+    results = dict()
+    last_states = dict()
+    interval = min_interval
+    start = time.monotonic()
+
+    while True:
+        changed = False
+        for submission_id in list(pending):
+            resp = fapi.get_submission(workspace_namespace, workspace_name, submission_id)
+            if resp.status_code != 200:
+                raise ValueError(
+                    f"Unable to fetch submission {submission_id} - {resp.status_code} - {resp.text}!"
+                )
+            submission = resp.json()
+            counts = Counter(workflow.get("status") for workflow in submission.get("workflows", []))
+            state = (submission.get("status"), sorted(counts.items()))
+            if last_states.get(submission_id) != state:
+                changed = True
+                last_states[submission_id] = state
+                if verbose:
+                    print(
+                        f"Submission {submission_id} is {state[0]}: "
+                        + ", ".join(f"{n} {status}" for status, n in state[1])
+                    )
+            if submission.get("status") in terra_submission_terminal_statuses:
+                results[submission_id] = get_submission_result(
+                    workspace_namespace, workspace_name, submission, collect_outputs
+                )
+                pending.remove(submission_id)
+
+        if len(pending) == 0:
+            break
+        interval = min_interval if changed else min(interval * 2, max_interval)
+        if time_out is not None and time.monotonic() - start + interval > time_out * 3600:
+            if verbose:
+                print(f"{time_out}-hour time-out is reached!")
+            break
+        time.sleep(interval)
+
+    for submission_id in pending:
+        results[submission_id] = dict(
+            submission_id=submission_id,
+            workspace=f"{workspace_namespace}/{workspace_name}",
+            url=get_submission_url(workspace_namespace, workspace_name, submission_id),
+            status=last_states[submission_id][0],
+            succeeded=False,
+            timed_out=True,
+            workflows=[],
+        )
+    return [results[submission_id] for submission_id in submission_ids]
@@ -1,9 +1,11 @@
 import os
 import re
 import json
+import hashlib
 import tempfile
 from collections import namedtuple
-from typing import Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
 from urllib.parse import urlparse
 
 import numpy as np
@@ -12,13 +14,15 @@ import pandas as pd
 from alto.utils import prefix_float, run_command
 
 from .bcl_utils import lane_manager, path_is_bcl, transfer_flowcell
+from .compress_utils import compress_upload_command, compressed_suffixes, get_compression
 from .fastq_utils import path_is_fastq, sample_manager, transfer_fastq
+from .sync_utils import TransferPool
 from .tar_utils import path_is_tar, sample_manager, transfer_tar
 
 
 FlowcellType = namedtuple("FlowcellType", ["type", "manager"])
 
-import_pattern = '^import "(.+)"'
+import_pattern = r"^import\s+([\"'])(.+?)\1"
 
 
 def _get_scheme(path):
@@ -35,7 +39,7 @@ def get_workflow_imports(path):
             line = line.strip()
             result = re.match(import_pattern, line)
             if result:
-                workflow_imports.append(result.group(1))
+                workflow_imports.append(result.group(2))
     return workflow_imports
 
 
@@ -70,6 +74,28 @@ def read_wdl_inputs(input_json: str) -> dict:
     return wdl_inputs
 
 
+def dump_wdl_inputs(wdl_inputs: dict) -> str:
+    """Serialize inputs loaded by :func:`read_wdl_inputs` into a JSON string, writing floats
+    exactly as they were given in the original JSON.
+
+    Parameters
+    ----------
+    wdl_inputs: `dict`
+        A dictionary object with WDL inputs.
+
+    Returns
+    -------
+    `str` object.
+        WDL inputs in JSON format.
+
+    Examples
+    --------
+    >>> inputs_str = dump_wdl_inputs(read_wdl_inputs('inputs.json'))
+    """
+    res_str = json.dumps(wdl_inputs, indent=4)
+    return re.sub(f'"{re.escape(prefix_float)}([^"]+)"', r"\1", res_str)
+
+
 class cloud_url_factory:  # class to make sure all cloud urls are unique
     def __init__(
         self, backend, bucket
@@ -91,6 +117,58 @@ class cloud_url_factory:  # class to make sure all cloud urls are unique
         return uniq_url
 
 
+class file_url_map(dict):  # maps local paths to cloud urls, giving links to one file one url
+    def __init__(self, content_hash: bool = False):
+        super().__init__()
+        self.content_hash = content_hash
+        self._hashes = {}  # (st_dev, st_ino) -> SHA-256 of file content
+        self._files_by_size = {}  # file size -> [(st_dev, st_ino, path)] of registered files
+
+    def _keys(self, path: str) -> list:
+        """A path is known by itself, its real path and its (device, inode) pair."""
+        if not os.path.exists(path):
+            return [path]  # e.g. cloud urls
+        st = os.stat(path)
+        return [path, os.path.realpath(path), (st.st_dev, st.st_ino)]
+
+    def _sha256(self, path: str, inode: tuple) -> str:
+        if inode not in self._hashes:
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+            self._hashes[inode] = digest.hexdigest()
+        return self._hashes[inode]
+
+    def get(self, path: str, default=None):
+        for key in self._keys(path):
+            if dict.__contains__(self, key):
+                return dict.__getitem__(self, key)
+        if self.content_hash and os.path.isfile(path):
+            # Files are only hashed when another registered file has the same size.
+            st = os.stat(path)
+            for dev, ino, other in self._files_by_size.get(st.st_size, []):
+                if self._sha256(path, (st.st_dev, st.st_ino)) == self._sha256(other, (dev, ino)):
+                    return dict.__getitem__(self, (dev, ino))
+        return default
+
+    def __contains__(self, path: str) -> bool:
+        return self.get(path) is not None
+
+    def __getitem__(self, path: str) -> str:
+        url = self.get(path)
+        if url is None:
+            raise KeyError(path)
+        return url
+
+    def __setitem__(self, path: str, url: str):
+        for key in self._keys(path):
+            dict.__setitem__(self, key, url)
+        if self.content_hash and os.path.isfile(path):
+            st = os.stat(path)
+            self._files_by_size.setdefault(st.st_size, []).append((st.st_dev, st.st_ino, path))
+
+
 def transfer_data(
     source: str,
     dest: str,
@@ -98,16 +176,23 @@ def transfer_data(
     flowcells: Dict[str, FlowcellType] = None,
     profile: Optional[str] = None,
     verbose: bool = True,
+    recorder=None,
+    compression: Optional[str] = None,
 ) -> None:
     """Transfer source to dest (cloud destination).
 
     backend, choosing from gcp and aws. flowcells is a global flowcell manangement object.
+    If recorder (an UploadPlan, TransferMonitor or TransferPool object) is given, commands are
+    passed to it, and a TransferPool synchronizes plain folders by its own engine.
+    If compression ('gzip' or 'zstd') is given, the file source is compressed while it uploads.
     """
     if verbose:
         print(f'{"Dry run: " if dry_run else ""}Uploading {source} to {dest}.')
+    if recorder is not None:
+        recorder.set_destination(dest)
 
-    if flowcells is not None and source in flowcells:
-        flowcell = flowcells[source]
+    if flowcells is not None and os.path.realpath(source) in flowcells:
+        flowcell = flowcells[os.path.realpath(source)]
         if flowcell.type == "bcl":
             transfer_flowcell(
                 source=source,
@@ -116,6 +201,7 @@ def transfer_data(
                 dry_run=dry_run,
                 profile=profile,
                 verbose=verbose,
+                recorder=recorder,
             )
         elif flowcell.type == "fastq":
             transfer_fastq(
@@ -125,6 +211,7 @@ def transfer_data(
                 dry_run=dry_run,
                 profile=profile,
                 verbose=verbose,
+                recorder=recorder,
             )
         else:
             assert flowcell.type == "tar"
@@ -135,7 +222,10 @@ def transfer_data(
                 dry_run=dry_run,
                 profile=profile,
                 verbose=verbose,
+                recorder=recorder,
             )
+    elif os.path.isdir(source) and isinstance(recorder, TransferPool):
+        recorder.sync_directory(source, dest, profile=profile)
     else:
         if os.path.isdir(source):
             strato_cmd = [
@@ -152,7 +242,75 @@ def transfer_data(
 
         if profile is not None:
             strato_cmd.extend(["--profile", profile])
-        run_command(strato_cmd, dry_run, suppress_stdout=not verbose)
+        if compression is not None:
+            strato_cmd = compress_upload_command(source, dest, compression, profile=profile)
+        run_command(strato_cmd, dry_run, suppress_stdout=not verbose, recorder=recorder)
+
+
+def _is_remote_url(path: str, url_gen: cloud_url_factory) -> bool:
+    """If path is a URL of the same cloud provider as url_gen, outside of url_gen's bucket folder."""
+    return _get_scheme(path) == url_gen.scheme and not path.startswith(
+        f"{url_gen.scheme}://{url_gen.bucket}/"
+    )
+
+
+def _localize_remote_url(
+    url: str,
+    is_folder: bool,
+    input_file_to_output_url: dict,
+    url_gen: cloud_url_factory,
+    remote_copies: Dict[str, str],
+) -> str:
+    """Return the URL under url_gen's bucket folder that url is copied to, and record the copy."""
+    source = url.rstrip("/") + "/" if is_folder else url
+    dest = input_file_to_output_url.get(source, None)
+    if dest is None:
+        dest = url_gen.get_unique_url(url.rstrip("/"))
+        input_file_to_output_url[source] = dest
+        remote_copies[source] = dest
+    return dest
+
+
+def copy_remote_data(
+    remote_copies: Dict[str, str],
+    dry_run: bool,
+    profile: Optional[str] = None,
+    verbose: bool = True,
+    max_workers: int = 8,
+    recorder=None,
+) -> None:
+    """Copy cloud files or folders (keys ending with '/') to their destination URLs (values).
+
+    Sources and destinations must be of the same cloud provider, so that objects are copied (or
+    rewritten) on the provider side without being downloaded. Copies run concurrently with at most
+    max_workers at a time, unless a recorder (an UploadPlan or TransferMonitor object) is given, in
+    which case commands are passed to it one by one.
+    """
+    commands = []
+    for source, dest in remote_copies.items():
+        if verbose:
+            print(f'{"Dry run: " if dry_run else ""}Copying {source} to {dest}.')
+        if source.endswith("/"):
+            strato_cmd = ["strato", "sync", "--quiet", source.rstrip("/"), dest]
+        else:
+            strato_cmd = ["strato", "cp", "--quiet", source, dest]
+        if profile is not None:
+            strato_cmd.extend(["--profile", profile])
+        commands.append((dest, strato_cmd))
+
+    if recorder is not None:
+        for dest, strato_cmd in commands:
+            recorder.set_destination(dest)
+            run_command(strato_cmd, dry_run, suppress_stdout=not verbose, recorder=recorder)
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(run_command, strato_cmd, dry_run, suppress_stdout=not verbose)
+            for _, strato_cmd in commands
+        ]
+        for future in futures:
+            future.result()
 
 
 def transfer_sample_sheet(
@@ -164,16 +322,25 @@ def transfer_sample_sheet(
     profile: Optional[str] = None,
     nrows: Optional[int] = 10005,
     verbose: bool = True,
+    recorder=None,
+    remote_copies: Optional[Dict[str, str]] = None,
+    compress: Optional[str] = None,
+    compress_extensions: Optional[Set[str]] = None,
 ) -> Tuple[str, bool]:
     """Check sample sheet and upload files inside it.
     input_file: sample sheet
     input_ext: input file extension, either '.xlsx', '.tsv', or '.csv'
-    input_file_to_output_url: global dictionary maps local files to cloud urls
+    input_file_to_output_url: global file_url_map object maps local files to cloud urls
     url_gen: cloud url factory to make sure no duplicated cloud urls
     dry_run: if dry run
     profile: if not None, use for AWS backend
     nrows: load at most nrows, if loaded rows == nrows, skip; default: 10005
     verbose: if print info
+    recorder: if not None, pass upload commands to this UploadPlan or TransferMonitor object
+    remote_copies: if not None, URLs of the same cloud provider as url_gen are rewritten to URLs in
+        the bucket, and the copies to make are added to this dictionary
+    compress: if not None, compress files with extensions in compress_extensions with this codec
+        ('gzip' or 'zstd') while uploading them, and refer to the compressed files
 
     Returns: path to updated input file (if changed) and if sample sheet is changed
     """
@@ -233,6 +400,7 @@ def transfer_sample_sheet(
                 raise ValueError(f"{row[flowcell_keyword]} is not in string type!")
 
             flowcell = None
+            path = os.path.realpath(path)  # rows may reach one flowcell through different links
             if path in flowcells:
                 flowcell = flowcells[path]
             else:
@@ -259,7 +427,10 @@ def transfer_sample_sheet(
                 sub_url = input_file_to_output_url.get(source, None)
 
                 if sub_url is None:
-                    sub_url = url_gen.get_unique_url(source)
+                    compression = get_compression(source, compress, compress_extensions)
+                    sub_url = url_gen.get_unique_url(
+                        source + compressed_suffixes[compression] if compression else source
+                    )
                     transfer_data(
                         source=source,
                         dest=sub_url,
@@ -267,11 +438,29 @@ def transfer_sample_sheet(
                         flowcells=flowcells,
                         profile=profile,
                         verbose=verbose,
+                        recorder=recorder,
+                        compression=compression,
                     )
                     input_file_to_output_url[source] = sub_url
+                elif recorder is not None:
+                    recorder.add_duplicate(source, sub_url)
 
                 df.loc[idxr, idxc] = sub_url
                 is_changed = True
+            elif (
+                remote_copies is not None
+                and isinstance(value, str)
+                and _is_remote_url(value, url_gen)
+            ):
+                # Flowcell values are always folders; others must end with '/' to be folders.
+                df.loc[idxr, idxc] = _localize_remote_url(
+                    value,
+                    value.endswith("/") or idxc == "flowcell",
+                    input_file_to_output_url,
+                    url_gen,
+                    remote_copies,
+                )
+                is_changed = True
 
     if is_changed:
         orig_file = input_file
@@ -297,6 +486,16 @@ def upload_to_cloud_bucket(
     profile: Optional[str] = None,
     nrows: Optional[int] = 10005,
     verbose: bool = True,
+    plan=None,
+    callbacks: Optional[List[Callable[[dict], None]]] = None,
+    metrics_file: Optional[str] = None,
+    show_progress: bool = False,
+    localize_remote: bool = False,
+    max_workers: int = 8,
+    content_hash: bool = False,
+    parallel: bool = False,
+    compress: Optional[str] = None,
+    compress_extensions: Optional[Set[str]] = None,
 ) -> None:
     """Check and upload local files to the cloud bucket.
 
@@ -321,6 +520,27 @@ def upload_to_cloud_bucket(
     verbose: `bool`, default: ``True``
         If print out the underlying upload commands on screen.
 
+    plan: `UploadPlan`, default: ``None``
+        If not None, only record upload commands, sizes and duplicates in this plan, which can be executed later by :func:`execute_upload_plan`. Updated inputs are also kept in the plan instead of being written to out_json.
+    callbacks: `List[Callable[[dict], None]]`, default: ``None``
+        Functions called with every transfer event (see :class:`TransferMonitor`), e.g. to report progress elsewhere.
+    metrics_file: `str`, default: ``None``
+        If not None, write bytes, files, duration and throughput of every transfer and every destination, and the totals, to this JSON lines file.
+    show_progress: `bool`, default: ``False``
+        Print aggregate progress after every transfer.
+    localize_remote: `bool`, default: ``False``
+        If True, also copy inputs (and sample sheet entries) that are URLs of the same cloud provider in other buckets or folders into the bucket, with provider-side copies that do not download them. Remote folders must end with '/', except for the Flowcell column of sample sheets.
+    max_workers: `int`, default: 8
+        With localize_remote or parallel, the maximum number of transfers run concurrently.
+    content_hash: `bool`, default: ``False``
+        Local files are uploaded once per real path and (device, inode) pair, so symbolic and hard links to one file share one cloud URL. If True, files with identical contents are also uploaded once, at the cost of reading files that have the same size as an already seen file.
+    parallel: `bool`, default: ``False``
+        If True, run the transfers of all inputs concurrently in one pool of max_workers threads. Plain folders are then synchronized file by file: the cloud folder is listed once and only new or changed files (by size and modification time, not by checksum) are uploaded. Cannot be used with plan, callbacks, metrics_file or show_progress.
+    compress: `str`, default: ``None``
+        If 'gzip' or 'zstd', compress local files with extensions in compress_extensions while uploading them, streaming the compressor's output to the bucket without a temporary file, and refer to the compressed files (with '.gz' or '.zst' appended) in the updated inputs and sample sheets. Sample sheets given as inputs are never compressed.
+    compress_extensions: `Set[str]`, default: ``None``
+        Extensions (e.g. '.mtx') of files the consuming workflow also accepts compressed. Default is ``compress_extension_whitelist``: '.mtx', '.csv', '.tsv' and '.txt'.
+
     Returns
     -------
     None
@@ -333,48 +553,110 @@ def upload_to_cloud_bucket(
         bucket += f"/{bucket_folder.strip('/')}"
 
     url_gen = cloud_url_factory(backend, bucket)
-    input_file_to_output_url = {}
-
-    for k, v in inputs.items():
-        input_path = v
-        if isinstance(input_path, str) and os.path.exists(input_path):
-            input_path = os.path.abspath(input_path)
-            if input_path in input_file_to_output_url:  # if this file has been processed, skip
-                inputs[k] = input_file_to_output_url[input_path]
-                continue
-
-            input_url = url_gen.get_unique_url(input_path)
-            input_file_to_output_url[input_path] = input_url
-
-            is_changed = False
-            input_path_extension = os.path.splitext(input_path)[1].lower()
-
-            if input_path_extension in search_inside_file_whitelist:
-                # look inside input file to see if there are file paths within
-                input_path, is_changed = transfer_sample_sheet(
-                    input_file=input_path,
-                    input_ext=input_path_extension,
-                    input_file_to_output_url=input_file_to_output_url,
-                    url_gen=url_gen,
+    input_file_to_output_url = file_url_map(content_hash=content_hash)
+    remote_copies = {}
+
+    recorder = plan
+    monitor = callbacks is not None or metrics_file is not None or show_progress
+    if parallel:
+        if plan is not None or monitor:
+            raise ValueError("Parallel uploads cannot be planned or monitored!")
+        recorder = TransferPool(dry_run=dry_run, verbose=verbose, max_workers=max_workers)
+    elif plan is None and monitor:
+        from .transfer_metrics import TransferMonitor
+
+        recorder = TransferMonitor(
+            dry_run=dry_run, verbose=verbose, callbacks=callbacks, show_progress=show_progress
+        )
+
+    try:
+        for k, v in inputs.items():
+            input_path = v
+            if isinstance(input_path, str) and os.path.exists(input_path):
+                input_path = os.path.abspath(input_path)
+                if input_path in input_file_to_output_url:  # if this file has been processed, skip
+                    inputs[k] = input_file_to_output_url[input_path]
+                    if recorder is not None:
+                        recorder.add_duplicate(input_path, inputs[k])
+                    continue
+
+                is_changed = False
+                input_path_extension = os.path.splitext(input_path)[1].lower()
+
+                compression = None
+                if input_path_extension not in search_inside_file_whitelist:  # not a sample sheet
+                    compression = get_compression(input_path, compress, compress_extensions)
+                input_url = url_gen.get_unique_url(
+                    input_path + compressed_suffixes[compression] if compression else input_path
+                )
+                input_file_to_output_url[input_path] = input_url
+
+                if input_path_extension in search_inside_file_whitelist:
+                    # look inside input file to see if there are file paths within
+                    input_path, is_changed = transfer_sample_sheet(
+                        input_file=input_path,
+                        input_ext=input_path_extension,
+                        input_file_to_output_url=input_file_to_output_url,
+                        url_gen=url_gen,
+                        dry_run=dry_run,
+                        profile=profile,
+                        nrows=nrows,
+                        verbose=verbose,
+                        recorder=recorder,
+                        remote_copies=remote_copies if localize_remote else None,
+                        compress=compress,
+                        compress_extensions=compress_extensions,
+                    )
+
+                transfer_data(
+                    source=input_path,
+                    dest=input_url,
                     dry_run=dry_run,
                     profile=profile,
-                    nrows=nrows,
                     verbose=verbose,
+                    recorder=recorder,
+                    compression=compression,
                 )
 
-            transfer_data(
-                source=input_path,
-                dest=input_url,
-                dry_run=dry_run,
-                profile=profile,
-                verbose=verbose,
-            )
-
-            inputs[k] = input_url
-            if is_changed:  # delete temporary file after uploading
-                os.remove(input_path)
+                inputs[k] = input_url
+                if is_changed:  # delete temporary file after uploading
+                    if recorder is not None:
+                        recorder.add_temporary_file(input_path)
+                    else:
+                        os.remove(input_path)
+            elif (
+                localize_remote
+                and isinstance(input_path, str)
+                and _is_remote_url(input_path, url_gen)
+            ):
+                inputs[k] = _localize_remote_url(
+                    input_path,
+                    input_path.endswith("/"),
+                    input_file_to_output_url,
+                    url_gen,
+                    remote_copies,
+                )
 
-    if out_json is not None:
-        with open(out_json, "w") as fout:
-            res_str = json.dumps(inputs, indent=4)
-            fout.write(re.sub(f'"{prefix_float}(.+)"', r"\1", res_str))
+        copy_remote_data(
+            remote_copies,
+            dry_run=dry_run,
+            profile=profile,
+            verbose=verbose,
+            max_workers=max_workers,
+            recorder=recorder,
+        )
+
+        if plan is not None:
+            plan.set_inputs(inputs, out_json)
+            return
+
+        if parallel:
+            recorder.wait()
+        if out_json is not None:
+            with open(out_json, "w") as fout:
+                fout.write(dump_wdl_inputs(inputs))
+    finally:
+        if parallel:  # e.g. if an input cannot be uploaded, do not go on with the others
+            recorder.close()
+        elif monitor:
+            recorder.finish(metrics_file)
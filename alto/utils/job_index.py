@@ -0,0 +1,188 @@
+import os
+import json
+import sqlite3
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional
+
+from dateutil.parser import isoparse
+
+from alto.utils import get_cache_dir
+
+from .cromwell_client import run_with_client
+from .cromwell_utils import terminal_statuses
+
+
+def normalize_timestamp(timestamp: Optional[str]) -> Optional[str]:
+    """Convert an ISO 8601 timestamp to UTC with microseconds (e.g. '2024-01-01T00:00:00.000000Z'),
+    so that timestamps compare correctly as text whatever the precision Cromwell gave them."""
+    if not timestamp:
+        return None
+    dt = isoparse(timestamp)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class JobIndex:
+    """Local SQLite index of jobs on Cromwell servers.
+
+    The index is synchronized incrementally from the server's /query endpoint: only jobs submitted
+    since the last synchronization, plus jobs that were not finished at that time, are requested.
+    Jobs are never removed from the index, so history is kept after the server's metadata database
+    is pruned. Timestamps are stored by :func:`normalize_timestamp`.
+    """
+
+    version = 1
+
+    def __init__(self, server: str, port, path: Optional[str] = None):
+        if path is None:
+            path = os.path.join(get_cache_dir(), "cromwell_jobs.sqlite")
+        self.server = server
+        self.port = port
+        self.key = f"{server}:{port}"
+        self.conn = sqlite3.connect(path)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (server TEXT, id TEXT, name TEXT, status TEXT, "
+                'labels TEXT, submission TEXT, start TEXT, "end" TEXT, PRIMARY KEY (server, id))'
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_submission ON jobs (server, submission)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS syncs (server TEXT PRIMARY KEY, last_submission TEXT, "
+                "synced_at TEXT)"
+            )
+            if self.conn.execute("PRAGMA user_version").fetchone()[0] < JobIndex.version:
+                self._normalize_timestamps()
+                self.conn.execute(f"PRAGMA user_version = {JobIndex.version}")
+
+    def _normalize_timestamps(self):
+        """Rewrite timestamps stored as given by Cromwell by earlier versions of the index."""
+        rows = self.conn.execute('SELECT server, id, submission, start, "end" FROM jobs').fetchall()
+        for server, job_id, *timestamps in rows:
+            self.conn.execute(
+                'UPDATE jobs SET submission = ?, start = ?, "end" = ? WHERE server = ? AND id = ?',
+                (*[normalize_timestamp(value) for value in timestamps], server, job_id),
+            )
+        self.conn.execute(
+            "UPDATE syncs SET last_submission = "
+            "(SELECT MAX(submission) FROM jobs WHERE jobs.server = syncs.server)"
+        )
+
+    def last_sync(self) -> Optional[tuple]:
+        return self.conn.execute(
+            "SELECT last_submission, synced_at FROM syncs WHERE server = ?", (self.key,)
+        ).fetchone()
+
+    def _upsert(self, jobs) -> int:
+        n_jobs = 0
+        with self.conn:
+            for job in jobs:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        self.key,
+                        job["id"],
+                        job.get("name"),
+                        job.get("status"),
+                        json.dumps(job.get("labels", {})),
+                        normalize_timestamp(job.get("submission")),
+                        normalize_timestamp(job.get("start")),
+                        normalize_timestamp(job.get("end")),
+                    ),
+                )
+                n_jobs += 1
+        return n_jobs
+
+    def _query(self, query_data: List[dict]) -> List[dict]:
+        return run_with_client(self.server, self.port, lambda client: client.query(query_data))
+
+    def sync(self, batch_size: int = 100) -> int:
+        """Synchronize the index with the server and return the number of jobs updated."""
+        base_query = [{"additionalQueryResultFields": "labels"}]
+        last_sync = self.last_sync()
+
+        # Jobs that were not finished at the last synchronization.
+        unfinished = [
+            row[0]
+            for row in self.conn.execute(
+                "SELECT id FROM jobs WHERE server = ? AND status NOT IN (?, ?, ?)",
+                (self.key, *sorted(terminal_statuses)),
+            )
+        ]
+        # New jobs since the last synchronization.
+        query_data = list(base_query)
+        if last_sync is not None and last_sync[0] is not None:
+            query_data.append({"submission": last_sync[0]})
+        n_jobs = self._upsert(self._query(query_data))
+
+        for i in range(0, len(unfinished), batch_size):
+            query_data = base_query + [{"id": job_id} for job_id in unfinished[i : i + batch_size]]
+            n_jobs += self._upsert(self._query(query_data))
+
+        last_submission = self.conn.execute(
+            "SELECT MAX(submission) FROM jobs WHERE server = ?", (self.key,)
+        ).fetchone()[0]
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO syncs VALUES (?, ?, ?)",
+                (self.key, last_submission, datetime.now(timezone.utc).isoformat()),
+            )
+        return n_jobs
+
+    def query(
+        self,
+        job_statuses: List[str],
+        creator: Optional[str] = None,
+        names: Optional[List[str]] = None,
+        labels: Optional[List[str]] = None,
+        submitted_after: Optional[str] = None,
+        started_after: Optional[str] = None,
+        ended_before: Optional[str] = None,
+        num_shown: Optional[int] = None,
+    ) -> Iterator[dict]:
+        """Yield indexed jobs in the format of Cromwell's /query results, most recent first.
+
+        Filters take the same meaning as in Cromwell's /query endpoint, with timestamps in UTC if no
+        time zone is given.
+        """
+        conditions = ["server = ?"]
+        params = [self.key]
+        if len(job_statuses) > 0:
+            conditions.append(f"status IN ({', '.join('?' * len(job_statuses))})")
+            params.extend(job_statuses)
+        if names:
+            conditions.append(f"name IN ({', '.join('?' * len(names))})")
+            params.extend(names)
+        if creator is not None:
+            labels = [f"creator:{creator}"] + list(labels or [])
+        for label in labels or []:
+            key, _, value = label.partition(":")
+            conditions.append("json_extract(labels, ?) = ?")
+            params.extend([f'$."{key}"', value])
+        if submitted_after is not None:
+            conditions.append("submission >= ?")
+            params.append(normalize_timestamp(submitted_after))
+        if started_after is not None:
+            conditions.append("start >= ?")
+            params.append(normalize_timestamp(started_after))
+        if ended_before is not None:
+            conditions.append('"end" <= ?')
+            params.append(normalize_timestamp(ended_before))
+
+        sql = (
+            'SELECT id, name, status, labels, submission, start, "end" FROM jobs WHERE '
+            + " AND ".join(conditions)
+            + " ORDER BY submission DESC"
+        )
+        if num_shown is not None:
+            sql += f" LIMIT {int(num_shown)}"
+        for row in self.conn.execute(sql, params):
+            job = dict(id=row[0], status=row[2], labels=json.loads(row[3]))
+            if row[1] is not None:
+                job["name"] = row[1]
+            for key, value in zip(["submission", "start", "end"], row[4:]):
+                if value is not None:
+                    job[key] = value
+            yield job
@@ -0,0 +1,95 @@
+import sys
+import json
+from typing import IO, Iterable, List, Optional
+
+
+output_formats = ["text", "json", "tsv"]
+_output_format = "text"
+
+
+def set_output_format(output_format: str) -> None:
+    """Set the output format of all commands: 'text' (human-readable messages and tables), 'json'
+    (one JSON object per record and line) or 'tsv' (a header line, then one record per line)."""
+    global _output_format
+    if output_format not in output_formats:
+        raise ValueError(f"Unknown output format {output_format}!")
+    _output_format = output_format
+
+
+def get_output_format() -> str:
+    return _output_format
+
+
+def is_structured_output() -> bool:
+    """Whether commands should write records instead of messages and tables."""
+    return _output_format != "text"
+
+
+def _tsv_field(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class RecordWriter:
+    """Write records with fixed columns to a stream in the structured output format, one line
+    per record, flushing every line so that consumers can read long listings as they arrive.
+
+    Parameters
+    ----------
+    columns: `List[str]`
+        Keys of every record, in output order. Missing keys are written as null (JSON) or empty
+        fields (TSV), and other keys are ignored.
+    output_format: `str`, optional
+        'json' or 'tsv'. By default, the format set by :func:`set_output_format`.
+    stream: `IO`, optional
+        Stream to write to. The default is STDOUT.
+
+    Examples
+    --------
+    >>> writer = RecordWriter(["id", "status"], "tsv")
+    >>> writer.write_all([{"id": "job-1", "status": "Running"}])
+    """
+
+    def __init__(
+        self, columns: List[str], output_format: Optional[str] = None, stream: Optional[IO] = None
+    ):
+        self.columns = columns
+        self.output_format = output_format if output_format is not None else _output_format
+        assert self.output_format in ["json", "tsv"], "Records are written as JSON or TSV!"
+        self.stream = stream
+        self._header_written = False
+
+    def _write_line(self, line: str):
+        stream = self.stream if self.stream is not None else sys.stdout
+        stream.write(line + "\n")
+        stream.flush()
+
+    def write_header(self):
+        """Write the TSV header line, if not written yet. Nothing is written for JSON."""
+        if self.output_format == "tsv" and not self._header_written:
+            self._write_line("\t".join(self.columns))
+        self._header_written = True
+
+    def write(self, record: dict):
+        self.write_header()
+        if self.output_format == "json":
+            self._write_line(json.dumps({col: record.get(col) for col in self.columns}))
+        else:
+            self._write_line("\t".join(_tsv_field(record.get(col)) for col in self.columns))
+
+    def write_all(self, records: Iterable[dict]):
+        """Write records as they are produced, with the TSV header even if there is none."""
+        self.write_header()
+        for record in records:
+            self.write(record)
@@ -0,0 +1,211 @@
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from dateutil.parser import isoparse
+
+from alto.utils import run_command
+
+
+def scan_local_directory(path: str) -> Dict[str, Tuple[int, float]]:
+    """Walk a local folder with os.scandir.
+
+    Parameters
+    ----------
+    path: `str`
+        Path to the local folder.
+
+    Returns
+    -------
+    `dict` object.
+        A dictionary mapping the path of every file relative to path ('/' separated) to its size in
+        bytes and modification time in seconds since the epoch.
+    """
+    files = dict()
+    folders = [("", path)]
+    while len(folders) > 0:
+        prefix, folder = folders.pop()
+        with os.scandir(folder) as it:
+            for entry in it:
+                if entry.is_dir():
+                    folders.append((f"{prefix}{entry.name}/", entry.path))
+                elif entry.is_file():
+                    st = entry.stat()
+                    files[f"{prefix}{entry.name}"] = (st.st_size, st.st_mtime)
+    return files
+
+
+def list_remote_directory(url: str, profile: Optional[str] = None) -> Dict[str, Tuple[int, float]]:
+    """List all objects under a gs:// or s3:// folder with one listing command.
+
+    Parameters
+    ----------
+    url: `str`
+        Cloud folder URL, without the trailing '/'.
+    profile: `str`, optional
+        AWS profile. Only works for S3 URLs.
+
+    Returns
+    -------
+    `dict` object.
+        A dictionary mapping the path of every object relative to url to its size in bytes and
+        upload time in seconds since the epoch. Empty if the folder does not exist or cannot be
+        listed.
+    """
+    url = url.rstrip("/")
+    if url.startswith("gs://"):
+        command = ["gcloud", "storage", "ls", "-l", f"{url}/**"]
+    else:
+        assert url.startswith("s3://"), "Must be a gs:// or s3:// URL!"
+        command = ["aws", "s3", "ls", "--recursive", f"{url}/"]
+        if profile is not None:
+            command.extend(["--profile", profile])
+
+    try:
+        result = subprocess.run(command, capture_output=True, text=True)
+    except FileNotFoundError:
+        return dict()
+    if result.returncode != 0:  # e.g. no object is under url yet
+        return dict()
+
+    objects = dict()
+    if url.startswith("gs://"):
+        # Lines are '<size>  <time>  gs://<bucket>/<path>', followed by a 'TOTAL:' line.
+        for line in result.stdout.splitlines():
+            fields = line.split(maxsplit=2)
+            if len(fields) == 3 and fields[0].isdigit() and fields[2].startswith(f"{url}/"):
+                objects[fields[2][len(url) + 1 :]] = (
+                    int(fields[0]),
+                    isoparse(fields[1]).timestamp(),
+                )
+    else:
+        # Lines are '<date> <time in local timezone> <size> <key relative to the bucket>'.
+        key_prefix = url[len("s3://") :].partition("/")[2] + "/"
+        for line in result.stdout.splitlines():
+            fields = line.split(maxsplit=3)
+            if len(fields) == 4 and fields[2].isdigit() and fields[3].startswith(key_prefix):
+                mtime = datetime.strptime(f"{fields[0]} {fields[1]}", "%Y-%m-%d %H:%M:%S")
+                objects[fields[3][len(key_prefix) :]] = (int(fields[2]), mtime.timestamp())
+    return objects
+
+
+def diff_directory(
+    local_files: Dict[str, Tuple[int, float]], remote_objects: Dict[str, Tuple[int, float]]
+) -> Tuple[List[str], List[str]]:
+    """Return files that are new or changed locally, i.e. differ in size or were modified after
+    their upload, and remote objects without a local file.
+
+    Contents are not compared, as neither listing gives checksums, so a file rewritten with the
+    same size and a modification time older than its upload is taken as unchanged.
+    """
+    changed = []
+    for rel_path, (size, mtime) in local_files.items():
+        remote = remote_objects.get(rel_path, None)
+        if remote is None or remote[0] != size or remote[1] < mtime:
+            changed.append(rel_path)
+    extra = [rel_path for rel_path in remote_objects if rel_path not in local_files]
+    return changed, extra
+
+
+class TransferPool:
+    """Run transfer commands of all inputs concurrently in one thread pool.
+
+    It is passed to the transfer functions in place of an UploadPlan, so commands are submitted to
+    the pool instead of being run one after another, and plain folders are synchronized file by
+    file by :meth:`sync_directory`. Call :meth:`wait` to wait for all transfers, which re-raises
+    the first failure and then removes temporary files, or :meth:`close` to give up on them.
+    """
+
+    def __init__(
+        self,
+        dry_run: bool = False,
+        verbose: bool = True,
+        max_workers: int = 8,
+        batch_files: int = 64,
+        batch_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.dry_run = dry_run
+        self.verbose = verbose
+        self.batch_files = batch_files
+        self.batch_bytes = batch_bytes
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.futures = []
+        self.temporary_files = []
+
+    def set_destination(self, url: str):
+        pass
+
+    def add_duplicate(self, source: str, url: str):
+        pass
+
+    def add_temporary_file(self, path: str):
+        """Remove path after all transfers finish."""
+        self.temporary_files.append(path)
+
+    def add_command(self, command: List[str], suppress_stdout: Optional[bool] = None):
+        if suppress_stdout is None:
+            suppress_stdout = not self.verbose
+        self.futures.append(
+            self.executor.submit(
+                run_command, command, self.dry_run, suppress_stdout=suppress_stdout
+            )
+        )
+
+    def sync_directory(self, source: str, dest: str, profile: Optional[str] = None):
+        """Make the cloud folder dest mirror the local folder source, like 'strato sync', but list
+        dest only once and upload only new or changed files. Files of the same folder are uploaded
+        in batches of at most batch_files files and batch_bytes bytes (unless a single file is
+        larger), each batch submitted to the pool as one command."""
+        dest = dest.rstrip("/")
+        local_files = scan_local_directory(source)
+        changed, extra = diff_directory(local_files, list_remote_directory(dest, profile))
+        if self.verbose:
+            print(
+                f"{len(changed)} of {len(local_files)} files in {source} are new or changed, "
+                f"{len(extra)} objects to remove from {dest}."
+            )
+
+        profile_args = ["--profile", profile] if profile is not None else []
+        by_folder = dict()
+        for rel_path in sorted(changed):
+            by_folder.setdefault(os.path.dirname(rel_path), []).append(rel_path)
+        for folder, rel_paths in by_folder.items():
+            target = f"{dest}/{folder}/" if folder != "" else f"{dest}/"
+            batch, batch_size = [], 0
+            for rel_path in rel_paths:
+                size = local_files[rel_path][0]
+                if len(batch) > 0 and (
+                    len(batch) >= self.batch_files or batch_size + size > self.batch_bytes
+                ):
+                    self._submit_copy(batch, target, profile_args)
+                    batch, batch_size = [], 0
+                batch.append(os.path.join(source, rel_path))
+                batch_size += size
+            if len(batch) > 0:
+                self._submit_copy(batch, target, profile_args)
+
+        for start in range(0, len(extra), 100):
+            urls = [f"{dest}/{rel_path}" for rel_path in extra[start : start + 100]]
+            self.add_command(["strato", "rm", "--quiet"] + urls + profile_args)
+
+    def _submit_copy(self, paths: List[str], target: str, profile_args: List[str]):
+        self.add_command(
+            ["strato", "cp", "--ionice", "--quiet"] + paths + [target] + profile_args,
+            suppress_stdout=True,
+        )
+
+    def wait(self):
+        try:
+            for future in self.futures:
+                future.result()
+        finally:
+            self.close()
+
+    def close(self):
+        """Cancel transfers not started yet, wait for running ones and remove temporary files."""
+        self.executor.shutdown(cancel_futures=True)
+        for path in self.temporary_files:
+            if os.path.exists(path):
+                os.remove(path)
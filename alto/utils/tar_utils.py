@@ -29,6 +29,7 @@ def transfer_tar(
     dry_run: bool,
     profile: Optional[str] = None,
     verbose: bool = True,
+    recorder=None,
 ) -> None:
     for sample in sample_set:
         tar_list = glob.glob(f"{source}/{sample}.tar")   # TAR filename must be "<sample>.tar"
@@ -51,4 +52,4 @@ def transfer_tar(
         if profile is not None:
             strato_cmd.extend(["--profile", profile])
 
-        run_command(strato_cmd, dry_run, suppress_stdout=not verbose)
+        run_command(strato_cmd, dry_run, suppress_stdout=not verbose, recorder=recorder)
@@ -0,0 +1,156 @@
+import os
+import json
+import time
+from typing import Callable, List, Optional
+
+from alto.utils import run_command
+
+from .upload_plan import _get_size, _strato_sources
+
+
+def _throughput(n_bytes: int, seconds: float) -> Optional[float]:
+    return round(n_bytes / 1e6 / seconds, 3) if seconds > 0 else None
+
+
+class TransferMonitor:
+    """Run upload commands and measure bytes, files, duration and throughput of each of them.
+
+    It is passed to the transfer functions in place of an UploadPlan, so every command is timed
+    while it runs. Each callback is called with one event dictionary, whose 'event' is one of
+    'destination_start', 'transfer_start', 'transfer_end' and 'upload_end'. 'transfer_end' events
+    contain the command, destination, bytes, files, seconds, mb_per_second and status ('ok' or
+    'failed'); 'upload_end' events contain the totals.
+    """
+
+    def __init__(
+        self,
+        dry_run: bool = False,
+        verbose: bool = True,
+        callbacks: Optional[List[Callable[[dict], None]]] = None,
+        show_progress: bool = False,
+    ):
+        self.dry_run = dry_run
+        self.verbose = verbose
+        self.callbacks = list(callbacks) if callbacks is not None else []
+        self.show_progress = show_progress
+        self.transfers = []
+        self.destinations = dict()
+        self.current_destination = None
+        self.start_time = time.time()
+
+    def _emit(self, event: str, **kwargs):
+        record = dict(event=event, **kwargs)
+        for callback in self.callbacks:
+            callback(record)
+
+    def set_destination(self, url: str):
+        """Attribute commands run from now on to the input uploaded to url."""
+        self.current_destination = url
+        if url not in self.destinations:
+            self.destinations[url] = dict(url=url, bytes=0, files=0, seconds=0.0, transfers=0)
+            self._emit("destination_start", destination=url)
+
+    def add_command(self, command: List[str]):
+        sources, dest = _strato_sources(command)
+        n_bytes = n_files = 0
+        for source in sources:
+            source_bytes, source_files = _get_size(source)
+            n_bytes += source_bytes
+            n_files += source_files
+        destination = self.current_destination if self.current_destination is not None else dest
+        self.set_destination(destination)
+
+        self._emit(
+            "transfer_start",
+            command=list(command),
+            destination=destination,
+            bytes=n_bytes,
+            files=n_files,
+        )
+        status = "failed"
+        start = time.perf_counter()
+        try:
+            run_command(command, self.dry_run, suppress_stdout=not self.verbose)
+            status = "ok"
+        finally:
+            seconds = time.perf_counter() - start
+            self._record(command, destination, n_bytes, n_files, seconds, status)
+
+    def _record(self, command, destination, n_bytes, n_files, seconds, status):
+        transfer = dict(
+            command=list(command),
+            destination=destination,
+            bytes=n_bytes,
+            files=n_files,
+            seconds=round(seconds, 3),
+            mb_per_second=_throughput(n_bytes, seconds),
+            status=status,
+        )
+        self.transfers.append(transfer)
+        stats = self.destinations[destination]
+        stats["bytes"] += n_bytes
+        stats["files"] += n_files
+        stats["seconds"] += seconds
+        stats["transfers"] += 1
+        self._emit("transfer_end", **transfer)
+        if self.show_progress:
+            print(self.progress())
+
+    def add_duplicate(self, source: str, url: str):
+        """Duplicated references are not uploaded again, so there is nothing to measure."""
+        pass
+
+    def add_temporary_file(self, path: str):
+        """Transfers are finished when their commands return, so path can be removed now."""
+        os.remove(path)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(transfer["bytes"] for transfer in self.transfers)
+
+    @property
+    def total_files(self) -> int:
+        return sum(transfer["files"] for transfer in self.transfers)
+
+    def progress(self) -> str:
+        elapsed = time.time() - self.start_time
+        last = self.transfers[-1]
+        return (
+            f"[{len(self.transfers)} transfers, {len(self.destinations)} destinations] "
+            f"{self.total_files} files ({self.total_bytes / 1e9:.2f} GB) in {elapsed:.1f}s, "
+            f"{self.total_bytes / 1e6 / max(elapsed, 1e-9):.1f} MB/s overall; last: "
+            f"{last['bytes'] / 1e6:.1f} MB in {last['seconds']:.1f}s ({last['status']})"
+        )
+
+    def summary(self) -> dict:
+        elapsed = time.time() - self.start_time
+        return dict(
+            transfers=len(self.transfers),
+            failed=sum(transfer["status"] != "ok" for transfer in self.transfers),
+            destinations=len(self.destinations),
+            bytes=self.total_bytes,
+            files=self.total_files,
+            seconds=round(elapsed, 3),
+            mb_per_second=_throughput(self.total_bytes, elapsed),
+        )
+
+    def finish(self, metrics_file: Optional[str] = None):
+        """Emit the 'upload_end' event and, if metrics_file is given, write one JSON line per
+        transfer ('type': 'transfer'), per destination ('type': 'destination') and the totals
+        ('type': 'total')."""
+        totals = self.summary()
+        self._emit("upload_end", **totals)
+        if metrics_file is None:
+            return
+        with open(metrics_file, "w") as fout:
+            for transfer in self.transfers:
+                fout.write(json.dumps(dict(type="transfer", **transfer)) + "\n")
+            for stats in self.destinations.values():
+                record = dict(
+                    type="destination",
+                    **stats,
+                    mb_per_second=_throughput(stats["bytes"], stats["seconds"]),
+                )
+                record["seconds"] = round(record["seconds"], 3)
+                fout.write(json.dumps(record) + "\n")
+            fout.write(json.dumps(dict(type="total", **totals)) + "\n")
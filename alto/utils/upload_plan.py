@@ -0,0 +1,175 @@
+import os
+import glob
+import json
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from alto.utils import run_command
+
+from .io_utils import dump_wdl_inputs
+
+
+def _strato_sources(command: List[str]) -> Tuple[List[str], str]:
+    """Split a strato cp/sync command, or a compressed upload command (python -m <module> ...),
+    into its sources and destination."""
+    args = []
+    skip_next = False
+    start = 2 if command[0] == "strato" else command.index("-m") + 2
+    for arg in command[start:]:
+        if skip_next:
+            skip_next = False
+        elif arg in ["--profile", "--codec"]:
+            skip_next = True
+        elif not arg.startswith("-"):
+            args.append(arg)
+    return args[:-1], args[-1]
+
+
+def _get_size(source: str) -> Tuple[int, int]:
+    """Return total bytes and number of files of a local path, a folder or a glob pattern."""
+    n_bytes = n_files = 0
+    paths = glob.glob(source) if glob.has_magic(source) else [source]
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in files:
+                    n_bytes += os.path.getsize(os.path.join(root, name))
+                    n_files += 1
+        elif os.path.isfile(path):
+            n_bytes += os.path.getsize(path)
+            n_files += 1
+    return n_bytes, n_files
+
+
+class UploadPlan:
+    """Upload commands recorded by a planning pass of upload_to_cloud_bucket, with sizes.
+
+    The transfer time is estimated as total_bytes / bandwidth + total_files * per_file_overhead /
+    concurrency, where bandwidth is in MB/s, per_file_overhead is the latency of one file transfer
+    in seconds and concurrency is the number of files transferred in parallel.
+    """
+
+    def __init__(
+        self, bandwidth: float = 100.0, concurrency: int = 8, per_file_overhead: float = 0.1
+    ):
+        self.bandwidth = bandwidth
+        self.concurrency = concurrency
+        self.per_file_overhead = per_file_overhead
+        self.commands = []
+        self.destinations = dict()
+        self.duplicates = []
+        self.temporary_files = []
+        self.current_destination = None
+        self.out_json = None
+        self.updated_inputs = None
+
+    def set_destination(self, url: str):
+        """Attribute commands added from now on to the input uploaded to url."""
+        self.current_destination = url
+        self.destinations.setdefault(url, dict(url=url, bytes=0, files=0))
+
+    def add_command(self, command: List[str]):
+        sources, dest = _strato_sources(command)
+        n_bytes = n_files = 0
+        for source in sources:
+            source_bytes, source_files = _get_size(source)
+            n_bytes += source_bytes
+            n_files += source_files
+        destination = self.current_destination if self.current_destination is not None else dest
+        self.destinations.setdefault(destination, dict(url=destination, bytes=0, files=0))
+        self.destinations[destination]["bytes"] += n_bytes
+        self.destinations[destination]["files"] += n_files
+        self.commands.append(
+            dict(command=list(command), destination=destination, bytes=n_bytes, files=n_files)
+        )
+
+    def add_duplicate(self, source: str, url: str):
+        """Record a local path that is referred to more than once and uploaded only once."""
+        self.duplicates.append(dict(source=source, url=url))
+
+    def add_temporary_file(self, path: str):
+        """Record a rewritten sample sheet, which is removed after the plan is executed."""
+        self.temporary_files.append(path)
+
+    def set_inputs(self, inputs: dict, out_json: Optional[str]):
+        self.updated_inputs = dump_wdl_inputs(inputs)
+        self.out_json = out_json
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(command["bytes"] for command in self.commands)
+
+    @property
+    def total_files(self) -> int:
+        return sum(command["files"] for command in self.commands)
+
+    def estimate_seconds(self) -> float:
+        return (
+            self.total_bytes / (self.bandwidth * 1e6)
+            + self.total_files * self.per_file_overhead / self.concurrency
+        )
+
+    def to_dict(self) -> dict:
+        return dict(
+            version=1,
+            created_at=datetime.now(timezone.utc).isoformat(),
+            bandwidth_mb_per_second=self.bandwidth,
+            concurrency=self.concurrency,
+            per_file_overhead_seconds=self.per_file_overhead,
+            total_bytes=self.total_bytes,
+            total_files=self.total_files,
+            estimated_seconds=round(self.estimate_seconds(), 1),
+            destinations=list(self.destinations.values()),
+            duplicates=self.duplicates,
+            commands=self.commands,
+            temporary_files=self.temporary_files,
+            out_json=self.out_json,
+            updated_inputs=self.updated_inputs,
+        )
+
+    def write(self, plan_json: str):
+        with open(plan_json, "w") as fout:
+            json.dump(self.to_dict(), fout, indent=4)
+
+    def summary(self) -> str:
+        return (
+            f"{self.total_files} files ({self.total_bytes / 1e9:.2f} GB) to upload to "
+            f"{len(self.destinations)} destinations with {len(self.commands)} commands, "
+            f"{len(self.duplicates)} duplicated references skipped. Estimated transfer time: "
+            f"{self.estimate_seconds() / 60:.1f} minutes."
+        )
+
+
+def execute_upload_plan(plan_json: str, dry_run: bool = False, verbose: bool = True) -> None:
+    """Run the upload commands of a plan written by UploadPlan.write, in order, then remove its
+    temporary files and write its updated inputs to the out_json recorded in the plan.
+
+    Parameters
+    ----------
+    plan_json: `str`
+        Path to the plan JSON file.
+    dry_run: `bool`, default: ``False``
+        If dry run, only print commands but do not execute.
+    verbose: `bool`, default: ``True``
+        Print commands to STDOUT.
+
+    Returns
+    -------
+    None
+
+    Examples
+    --------
+    >>> execute_upload_plan('upload_plan.json')
+    """
+    with open(plan_json, "r") as f:
+        plan = json.load(f)
+    for command in plan["commands"]:
+        run_command(command["command"], dry_run, suppress_stdout=not verbose)
+    if dry_run:
+        return
+    for path in plan.get("temporary_files", []):
+        if os.path.exists(path):
+            os.remove(path)
+    if plan.get("out_json") is not None and plan.get("updated_inputs") is not None:
+        with open(plan["out_json"], "w") as fout:
+            fout.write(plan["updated_inputs"])
@@ -0,0 +1,299 @@
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import zipfile
+import posixpath
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+import requests
+
+from alto.utils import get_cache_dir
+
+from .io_utils import get_workflow_imports
+
+
+import_line_pattern = re.compile(r"^(\s*import\s+)([\"'])(.+?)\2", re.MULTILINE)
+
+
+def _is_url(path: str) -> bool:
+    return urlparse(path).scheme in ["http", "https"]
+
+
+def resolve_workflow_imports(wdl_path: str) -> Dict[str, str]:
+    """Build the local import graph of a WDL file.
+
+    Parameters
+    ----------
+    wdl_path: `str`
+        Path to the main WDL file.
+
+    Returns
+    -------
+    `dict` object.
+        A dictionary mapping the absolute path of every local WDL file imported directly or
+        indirectly by wdl_path to its path inside the dependency zip, which is its path relative to
+        the folder of wdl_path. Files outside that folder are placed at the root of the zip.
+
+    Examples
+    --------
+    >>> deps = resolve_workflow_imports('workflows/cumulus.wdl')
+    """
+    wdl_path = os.path.abspath(wdl_path)
+    root_dir = os.path.dirname(wdl_path)
+    deps = dict()
+    visiting = []
+
+    def visit(path):
+        visiting.append(path)
+        workflow_dir = os.path.dirname(path)
+        for d in get_workflow_imports(path):
+            imported_path = os.path.abspath(os.path.join(workflow_dir, d))
+            if not os.path.exists(imported_path):
+                continue  # e.g. http(s) imports
+            if imported_path in visiting:
+                _raise_circular_imports(visiting, imported_path)
+            if imported_path not in deps:
+                deps[imported_path] = _local_arcname(imported_path, root_dir)
+                visit(imported_path)
+        visiting.pop()
+
+    visit(wdl_path)
+    _check_arcnames(deps)
+    return deps
+
+
+def _local_arcname(path: str, root_dir: Optional[str]) -> str:
+    arcname = os.path.relpath(path, root_dir) if root_dir is not None else ".."
+    if arcname.startswith(".."):
+        arcname = os.path.basename(path)
+    return arcname.replace(os.sep, "/")
+
+
+def _remote_arcname(url: str) -> str:
+    parsed = urlparse(url)
+    path = posixpath.normpath("/" + parsed.path).lstrip("/")
+    return posixpath.join("imports", parsed.netloc.replace(":", "_"), path)
+
+
+def _raise_circular_imports(visiting: List[str], imported: str):
+    cycle = visiting[visiting.index(imported) :] + [imported]
+    raise ValueError(f"Circular WDL imports detected: {' -> '.join(cycle)}")
+
+
+def _check_arcnames(deps: Dict[str, str]):
+    arcnames = dict()
+    for path, arcname in deps.items():
+        if arcname in arcnames:
+            raise ValueError(
+                f"Both {arcnames[arcname]} and {path} would be stored as {arcname} in the dependency zip!"
+            )
+        arcnames[arcname] = path
+
+
+def _write_dependency_zip(members: List[Tuple[str, bytes]], cache_dir: Optional[str]) -> str:
+    members = sorted(members)
+    digest = hashlib.sha256()
+    for arcname, content in members:
+        digest.update(arcname.encode())
+        digest.update(b"\0")
+        digest.update(hashlib.sha256(content).digest())
+
+    if cache_dir is None:
+        cache_dir = get_cache_dir("wdl_zips")
+    zip_path = os.path.join(cache_dir, f"{digest.hexdigest()}.zip")
+    if not os.path.exists(zip_path):
+        tmp_path = f"{zip_path}.{os.getpid()}.tmp"
+        with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as out:
+            for arcname, content in members:
+                # Fixed timestamps keep the zip identical for identical contents.
+                info = zipfile.ZipInfo(arcname, date_time=(1980, 1, 1, 0, 0, 0))
+                out.writestr(info, content, compress_type=zipfile.ZIP_DEFLATED)
+        os.replace(tmp_path, zip_path)
+    return zip_path
+
+
+def build_dependency_zip(wdl_path: str, cache_dir: Optional[str] = None) -> Optional[str]:
+    """Create the zip file of all local WDL files imported by wdl_path, for Cromwell's
+    workflowDependencies.
+
+    The zip file is stored under cache_dir (default: 'wdl_zips' under the altocumulus cache
+    directory) and named by a hash of all member paths and contents, so it is reused across
+    submissions as long as none of the imported files changes.
+
+    Returns
+    -------
+    `str` object or ``None``.
+        Path to the zip file, or ``None`` if wdl_path imports no local file.
+    """
+    deps = resolve_workflow_imports(wdl_path)
+    if len(deps) == 0:
+        return None
+
+    members = []
+    for path, arcname in deps.items():
+        with open(path, "rb") as f:
+            members.append((arcname, f.read()))
+    return _write_dependency_zip(members, cache_dir)
+
+
+def fetch_remote_wdl(
+    url: str,
+    ttl: Optional[float] = None,
+    cache_dir: Optional[str] = None,
+    ssl_verify: bool = True,
+) -> bytes:
+    """Download a remote WDL file through a local content-addressed cache.
+
+    Parameters
+    ----------
+    url: `str`
+        HTTP or HTTPS URL of the WDL file.
+    ttl: `float`, optional
+        Hours after which a cached copy is downloaded again. If ``None`` (or ``inf``), a cached copy
+        never expires, which is what URLs pinned to a release or commit need.
+    cache_dir: `str`, optional
+        Cache folder. Default is 'wdl_imports' under the altocumulus cache directory.
+    ssl_verify: `bool`, optional
+        Verify SSL certificates. Default is ``True``.
+
+    Returns
+    -------
+    `bytes` object.
+        Content of the WDL file. If the download fails but an expired copy is cached, the cached
+        copy is returned.
+    """
+    if cache_dir is None:
+        cache_dir = get_cache_dir("wdl_imports")
+    index_path = os.path.join(cache_dir, f"url-{hashlib.sha256(url.encode()).hexdigest()}.json")
+
+    entry = None
+    if os.path.exists(index_path):
+        with open(index_path, "rt") as f:
+            entry = json.load(f)
+        content_path = os.path.join(cache_dir, f"{entry['sha256']}.wdl")
+        if not os.path.exists(content_path):
+            entry = None
+    if entry is not None and (ttl is None or time.time() - entry["fetched_at"] < ttl * 3600):
+        with open(content_path, "rb") as f:
+            return f.read()
+
+    try:
+        resp = requests.get(url, verify=ssl_verify, timeout=60)
+        resp.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        if entry is None:
+            raise
+        print(
+            f"Warning: cannot download {url} ({e}). Use the copy cached at {content_path}.",
+            file=sys.stderr,
+        )
+        with open(content_path, "rb") as f:
+            return f.read()
+
+    content = resp.content
+    sha256 = hashlib.sha256(content).hexdigest()
+    content_path = os.path.join(cache_dir, f"{sha256}.wdl")
+    if not os.path.exists(content_path):
+        with open(f"{content_path}.{os.getpid()}.tmp", "wb") as f:
+            f.write(content)
+        os.replace(f"{content_path}.{os.getpid()}.tmp", content_path)
+    with open(f"{index_path}.{os.getpid()}.tmp", "wt") as f:
+        json.dump(dict(url=url, sha256=sha256, fetched_at=time.time()), f)
+    os.replace(f"{index_path}.{os.getpid()}.tmp", index_path)
+    return content
+
+
+def build_prefetched_workflow(
+    workflow: str,
+    ttl: Optional[float] = None,
+    import_cache_dir: Optional[str] = None,
+    zip_cache_dir: Optional[str] = None,
+    ssl_verify: bool = True,
+) -> Tuple[bytes, Optional[str]]:
+    """Resolve all imports of a workflow, downloading remote (HTTP/HTTPS) WDL files, so that
+    Cromwell does not need to fetch any URL at submission.
+
+    Remote files, including files imported by relative paths from remote files, are fetched
+    through :func:`fetch_remote_wdl` and stored under 'imports/<host>/<path>' in the dependency
+    zip. Imports of remote files are rewritten to these paths. Local imports are kept as in
+    :func:`build_dependency_zip`.
+
+    Parameters
+    ----------
+    workflow: `str`
+        Path or HTTP(S) URL of the main WDL file.
+    ttl: `float`, optional
+        Passed to :func:`fetch_remote_wdl`.
+    import_cache_dir: `str`, optional
+        Cache folder of remote WDL files.
+    zip_cache_dir: `str`, optional
+        Cache folder of dependency zips.
+    ssl_verify: `bool`, optional
+        Verify SSL certificates. Default is ``True``.
+
+    Returns
+    -------
+    `tuple` object.
+        Source of the main WDL with imports rewritten, and the path to the dependency zip or
+        ``None`` if the workflow has no import.
+    """
+    main = workflow if _is_url(workflow) else os.path.abspath(workflow)
+    root_dir = None if _is_url(main) else os.path.dirname(main)
+    sources = dict()
+    deps = dict()
+    rewrites = dict()
+    visiting = []
+
+    def visit(node):
+        visiting.append(node)
+        if _is_url(node):
+            sources[node] = fetch_remote_wdl(
+                node, ttl=ttl, cache_dir=import_cache_dir, ssl_verify=ssl_verify
+            )
+        else:
+            with open(node, "rb") as f:
+                sources[node] = f.read()
+        rewrites[node] = dict()
+        for match in import_line_pattern.finditer(sources[node].decode()):
+            d = match.group(3)
+            if _is_url(d):
+                target = d
+            elif _is_url(node):
+                target = urljoin(node, d)
+            else:
+                target = os.path.abspath(os.path.join(os.path.dirname(node), d))
+                if not os.path.exists(target):
+                    continue
+            if target in visiting:
+                _raise_circular_imports(visiting, target)
+            if target not in sources:
+                deps[target] = (
+                    _remote_arcname(target) if _is_url(target) else _local_arcname(target, root_dir)
+                )
+                visit(target)
+            if _is_url(target):
+                rewrites[node][d] = deps[target]
+        visiting.pop()
+
+    visit(main)
+    _check_arcnames(deps)
+
+    def rewrite(node):
+        mapping = rewrites[node]
+        if len(mapping) == 0:
+            return sources[node]
+        return import_line_pattern.sub(
+            lambda m: m.group(1) + m.group(2) + mapping.get(m.group(3), m.group(3)) + m.group(2),
+            sources[node].decode(),
+        ).encode()
+
+    zip_path = None
+    if len(deps) > 0:
+        zip_path = _write_dependency_zip(
+            [(arcname, rewrite(node)) for node, arcname in deps.items()], zip_cache_dir
+        )
+    return rewrite(main), zip_path